@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录状态检查微基准
+对比旧检查（page.content() 整页小写后搜关键字）和 login_probe（URL + Cookie + 一次 DOM 查询），
+控制台页面按 --rows 生成服务器行来模拟大页面，并验证几个容易误判的页面
+
+用法:
+  python bench/bench_login_probe.py --rows 2000 --iterations 200
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright
+
+from login_probe import probe_login_state, LOGGED_IN, LOGIN_FORM, QUICK_LOGIN, VALIDATION_FAILURE, UNKNOWN
+
+DASH_URL = "https://hosting.zampto.net"
+AUTH_URL = "https://auth.zampto.net/sign-in/password?app_id=bench"
+EMAIL = "bench@example.com"
+
+
+def dashboard_html(rows):
+    servers = "\n".join(
+        f"<tr><td>server-{i}</td><td>Running</td><td><a href='/server?id={i}'>Manage</a></td></tr>"
+        for i in range(rows)
+    )
+    return f"""<html><head><title>Dashboard</title></head><body>
+<h1>Dashboard</h1><p>Welcome back</p><table>{servers}</table></body></html>"""
+
+
+# (名称, URL, HTML, 是否带会话 Cookie, 期望是否已登录, 期望的探测状态)
+CASES = [
+    (
+        "会话过期的控制台登录页（页脚含 server）",
+        DASH_URL + "/",
+        "<html><head><title>Sign in</title></head><body><h1>Sign in</h1>"
+        "<input type='email' name='email'><input type='password' name='password'>"
+        "<footer>Game server hosting</footer></body></html>",
+        False, False, LOGIN_FORM,
+    ),
+    (
+        "控制台域名上的 Cloudflare 验证页（无会话 Cookie）",
+        DASH_URL + "/",
+        "<html><head><title>Just a moment...</title></head><body><h1>hosting.zampto.net</h1>"
+        "<h2>Verifying you are human. This may take a few seconds.</h2>"
+        "<p>hosting.zampto.net needs to review the security of your connection. Cloudflare server</p></body></html>",
+        False, False, UNKNOWN,
+    ),
+    (
+        "验证失败后的快速登录",
+        AUTH_URL + "&secure-failure=validation",
+        f"<html><head><title>Quick login</title></head><body><h1>Quick login</h1><button>{EMAIL}</button></body></html>",
+        False, None, VALIDATION_FAILURE,
+    ),
+    (
+        "accounts 快速登录",
+        "https://accounts.zampto.net/",
+        "<html><head><title>Quick login</title></head><body><h1>Quick login</h1><button>Continue</button></body></html>",
+        False, True, QUICK_LOGIN,
+    ),
+]
+
+
+def legacy_check(page, dash_url):
+    """旧版 check_login_status 的判断方式"""
+    url = page.url
+    if url == dash_url or url.startswith(dash_url + '/'):
+        content = page.content().lower()
+        return any(keyword in content for keyword in ["welcome back", "dashboard", "server"])
+    if "accounts.zampto.net" in url:
+        content = page.content()
+        return "quick login" in content.lower() or "快速登录" in content
+    return None
+
+
+def serve(context, html):
+    context.unroute("**/*")
+    context.route("**/*", lambda route: route.fulfill(status=200, body=html, content_type="text/html"))
+
+
+def timed(func, iterations):
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    durations.sort()
+    return {
+        "mean": sum(durations) / len(durations),
+        "p50": durations[len(durations) // 2],
+        "p90": durations[int(len(durations) * 0.9)],
+    }
+
+
+def format_timing(name, t):
+    return f"  {name:<8} mean {t['mean']:7.2f}ms  p50 {t['p50']:7.2f}ms  p90 {t['p90']:7.2f}ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="登录状态检查微基准")
+    parser.add_argument("--rows", type=int, default=2000, help="控制台页面的服务器行数")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context()
+        page = context.new_page()
+
+        # === 耗时对比：已登录的大控制台页面 ===
+        serve(context, dashboard_html(args.rows))
+        context.add_cookies([{"name": "PHPSESSID", "value": "bench", "url": DASH_URL}])
+        page.goto(DASH_URL + "/")
+        html_kb = len(page.content()) / 1024
+
+        legacy = timed(lambda: legacy_check(page, DASH_URL), args.iterations)
+        probe = timed(lambda: probe_login_state(page, DASH_URL, EMAIL), args.iterations)
+        assert legacy_check(page, DASH_URL) is True
+        assert probe_login_state(page, DASH_URL, EMAIL)["state"] == LOGGED_IN
+
+        print(f"控制台页面: {args.rows} 行, HTML {html_kb:.0f} KB, {args.iterations} 次")
+        print(format_timing("content", legacy))
+        print(format_timing("probe", probe))
+        print(f"  加速 {legacy['mean'] / probe['mean']:.1f}x")
+
+        # === 正确性：容易误判的页面 ===
+        print("\n误判检查:")
+        context.clear_cookies()
+        for name, url, html, session, expected_login, expected_state in CASES:
+            serve(context, html)
+            if session:
+                context.add_cookies([{"name": "PHPSESSID", "value": "bench", "url": DASH_URL}])
+            page.goto(url)
+            old = legacy_check(page, DASH_URL)
+            state = probe_login_state(page, DASH_URL, EMAIL)["state"]
+            old_mark = "-" if expected_login is None else ("✅" if old == expected_login else "❌")
+            new_mark = "✅" if state == expected_state else "❌"
+            print(f"  {name}: 旧检查={old} {old_mark}  探测={state} {new_mark}")
+            context.clear_cookies()
+
+        browser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 Zampto 模拟服务
+auth 站点: identifier → password 两步表单、Login or Sign Up 入口、快速登录页、
+           secure-failure=validation 重定向，以及可配置延迟的 Cloudflare 风格验证页
+dash 站点: 首页和 server?id=…&renew=true JSON 接口
+可注入慢响应和失败，并记录每个请求用于计算各阶段耗时
+
+用法: python bench/mock_zampto.py --cf-delay 2 --fail-rate 0.1
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from html import escape
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+
+MOCK_PASSWORD = os.getenv("MOCK_ZAMPTO_PASSWORD", "mock-password")
+APP_ID = "bmhk6c8qdqxphlyscztgl"
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>{body}</body></html>"""
+
+CHALLENGE_BODY = """
+<h1>Just a moment...</h1>
+<p>Checking your browser before accessing. Verifying you are human. This may take a few seconds.</p>
+<p>Performance &amp; security by Cloudflare</p>
+<script>
+setTimeout(function () {{
+    document.cookie = "cf_clearance={token}; path=/; max-age=3600";
+    location.reload();
+}}, {delay_ms});
+</script>
+"""
+
+
+class MockConfig:
+    def __init__(self, cf_delay=0.0, latency_ms=0, slow_rate=0.0, slow_ms=3000,
+                 fail_rate=0.0, login_fail_rate=0.0, renew_days=3, password=MOCK_PASSWORD, seed=None):
+        self.cf_delay = cf_delay
+        self.latency_ms = latency_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.fail_rate = fail_rate
+        self.login_fail_rate = login_fail_rate
+        self.renew_days = renew_days
+        self.password = password
+        self.random = random.Random(seed)
+
+
+class MockState:
+    """服务端状态：会话、验证令牌、请求事件"""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.sessions = {}       # PHPSESSID -> email
+        self.clearances = set()  # 有效的 cf_clearance
+        self.clients = {}        # mock_client -> email
+        self.events = []
+
+    def event(self, client, kind, **extra):
+        with self.lock:
+            self.events.append({"t": time.time(), "client": client, "kind": kind, **extra})
+
+    def email_of(self, client):
+        with self.lock:
+            return self.clients.get(client)
+
+    def login(self, client, email):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[token] = email
+            self.clients[client] = email
+        return token
+
+    def chance(self, rate):
+        with self.lock:
+            return self.config.random.random() < rate
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockZampto/1.0"
+    protocol_version = "HTTP/1.1"
+
+    # 由 MockZampto 注入
+    state = None
+    site = None
+    auth_base = None
+    dash_base = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # ================= 工具 =================
+    def cookies(self):
+        jar = SimpleCookie(self.headers.get("Cookie", ""))
+        return {k: v.value for k, v in jar.items()}
+
+    def client_id(self):
+        return self.cookies().get("mock_client") or self._new_client
+
+    def form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8") if length else ""
+        return {k: v[0] for k, v in parse_qs(raw).items()}
+
+    def send(self, status, body="", content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if not self.cookies().get("mock_client"):
+            self.send_header("Set-Cookie", f"mock_client={self._new_client}; Path=/")
+        for name, value in (headers or []):
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect(self, location, headers=None):
+        self.send(302, "", headers=[("Location", location)] + list(headers or []))
+
+    def page(self, title, body, status=200):
+        self.send(status, PAGE.format(title=escape(title), body=body))
+
+    def inject_latency(self):
+        config = self.state.config
+        delay = config.latency_ms / 1000
+        if config.slow_rate and self.state.chance(config.slow_rate):
+            delay += config.slow_ms / 1000
+        if delay:
+            time.sleep(delay)
+
+    def cloudflare_passed(self):
+        """没有有效 cf_clearance 时返回验证页"""
+        config = self.state.config
+        if config.cf_delay <= 0:
+            return True
+        clearance = self.cookies().get("cf_clearance")
+        if clearance and clearance in self.state.clearances:
+            return True
+        token = secrets.token_hex(12)
+        with self.state.lock:
+            self.state.clearances.add(token)
+        self.state.event(self.client_id(), "cf_challenge")
+        self.page("Just a moment...", CHALLENGE_BODY.format(token=token, delay_ms=int(config.cf_delay * 1000)), status=403)
+        return False
+
+    # ================= 入口 =================
+    def do_GET(self):
+        self._new_client = secrets.token_hex(8)
+        self.inject_latency()
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        if self.site == "auth":
+            self.auth_get(parsed.path, query)
+        else:
+            self.dash_get(parsed.path, query)
+
+    def do_POST(self):
+        self._new_client = secrets.token_hex(8)
+        self.inject_latency()
+        parsed = urlparse(self.path)
+        if self.site == "auth":
+            self.auth_post(parsed.path, self.form())
+        else:
+            self.send(404, "not found")
+
+    # ================= auth 站点 =================
+    def auth_get(self, path, query):
+        client = self.client_id()
+        if path == "/sign-in":
+            self.state.event(client, "auth_page")
+            self.page("Sign in", f"""
+<h1>Sign in to Zampto</h1>
+<form method="post" action="/sign-in/identifier">
+  <input type="email" name="identifier" placeholder="Email">
+  <button type="submit" name="submit">Login</button>
+</form>
+<p><a href="/sign-in/password?app_id={APP_ID}">Login or Sign Up with Zampto</a></p>
+""")
+        elif path == "/sign-in/password":
+            if not self.cloudflare_passed():
+                return
+            self.state.event(client, "password_page")
+            identifier = escape(query.get("identifier", ""))
+            remembered = self.cookies().get("remember_email")
+            if query.get("secure-failure") == "validation" and remembered:
+                self.page("Quick login", f"""
+<h1>Quick login</h1>
+<form method="post" action="/sign-in/quick">
+  <input type="hidden" name="email" value="{escape(remembered)}">
+  <button type="submit">{escape(remembered)}</button>
+</form>
+""")
+                return
+            self.page("Password", f"""
+<h1>Enter your password</h1>
+<form method="post" action="/sign-in/password">
+  <input type="email" name="email" value="{identifier}" placeholder="Email">
+  <input type="password" name="password" placeholder="Password">
+  <button type="submit" name="submit">Continue</button>
+</form>
+""")
+        else:
+            self.send(404, "not found")
+
+    def auth_post(self, path, form):
+        client = self.client_id()
+        if path == "/sign-in/identifier":
+            self.state.event(client, "identifier_submit")
+            identifier = form.get("identifier", "")
+            self.redirect(f"/sign-in/password?app_id={APP_ID}&identifier={quote(identifier)}",
+                          headers=[("Set-Cookie", f"remember_email={identifier}; Path=/")])
+        elif path == "/sign-in/password":
+            email = form.get("email", "")
+            config = self.state.config
+            if form.get("password") != config.password or self.state.chance(config.login_fail_rate):
+                self.state.event(client, "login_failed", email=email)
+                self.redirect(f"/sign-in/password?app_id={APP_ID}&secure-failure=validation",
+                              headers=[("Set-Cookie", f"remember_email={email}; Path=/")])
+                return
+            self.finish_login(client, email)
+        elif path == "/sign-in/quick":
+            self.finish_login(client, form.get("email", ""))
+        else:
+            self.send(404, "not found")
+
+    def finish_login(self, client, email):
+        token = self.state.login(client, email)
+        self.state.event(client, "login_ok", email=email)
+        self.redirect(f"{self.dash_base}/", headers=[("Set-Cookie", f"PHPSESSID={token}; Path=/")])
+
+    # ================= dash 站点 =================
+    def dash_get(self, path, query):
+        client = self.client_id()
+        token = self.cookies().get("PHPSESSID")
+        with self.state.lock:
+            email = self.state.sessions.get(token)
+        if not email:
+            self.state.event(client, "dash_unauthorized")
+            self.redirect(f"{self.auth_base}/sign-in?app_id={APP_ID}")
+            return
+
+        if path == "/":
+            self.state.event(client, "dash_home", email=email)
+            self.page("Dashboard", f"<h1>Dashboard</h1><p>Welcome back, {escape(email)}</p><p>Your server list</p>")
+        elif path == "/server" and query.get("renew") == "true":
+            self.renew(client, email, query.get("id", ""))
+        elif path == "/server":
+            self.page("Server", f"<h1>Server {escape(query.get('id', ''))}</h1>")
+        else:
+            self.send(404, "not found")
+
+    def renew(self, client, email, server_id):
+        config = self.state.config
+        started = time.time()
+        if self.state.chance(config.fail_rate):
+            self.state.event(client, "renew", email=email, server_id=server_id, ok=False, started=started)
+            self.send(500, json.dumps({"success": False, "error": "injected failure"}), "application/json")
+            return
+
+        now = datetime.now(timezone.utc)
+        body = {
+            "success": True,
+            "renewal": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "nextRenewal": (now + timedelta(days=config.renew_days)).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self.state.event(client, "renew", email=email, server_id=server_id, ok=True, started=started)
+        self.send(200, json.dumps(body), "application/json")
+
+
+class MockZampto:
+    """在本机两个端口上启动 auth 和 dash 站点"""
+
+    def __init__(self, config=None, host="127.0.0.1", auth_port=0, dash_port=0):
+        self.config = config or MockConfig()
+        self.state = MockState(self.config)
+        self.host = host
+        self.servers = {}
+        self.threads = []
+        self.ports = {"auth": auth_port, "dash": dash_port}
+
+    def _make_server(self, site, port):
+        handler = type(f"{site.title()}Handler", (MockHandler,), {"state": self.state, "site": site})
+        server = ThreadingHTTPServer((self.host, port), handler)
+        server.daemon_threads = True
+        return server
+
+    def start(self):
+        for site, port in self.ports.items():
+            self.servers[site] = self._make_server(site, port)
+        for site, server in self.servers.items():
+            self.ports[site] = server.server_address[1]
+        for server in self.servers.values():
+            server.RequestHandlerClass.auth_base = self.auth_base
+            server.RequestHandlerClass.dash_base = self.dash_base
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    @property
+    def auth_base(self):
+        return f"http://{self.host}:{self.ports['auth']}"
+
+    @property
+    def dash_base(self):
+        return f"http://{self.host}:{self.ports['dash']}"
+
+    @property
+    def login_url(self):
+        return f"{self.auth_base}/sign-in?app_id={APP_ID}"
+
+    @property
+    def password_url(self):
+        return f"{self.auth_base}/sign-in/password?app_id={APP_ID}"
+
+    def server_url(self, server_id):
+        return f"{self.dash_base}/server?id={server_id}"
+
+    def reset_events(self):
+        with self.state.lock:
+            self.state.events = []
+
+    def events(self):
+        with self.state.lock:
+            return list(self.state.events)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="本地 Zampto 模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--auth-port", type=int, default=8801)
+    parser.add_argument("--dash-port", type=int, default=8802)
+    parser.add_argument("--cf-delay", type=float, default=0.0, help="Cloudflare 验证页停留秒数，0 表示关闭")
+    parser.add_argument("--latency-ms", type=int, default=0, help="每个请求附加的延迟")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="慢响应比例")
+    parser.add_argument("--slow-ms", type=int, default=3000, help="慢响应附加延迟")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="续期接口失败比例")
+    parser.add_argument("--login-fail-rate", type=float, default=0.0, help="登录验证失败比例")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def config_from_args(args):
+    return MockConfig(
+        cf_delay=args.cf_delay,
+        latency_ms=args.latency_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        fail_rate=args.fail_rate,
+        login_fail_rate=args.login_fail_rate,
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    mock = MockZampto(config_from_args(args), args.host, args.auth_port, args.dash_port).start()
+    print(f"auth: {mock.login_url}")
+    print(f"dash: {mock.dash_base}/")
+    print(f"密码: {mock.config.password}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端延迟基准
+启动本地 Zampto 模拟服务，让 main.py / main_async.py / renew.py / zaprenew.py 跑 N 个账号 × M 台服务器，
+根据服务端记录的请求事件统计各阶段耗时分位数和总耗时
+
+用法:
+  python bench/run_bench.py --scripts main,zaprenew --accounts 3 --servers 2 --runs 3 --cf-delay 2
+  python bench/run_bench.py --scripts zaprenew --fail-rate 0.2 --slow-rate 0.1 --warm
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from mock_zampto import MockZampto, parse_args as mock_parse_args, config_from_args
+
+# 分位数和追踪汇总用同一个实现（最近秩法）
+from tracing import percentile
+
+SCRIPTS = ("main", "main_async", "renew", "zaprenew")
+
+
+def build_accounts(mock, accounts, servers):
+    return [
+        {
+            "email": f"bench{i}@example.com",
+            "password": mock.config.password,
+            "server_ids": [str(1000 * (i + 1) + j) for j in range(servers)],
+        }
+        for i in range(accounts)
+    ]
+
+
+def base_env(mock):
+    env = dict(os.environ)
+    for key in ("TG_BOT_TOKEN", "TG_CHAT_ID"):
+        env.pop(key, None)
+    env.update({
+        "HEADLESS": "true",
+        "PYTHONPATH": REPO_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        "ZAMPTO_URL": mock.dash_base,
+        "ZAMPTO_AUTH_URL": mock.login_url,
+        "ZAMPTO_LOGIN_URL": mock.login_url,
+        "ZAMPTO_ACCOUNTS_URL": mock.password_url,
+        "ZAMPTO_PASSWORD_URL": mock.password_url,
+        "ZAMPTO_DASH_URL": mock.dash_base,
+        "ZAMPTO_SESSION_PROBE_URL": f"{mock.dash_base}/",
+    })
+    return env
+
+
+def commands(script, mock, accounts):
+    """返回 [(env 覆盖, 命令)]；单账号脚本按账号逐个运行，和工作流一致"""
+    python = sys.executable
+    path = os.path.join(REPO_DIR, f"{script}.py")
+    if script == "zaprenew":
+        lines = [f"{a['email']}|{a['password']}|{sid}" for a in accounts for sid in a["server_ids"]]
+        return [({"ZAMPTO_ACCOUNTS": "\n".join(lines)}, [python, path])]
+    if script == "renew":
+        return [
+            ({"ZAMPTO_EMAIL": a["email"], "ZAMPTO_PASSWORD": a["password"], "ZAMPTO_SERVER_ID": sid}, [python, path])
+            for a in accounts for sid in a["server_ids"]
+        ]
+    return [
+        (
+            {
+                "ZAMPTO_EMAIL": a["email"],
+                "ZAMPTO_PASSWORD": a["password"],
+                "ZAMPTO_SERVER_URLS": ",".join(mock.server_url(sid) for sid in a["server_ids"]),
+            },
+            [python, path],
+        )
+        for a in accounts
+    ]
+
+
+def phase_durations(events):
+    """
+    按浏览器客户端把事件分组，计算：
+    login      第一次访问 auth 到登录成功
+    cloudflare 验证页出现到下一次正常页面
+    renew      每次续期请求距上一个事件的间隔（客户端视角的单台续期耗时）
+    """
+    by_client = {}
+    for e in events:
+        by_client.setdefault(e["client"], []).append(e)
+
+    phases = {"login": [], "cloudflare": [], "renew": []}
+    renew_ok = renew_failed = 0
+    for client_events in by_client.values():
+        client_events.sort(key=lambda e: e["t"])
+        first_auth = None
+        challenge = None
+        previous = None
+        for e in client_events:
+            kind = e["kind"]
+            if kind in ("auth_page", "password_page", "cf_challenge", "identifier_submit") and first_auth is None:
+                first_auth = e["t"]
+            if kind == "cf_challenge" and challenge is None:
+                challenge = e["t"]
+            elif kind == "password_page" and challenge is not None:
+                phases["cloudflare"].append(e["t"] - challenge)
+                challenge = None
+            elif kind == "login_ok" and first_auth is not None:
+                phases["login"].append(e["t"] - first_auth)
+                first_auth = None
+            elif kind == "renew":
+                if previous is not None:
+                    phases["renew"].append(e["t"] - previous["t"])
+                if e.get("ok"):
+                    renew_ok += 1
+                else:
+                    renew_failed += 1
+            previous = e
+    return phases, renew_ok, renew_failed
+
+
+def run_script(script, mock, accounts, runs, warm, timeout):
+    workdir = tempfile.mkdtemp(prefix=f"zampto-bench-{script}-")
+    env = base_env(mock)
+    report = {"script": script, "wall": [], "phases": {}, "renew_ok": 0, "renew_failed": 0, "exit_codes": []}
+    try:
+        for run in range(runs):
+            if not warm and run:
+                shutil.rmtree(workdir, ignore_errors=True)
+                os.makedirs(workdir)
+            mock.reset_events()
+            started = time.monotonic()
+            for overrides, cmd in commands(script, mock, accounts):
+                try:
+                    proc = subprocess.run(
+                        cmd, cwd=workdir, env={**env, **overrides},
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout
+                    )
+                    report["exit_codes"].append(proc.returncode)
+                except subprocess.TimeoutExpired:
+                    report["exit_codes"].append("timeout")
+            report["wall"].append(time.monotonic() - started)
+
+            phases, ok, failed = phase_durations(mock.events())
+            for name, values in phases.items():
+                report["phases"].setdefault(name, []).extend(values)
+            report["renew_ok"] += ok
+            report["renew_failed"] += failed
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def format_stats(values):
+    if not values:
+        return "n=0"
+    return (
+        f"n={len(values):<4} p50={percentile(values, 50):7.2f}s "
+        f"p90={percentile(values, 90):7.2f}s p99={percentile(values, 99):7.2f}s max={max(values):7.2f}s"
+    )
+
+
+def print_report(report):
+    print(f"\n=== {report['script']} ===")
+    print(f"  {'total':<10} {format_stats(report['wall'])}")
+    for name, values in report["phases"].items():
+        print(f"  {name:<10} {format_stats(values)}")
+    print(f"  renew ok={report['renew_ok']} failed={report['renew_failed']} exit={report['exit_codes']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Zampto 端到端延迟基准", add_help=False)
+    parser.add_argument("--help", action="help")
+    parser.add_argument("--scripts", default="main,zaprenew", help=f"逗号分隔，可选 {','.join(SCRIPTS)}")
+    parser.add_argument("--accounts", type=int, default=2)
+    parser.add_argument("--servers", type=int, default=2, help="每个账号的服务器数")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--warm", action="store_true", help="多次运行之间保留本地状态（会话、选择器缓存等）")
+    parser.add_argument("--timeout", type=int, default=600, help="单个进程超时秒数")
+    parser.add_argument("--json", dest="json_path", help="把原始结果写入 JSON 文件")
+    args, mock_argv = parser.parse_known_args(argv)
+    # 其余参数交给模拟服务（--cf-delay / --fail-rate 等），端口默认随机
+    mock_args = mock_parse_args(["--auth-port", "0", "--dash-port", "0"] + mock_argv)
+    return args, mock_args
+
+
+def main(argv=None):
+    args, mock_args = parse_args(argv)
+    scripts = [s.strip() for s in args.scripts.split(",") if s.strip()]
+    unknown = [s for s in scripts if s not in SCRIPTS]
+    if unknown:
+        print(f"❌ 未知脚本: {', '.join(unknown)}")
+        sys.exit(2)
+
+    mock = MockZampto(config_from_args(mock_args), mock_args.host, mock_args.auth_port, mock_args.dash_port).start()
+    print(f"模拟服务: auth={mock.auth_base} dash={mock.dash_base}")
+    accounts = build_accounts(mock, args.accounts, args.servers)
+
+    reports = []
+    try:
+        for script in scripts:
+            report = run_script(script, mock, accounts, args.runs, args.warm, args.timeout)
+            print_report(report)
+            reports.append(report)
+    finally:
+        mock.stop()
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻浏览器服务
+在长期运行的主机上启动一个开放 CDP 端口的 Chromium，续期脚本直接连接，
+每个账号使用独立的 browser context，而不是每次冷启动一个浏览器进程；
+守护进程定期做健康检查，浏览器无响应或内存超过上限（且空闲）时自动重启
+
+启动服务:  python browser_service.py
+脚本连接:  ZAMPTO_BROWSER_CDP_URL=http://127.0.0.1:9222 python main.py
+          (Playwright 用 connect_over_cdp，Selenium 用 debuggerAddress)
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import tempfile
+import subprocess
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+# 客户端：配置后脚本连接常驻浏览器，不可用时回退到自行启动
+SERVICE_URL = os.getenv("ZAMPTO_BROWSER_CDP_URL", "").rstrip("/")
+
+# 服务端配置
+SERVICE_PORT = int(os.getenv("ZAMPTO_BROWSER_PORT", "9222"))
+MAX_RSS_MB = int(os.getenv("ZAMPTO_BROWSER_MAX_RSS_MB", "1024"))
+CHECK_INTERVAL = int(os.getenv("ZAMPTO_BROWSER_CHECK_INTERVAL", "30"))
+BROWSER_PATH = os.getenv("ZAMPTO_BROWSER_PATH", "")
+
+BROWSER_ARGS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-blink-features=AutomationControlled",
+    "--window-size=1920,1080",
+    "--no-first-run",
+    "--no-default-browser-check",
+]
+
+
+def _get_json(url, timeout=3):
+    with urlopen(url, timeout=timeout) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def is_healthy(url, timeout=3):
+    """CDP /json/version 能正常返回即认为浏览器健康"""
+    try:
+        return "webSocketDebuggerUrl" in _get_json(f"{url}/json/version", timeout)
+    except Exception:
+        return False
+
+
+def service_endpoint(url=SERVICE_URL):
+    """配置了常驻浏览器且健康时返回 CDP 地址，否则返回 None"""
+    if not url:
+        return None
+    if is_healthy(url):
+        return url
+    print(f"⚠️ 常驻浏览器不可用 ({url})，改为本地启动")
+    return None
+
+
+# ================= Selenium 辅助 =================
+def selenium_attach_options(chrome_options, url):
+    """让 Selenium 连接到已运行的浏览器，启动参数由服务端决定"""
+    chrome_options.add_experimental_option("debuggerAddress", urlparse(url).netloc)
+    return chrome_options
+
+
+def open_isolated_window(driver, previous_context=None):
+    """
+    新建一个独立的 browser context 和窗口并切换过去，返回 context id
+    传入 previous_context 时在切换后销毁旧的 context（账号之间复用 driver）
+    """
+    context_id = driver.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+    target_id = driver.execute_cdp_cmd(
+        "Target.createTarget", {"url": "about:blank", "browserContextId": context_id}
+    )["targetId"]
+    driver.switch_to.window(target_id)
+    if previous_context:
+        close_isolated_window(driver, previous_context)
+    return context_id
+
+
+def close_isolated_window(driver, context_id):
+    try:
+        driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+    except Exception:
+        pass
+
+
+# ================= 服务端 =================
+def find_browser():
+    """优先使用 ZAMPTO_BROWSER_PATH，其次 Playwright 自带的 Chromium，最后找系统浏览器"""
+    if BROWSER_PATH:
+        return BROWSER_PATH
+    try:
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as p:
+            path = p.chromium.executable_path
+        if path and os.path.exists(path):
+            return path
+    except Exception:
+        pass
+    for name in ("chromium", "chromium-browser", "google-chrome", "google-chrome-stable"):
+        path = shutil.which(name)
+        if path:
+            return path
+    raise RuntimeError("❌ 未找到 Chromium，请设置 ZAMPTO_BROWSER_PATH")
+
+
+def process_tree_rss_mb(pid):
+    """统计浏览器主进程及所有子进程的常驻内存（读 /proc，仅 Linux）"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+class BrowserService:
+    def __init__(self, port=SERVICE_PORT, max_rss_mb=MAX_RSS_MB, check_interval=CHECK_INTERVAL):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.max_rss_mb = max_rss_mb
+        self.check_interval = check_interval
+        self.process = None
+        self.profile_dir = None
+        self.restarts = 0
+
+    def log(self, message):
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+    def start(self, timeout=30):
+        self.profile_dir = tempfile.mkdtemp(prefix="zampto-browser-")
+        cmd = [
+            find_browser(),
+            f"--remote-debugging-port={self.port}",
+            "--remote-debugging-address=127.0.0.1",
+            f"--user-data-dir={self.profile_dir}",
+        ] + BROWSER_ARGS + ["about:blank"]
+        started = time.monotonic()
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while time.monotonic() - started < timeout:
+            if is_healthy(self.url, timeout=1):
+                self.log(f"✅ 浏览器已启动 pid={self.process.pid} ({time.monotonic() - started:.1f}s) {self.url}")
+                return True
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.2)
+        self.log("❌ 浏览器启动失败")
+        self.stop()
+        return False
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def restart(self, reason):
+        self.restarts += 1
+        self.log(f"🔄 重启浏览器 (第 {self.restarts} 次): {reason}")
+        self.stop()
+        return self.start()
+
+    def busy(self):
+        """有打开着非空白页面的 target 说明还有脚本在用"""
+        try:
+            targets = _get_json(f"{self.url}/json/list")
+        except Exception:
+            return False
+        return any(t.get("type") == "page" and t.get("url") not in ("about:blank", "") for t in targets)
+
+    def check(self, failures):
+        """一次健康检查，返回连续失败次数"""
+        if self.process is None or self.process.poll() is not None:
+            self.log("⚠️ 浏览器进程已退出")
+            self.stop()
+            self.start()
+            return 0
+
+        if not is_healthy(self.url):
+            failures += 1
+            if failures >= 2:
+                self.restart("CDP 无响应")
+                return 0
+            return failures
+
+        rss = process_tree_rss_mb(self.process.pid)
+        if rss > self.max_rss_mb:
+            if self.busy():
+                self.log(f"⚠️ 内存 {rss:.0f}MB 超过上限 {self.max_rss_mb}MB，等待空闲后重启")
+            else:
+                self.restart(f"内存 {rss:.0f}MB 超过上限 {self.max_rss_mb}MB")
+        return 0
+
+    def serve_forever(self):
+        if not self.start():
+            sys.exit(1)
+        failures = 0
+        while True:
+            time.sleep(self.check_interval)
+            failures = self.check(failures)
+
+
+def main():
+    service = BrowserService()
+
+    def shutdown(signum, frame):
+        service.log("停止常驻浏览器")
+        service.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    service.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cloudflare 验证检测
+在页面内用 MutationObserver 监听 DOM 变化，登录表单出现或验证页消失的那一刻立即返回，
+验证通过后的整页跳转会销毁执行上下文，此时在新页面上重新挂监听，直到总超时；
+是否出现过验证记在 sessionStorage 里，跨越验证页的重新加载
+
+通过验证拿到的 cf_clearance 等 Cookie 和当时的 User-Agent 一起缓存，
+下次运行（Playwright 或 Selenium）直接带上，再次出现验证页时作废
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+
+from session_vault import normalize_cookies
+
+CLOUDFLARE_TIMEOUT = int(os.getenv("ZAMPTO_CLOUDFLARE_TIMEOUT", "25000"))
+CLEARANCE_FILE = os.getenv("ZAMPTO_CLEARANCE_FILE", ".zampto_clearance.json")
+
+# Cloudflare 验证相关的 Cookie
+CLEARANCE_COOKIE = "cf_clearance"
+CLEARANCE_PREFIXES = ("cf_clearance", "__cf", "_cfuvid", "cf_chl")
+
+# Selenium 侧判断当前页是否为验证页
+CHALLENGE_CHECK_SCRIPT = """
+const title = (document.title || '').toLowerCase();
+return ['just a moment', 'attention required'].some((m) => title.includes(m))
+    || !!document.querySelector('#challenge-form, #challenge-running, #cf-challenge-running, .cf-turnstile, iframe[src*="challenges.cloudflare.com"]');
+"""
+
+# 页面内监听脚本，返回 {state, challenge}
+# state: form 登录表单可见 / clear 页面加载完成且没有验证 / timeout 超时
+# challenge: 本标签页是否出现过验证
+WATCH_SCRIPT = """
+([formSelectors, timeoutMs]) => new Promise((resolve) => {
+    const TITLE_MARKERS = ['just a moment', 'attention required'];
+    const TEXT_MARKERS = ['cloudflare', 'verifying', 'checking'];
+    const CHALLENGE_SELECTORS = '#challenge-form, #challenge-running, #cf-challenge-running, .cf-turnstile, iframe[src*="challenges.cloudflare.com"]';
+    const FLAG = 'zampto_cf_challenge';
+    const remember = () => { try { sessionStorage.setItem(FLAG, '1'); } catch (e) {} };
+    const forget = () => { try { sessionStorage.removeItem(FLAG); } catch (e) {} };
+    let challenge = false;
+    try { challenge = sessionStorage.getItem(FLAG) === '1'; } catch (e) {}
+    let done = false;
+    let scheduled = false;
+
+    const state = () => {
+        for (const selector of formSelectors) {
+            const el = document.querySelector(selector);
+            if (el && el.getClientRects().length) return 'form';
+        }
+        const title = (document.title || '').toLowerCase();
+        if (TITLE_MARKERS.some((m) => title.includes(m)) || document.querySelector(CHALLENGE_SELECTORS)) return 'challenge';
+        const text = document.body ? document.body.innerText.slice(0, 2000).toLowerCase() : '';
+        if (TEXT_MARKERS.some((m) => text.includes(m))) return 'challenge';
+        return document.readyState === 'complete' ? 'clear' : 'loading';
+    };
+
+    const finish = (result) => {
+        if (done) return;
+        done = true;
+        observer.disconnect();
+        clearTimeout(timer);
+        document.removeEventListener('readystatechange', schedule);
+        if (result !== 'timeout') forget();
+        resolve({ state: result, challenge });
+    };
+
+    const check = () => {
+        scheduled = false;
+        const current = state();
+        if (current === 'challenge' && !challenge) {
+            challenge = true;
+            remember();
+        }
+        if (current === 'form' || current === 'clear') finish(current);
+    };
+
+    // DOM 变化很密集时合并检查，避免每个 mutation 都读一次 innerText
+    const schedule = () => {
+        if (!scheduled && !done) {
+            scheduled = true;
+            setTimeout(check, 50);
+        }
+    };
+
+    const observer = new MutationObserver(schedule);
+    const timer = setTimeout(() => finish('timeout'), timeoutMs);
+    observer.observe(document, { childList: true, subtree: true, attributes: true, characterData: true });
+    document.addEventListener('readystatechange', schedule);
+    check();
+})
+"""
+
+
+# 监听连续失败（执行上下文被销毁而页面早已加载完）时的退避和上限，避免空转占满 CPU
+RETRY_DELAY = 0.05
+RETRY_DELAY_MAX = 1.0
+MAX_WATCH_FAILURES = 20
+
+
+def _remaining_ms(deadline):
+    return max(0, int((deadline - time.monotonic()) * 1000))
+
+
+def _retry_delay(failures, deadline):
+    """第 failures 次连续失败后重新监听前的等待秒数，不超过剩余时间"""
+    return min(RETRY_DELAY * 2 ** (failures - 1), RETRY_DELAY_MAX, max(0.0, deadline - time.monotonic()))
+
+
+def wait_for_clearance(page, waiter, form_selectors, timeout=CLOUDFLARE_TIMEOUT):
+    """
+    等待验证结束或登录表单出现
+    返回 (state, challenge_seconds)：state 为 form / clear / timeout，
+    challenge_seconds 为验证页停留时间，没有出现验证时为 None
+    """
+    started = time.monotonic()
+    deadline = started + timeout / 1000
+    challenge = False
+    failures = 0
+    while True:
+        remaining = _remaining_ms(deadline)
+        if remaining <= 0 or failures >= MAX_WATCH_FAILURES:
+            state = "timeout"
+            break
+        result = waiter.evaluate(page, WATCH_SCRIPT, [list(form_selectors), remaining], name="cloudflare")
+        challenge = challenge or bool(result and result.get("challenge"))
+        if result and result.get("state") in ("form", "clear", "timeout"):
+            state = result["state"]
+            break
+        # 执行上下文被跳转销毁：等新页面可用后重新监听（页面已关闭时直接结束）
+        if not waiter.load_state(page, "domcontentloaded", timeout=max(1, _remaining_ms(deadline)), name="cloudflare_reload"):
+            state = "timeout"
+            break
+        failures += 1
+        time.sleep(_retry_delay(failures, deadline))
+    return state, (time.monotonic() - started) if challenge else None
+
+
+async def wait_for_clearance_async(page, waiter, form_selectors, timeout=CLOUDFLARE_TIMEOUT):
+    started = time.monotonic()
+    deadline = started + timeout / 1000
+    challenge = False
+    failures = 0
+    while True:
+        remaining = _remaining_ms(deadline)
+        if remaining <= 0 or failures >= MAX_WATCH_FAILURES:
+            state = "timeout"
+            break
+        result = await waiter.evaluate_async(page, WATCH_SCRIPT, [list(form_selectors), remaining], name="cloudflare")
+        challenge = challenge or bool(result and result.get("challenge"))
+        if result and result.get("state") in ("form", "clear", "timeout"):
+            state = result["state"]
+            break
+        if not await waiter.load_state_async(page, "domcontentloaded", timeout=max(1, _remaining_ms(deadline)), name="cloudflare_reload"):
+            state = "timeout"
+            break
+        failures += 1
+        await asyncio.sleep(_retry_delay(failures, deadline))
+    return state, (time.monotonic() - started) if challenge else None
+
+
+def selenium_challenge_seen(driver):
+    """Selenium: 当前页面是否为 Cloudflare 验证页"""
+    try:
+        return bool(driver.execute_script(CHALLENGE_CHECK_SCRIPT))
+    except Exception:
+        return False
+
+
+# ================= 验证 Cookie 缓存 =================
+def is_clearance_cookie(cookie):
+    return cookie.get("name", "").startswith(CLEARANCE_PREFIXES)
+
+
+def _is_expired(cookie, now):
+    expires = cookie.get("expires", -1)
+    return expires not in (None, -1, 0) and expires < now
+
+
+class ClearanceCache:
+    """按 User-Agent 保存验证 Cookie，Cloudflare 的 clearance 和 UA 绑定，换 UA 就会失效"""
+
+    def __init__(self, path=CLEARANCE_FILE):
+        self.path = path
+        self.data = self._load()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _flush(self):
+        """先写临时文件再替换（调用方需持有 self.lock）"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def cookies(self, user_agent):
+        """返回该 UA 仍然有效的验证 Cookie，cf_clearance 已过期时返回空列表"""
+        entry = self.data.get(user_agent) or {}
+        now = time.time()
+        cookies = [c for c in entry.get("cookies", []) if not _is_expired(c, now)]
+        if not any(c["name"] == CLEARANCE_COOKIE for c in cookies):
+            return []
+        return cookies
+
+    def save(self, cookies, user_agent):
+        """从浏览器 Cookie 中取出验证 Cookie 保存，没有 cf_clearance 时不覆盖已有缓存"""
+        cleared = [c for c in normalize_cookies(cookies) if is_clearance_cookie(c)]
+        if not any(c["name"] == CLEARANCE_COOKIE for c in cleared):
+            return False
+        try:
+            with self.lock:
+                self.data[user_agent] = {"cookies": cleared, "saved_at": int(time.time())}
+                self._flush()
+            return True
+        except OSError as e:
+            print(f"⚠️ 保存验证 Cookie 失败: {e}")
+            return False
+
+    def forget(self, user_agent):
+        """验证页再次出现，说明缓存的 clearance 已失效"""
+        with self.lock:
+            if self.data.pop(user_agent, None) is not None:
+                try:
+                    self._flush()
+                except OSError:
+                    pass
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zampto HTTP 续期客户端
+浏览器登录成功后把 Cookie 复制到带连接池的 requests.Session，
+并发请求 ?renew=true 并直接解析 JSON，失败的服务器交回浏览器兜底；
+浏览器续期同样在网络层拿续期响应（Playwright expect_response / Selenium CDP），共用同一套结果解析
+"""
+
+import json
+import time
+import base64
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def parse_server_id(server_url):
+    return server_url.split('id=')[-1] if 'id=' in server_url else "unknown"
+
+
+# 续期请求被重定向说明登录态已丢失（跳回 auth），重试也一样
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def renew_response_matcher(server_id):
+    """只匹配该服务器的续期 URL：id 精确相等（id=21 不匹配 id=2190）且 renew=true"""
+    server_id = str(server_id)
+
+    def matcher(url):
+        query = parse_qs(urlparse(url).query)
+        return query.get("id") == [server_id] and query.get("renew") == ["true"]
+
+    return matcher
+
+
+def build_renew_url(server_url):
+    if '?' in server_url:
+        return f"{server_url}&renew=true"
+    return f"{server_url}?renew=true"
+
+
+def format_renew_result(server_id, json_data, raw=None):
+    """生成和 ZamptoLogin.renew_server 一致的结果字符串"""
+    if json_data.get("success", False):
+        renewal_time = json_data.get("renewal", "")
+        next_renewal = json_data.get("nextRenewal", "")
+        return f"{server_id}: success - renewal: {renewal_time}, next: {next_renewal}"
+    return f"{server_id}: api_failed - {raw if raw is not None else json.dumps(json_data)}"
+
+
+def interpret_renew_response(server_id, status, text):
+    """
+    把续期接口的状态码和响应体转换为 (done, result, json_data)
+    done 为 False 表示没有拿到有效的 JSON 响应
+    """
+    if status is None:
+        return False, f"{server_id}: no_response", None
+
+    if status in REDIRECT_STATUSES:
+        return False, f"{server_id}: session_lost - {status}", None
+
+    if status != 200:
+        return False, f"{server_id}: http_status - {status}", None
+
+    try:
+        json_data = json.loads(text)
+    except (TypeError, ValueError):
+        return False, f"{server_id}: http_not_json", None
+
+    if not isinstance(json_data, dict):
+        return False, f"{server_id}: http_not_json", None
+
+    return True, format_renew_result(server_id, json_data, text.strip()), json_data
+
+
+def build_session(cookies, user_agent, pool_size=8):
+    """用浏览器 Cookie 构建带连接池的会话"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": user_agent,
+        "Accept": "application/json, text/plain, */*",
+    })
+    for c in cookies:
+        session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+    return session
+
+
+def renew_one(session, server_url, timeout=20):
+    """
+    通过 HTTP 续期单个服务器
+    返回 (done, result, json_data)：done 为 False 表示需要浏览器兜底
+    """
+    server_id = parse_server_id(server_url)
+    try:
+        resp = session.get(build_renew_url(server_url), allow_redirects=False, timeout=timeout)
+    except requests.RequestException as e:
+        return False, f"{server_id}: http_error - {e}", None
+
+    return interpret_renew_response(server_id, resp.status_code, resp.text)
+
+
+def renew_all(cookies, server_urls, user_agent, workers=8, timeout=20):
+    """并发续期所有服务器，返回 {server_url: (done, result, json_data)}"""
+    workers = max(1, min(workers, len(server_urls) or 1))
+    session = build_session(cookies, user_agent, pool_size=workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {url: pool.submit(renew_one, session, url, timeout) for url in server_urls}
+            return {url: future.result() for url, future in futures.items()}
+    finally:
+        session.close()
+
+
+# ================= Selenium =================
+def drain_selenium_log(driver, on_entries=None):
+    """
+    导航前清空 performance 日志，避免上一台服务器超时后才到的响应被算到下一台
+    读到的日志同样交给 on_entries（资源统计）
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return
+    if on_entries:
+        on_entries(entries)
+
+
+def capture_selenium_response(driver, matcher, timeout=15000, on_entries=None):
+    """
+    从 performance 日志中找到 URL 匹配的响应，再用 CDP Network.getResponseBody 取响应体
+    返回 (status, body)；重定向返回 (3xx, None)，超时返回 (None, None)
+    需要开启 goog:loggingPrefs performance 日志；读到的日志交给 on_entries（资源统计）
+    """
+    deadline = time.monotonic() + timeout / 1000
+    request_id = status = None
+    while True:
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return None, None
+        if on_entries:
+            on_entries(entries)
+
+        finished = False
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            redirect = params.get("redirectResponse")
+            if method == "Network.requestWillBeSent" and redirect and request_id is None and matcher(redirect.get("url", "")):
+                return redirect.get("status"), None
+            if method == "Network.responseReceived" and request_id is None and matcher(params.get("response", {}).get("url", "")):
+                request_id = params.get("requestId")
+                status = params["response"].get("status")
+            elif method == "Network.loadingFinished" and request_id and params.get("requestId") == request_id:
+                finished = True
+
+        if finished:
+            try:
+                body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except Exception:
+                return status, None
+            if body.get("base64Encoded"):
+                return status, base64.b64decode(body.get("body", "")).decode("utf-8", "replace")
+            return status, body.get("body")
+
+        if time.monotonic() >= deadline:
+            return status, None
+        time.sleep(0.05)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录输入方式
+instant 直接 fill，burst 快速连续按键，human 逐字符随机间隔（原来的 human_like_typing），
+按账号记住网站接受过的最快方式，出现验证失败才退到更慢的方式
+
+登录路径: fast 直接打开密码登录页，full 原来的多步流程；
+按账号记录哪条路径成功，快速路径连续失败后一段时间内直接走完整流程
+"""
+
+import os
+import json
+import time
+import threading
+
+INPUT_PROFILE_FILE = os.getenv("ZAMPTO_INPUT_PROFILE_FILE", ".zampto_input_profiles.json")
+
+# auto: 按账号自动选择; 也可以固定为 instant / burst / human
+INPUT_PROFILE = os.getenv("ZAMPTO_INPUT_PROFILE", "auto").lower()
+
+# 从快到慢
+PROFILES = ("instant", "burst", "human")
+
+# 按键间隔（毫秒），instant 不按键
+BURST_DELAY_MS = 10
+HUMAN_DELAY_RANGE = (50, 150)
+
+MAX_ATTEMPTS = 20
+
+# auto: 先试快速路径，失败自动回退; 也可以固定为 fast / full
+LOGIN_PATH = os.getenv("ZAMPTO_LOGIN_PATH", "auto").lower()
+FAST = "fast"
+FULL = "full"
+# 快速路径连续失败达到次数后，冷却期内不再尝试
+FAST_PATH_MAX_FAILURES = 3
+FAST_PATH_RETRY_DAYS = 7
+
+
+def slower(profile):
+    """返回下一个更慢的方式，已经最慢时不变"""
+    index = PROFILES.index(profile) if profile in PROFILES else 0
+    return PROFILES[min(index + 1, len(PROFILES) - 1)]
+
+
+class InputProfileStore:
+    def __init__(self, path=INPUT_PROFILE_FILE):
+        """初始化，读取本地记录"""
+        self.path = path
+        self.data = self._load()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _flush(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(email):
+        return (email or "").strip().lower()
+
+    def choose(self, email, requested=INPUT_PROFILE):
+        """固定方式直接使用；auto 时使用该账号被接受过的最快方式，没有记录从最快的开始"""
+        if requested in PROFILES:
+            return requested
+        profile = (self.data.get(self._key(email)) or {}).get("profile")
+        return profile if profile in PROFILES else PROFILES[0]
+
+    def use_fast_path(self, email, requested=LOGIN_PATH):
+        """是否先尝试快速路径"""
+        if requested in (FAST, FULL):
+            return requested == FAST
+        entry = self.data.get(self._key(email)) or {}
+        if entry.get("fast_failures", 0) < FAST_PATH_MAX_FAILURES:
+            return True
+        return time.time() - entry.get("fast_failed_at", 0) >= FAST_PATH_RETRY_DAYS * 86400
+
+    def record_path(self, email, path, success):
+        """记录登录路径的结果，成功时保存为该账号的登录路径"""
+        key = self._key(email)
+        with self.lock:
+            entry = self.data.setdefault(key, {})
+            if success:
+                entry["login_path"] = path
+            if path == FAST:
+                if success:
+                    entry["fast_failures"] = 0
+                else:
+                    entry["fast_failures"] = entry.get("fast_failures", 0) + 1
+                    entry["fast_failed_at"] = int(time.time())
+            try:
+                self._flush()
+            except OSError as e:
+                print(f"⚠️ 保存登录路径记录失败: {e}")
+
+    def record(self, email, attempts, accepted=None):
+        """
+        保存本次运行的登录尝试 [{"profile", "outcome"}]
+        accepted 为最终被接受的方式；没有被接受时，被拒绝的方式退到更慢的一档
+        """
+        if not attempts:
+            return
+        key = self._key(email)
+        now = int(time.time())
+        with self.lock:
+            entry = self.data.setdefault(key, {})
+            history = entry.get("attempts", []) + [dict(a, ts=now) for a in attempts]
+            entry["attempts"] = history[-MAX_ATTEMPTS:]
+            if accepted:
+                entry["profile"] = accepted
+            else:
+                rejected = [a["profile"] for a in attempts if a["outcome"] == "rejected"]
+                if rejected:
+                    entry["profile"] = slower(rejected[-1])
+            try:
+                self._flush()
+            except OSError as e:
+                print(f"⚠️ 保存输入方式记录失败: {e}")
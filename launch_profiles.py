@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器启动配置
+compatibility 保持原来的启动方式；minimal-headless 关闭 GPU、扩展、后台网络、组件更新和同步，
+使用小视口，能找到 headless shell 时优先使用
+每次运行记录“启动到第一个页面加载完成”的耗时和能否通过 Cloudflare，
+auto 模式选择通过率合格里最快的配置
+
+查看: python launch_profiles.py [记录文件]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+
+LAUNCH_PROFILE_FILE = os.getenv("ZAMPTO_LAUNCH_PROFILE_FILE", ".zampto_launch_profiles.json")
+
+# compatibility / minimal-headless / auto
+LAUNCH_PROFILE = os.getenv("ZAMPTO_LAUNCH_PROFILE", "compatibility").lower()
+
+# Selenium 使用 headless shell 的可执行文件，不设置时在 PATH 里找 chrome-headless-shell
+HEADLESS_SHELL_PATH = os.getenv("ZAMPTO_HEADLESS_SHELL", "")
+
+COMPATIBILITY = "compatibility"
+MINIMAL = "minimal-headless"
+
+PROFILES = {
+    COMPATIBILITY: {
+        "args": [],
+        "viewport": None,
+        "headless_shell": False,
+        # Selenium 原来的启动参数
+        "selenium_args": [
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--window-size=1920,1080",
+            "--disable-blink-features=AutomationControlled",
+        ],
+    },
+    MINIMAL: {
+        "args": [
+            "--disable-gpu",
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-component-update",
+            "--disable-sync",
+            "--disable-default-apps",
+            "--no-first-run",
+            "--mute-audio",
+        ],
+        "viewport": (800, 600),
+        "headless_shell": True,
+        "selenium_args": [
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--window-size=800,600",
+            "--disable-blink-features=AutomationControlled",
+        ],
+    },
+}
+
+MAX_SAMPLES = 20
+# auto 模式下 Cloudflare 通过率低于该值的配置不参与选择
+MIN_PASS_RATE = 0.9
+
+
+def profile_config(name):
+    return PROFILES.get(name, PROFILES[COMPATIBILITY])
+
+
+# ================= Playwright =================
+def launch_kwargs(name, headless=True):
+    """
+    p.chromium.launch 的参数
+    Playwright 的 headless=True 默认就是 headless shell；compatibility 保持默认启动
+    """
+    config = profile_config(name)
+    kwargs = {"headless": headless}
+    if config["args"]:
+        kwargs["args"] = list(config["args"])
+    return kwargs
+
+
+def context_kwargs(name):
+    """browser.new_context 的额外参数（视口）"""
+    viewport = profile_config(name)["viewport"]
+    return {"viewport": {"width": viewport[0], "height": viewport[1]}} if viewport else {}
+
+
+# ================= Selenium =================
+def find_headless_shell():
+    path = HEADLESS_SHELL_PATH or shutil.which("chrome-headless-shell")
+    return path if path and os.path.exists(path) else None
+
+
+def selenium_launch_options(chrome_options, name):
+    """按配置添加 Selenium 启动参数，返回实际使用的配置名"""
+    config = profile_config(name)
+    for arg in ["--headless"] + config["selenium_args"] + config["args"]:
+        chrome_options.add_argument(arg)
+    if config["headless_shell"]:
+        shell = find_headless_shell()
+        if shell:
+            chrome_options.binary_location = shell
+    return name if name in PROFILES else COMPATIBILITY
+
+
+# ================= 启动耗时记录 =================
+class LaunchTimer:
+    """
+    记录一次运行从启动浏览器到第一个页面加载完成的耗时，以及 Cloudflare 是否通过
+    耗时 = 启动浏览器 + 第一次导航，中间的会话探测、context 创建等不计入
+    """
+
+    def __init__(self):
+        self.profile = None
+        self.started = None
+        self.launch_seconds = None
+        self.navigation_started = None
+        self.first_page_seconds = None
+        self.cloudflare = None
+
+    def start(self, profile):
+        """紧挨着启动浏览器调用"""
+        self.profile = profile
+        self.started = time.monotonic()
+
+    def launched(self):
+        """浏览器启动完成"""
+        if self.started is not None and self.launch_seconds is None:
+            self.launch_seconds = time.monotonic() - self.started
+
+    def navigating(self):
+        """第一次导航开始，只记录第一次"""
+        if self.navigation_started is None:
+            self.navigation_started = time.monotonic()
+
+    def first_page(self):
+        """第一次导航完成，只记录第一次，之后的页面忽略"""
+        if self.started is None or self.first_page_seconds is not None:
+            return
+        now = time.monotonic()
+        if self.launch_seconds is None or self.navigation_started is None:
+            self.first_page_seconds = now - self.started
+        else:
+            self.first_page_seconds = self.launch_seconds + (now - self.navigation_started)
+
+    def cloudflare_result(self, passed):
+        """一次运行里有一次没通过就记为未通过"""
+        self.cloudflare = passed if self.cloudflare is None else (self.cloudflare and passed)
+
+    def save(self, store):
+        if self.profile and self.first_page_seconds is not None:
+            store.record(self.profile, self.first_page_seconds, self.cloudflare)
+            print(f"🚀 启动配置 {self.profile}: 启动到首个页面 {self.first_page_seconds:.2f}s")
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else None
+
+
+class LaunchProfileStore:
+    def __init__(self, path=LAUNCH_PROFILE_FILE):
+        """初始化，读取本地记录"""
+        self.path = path
+        self.data = self._load()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _flush(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def record(self, profile, first_page_seconds, cloudflare=None):
+        """cloudflare: True 通过 / False 未通过 / None 本次没有经过验证（复用了会话）"""
+        with self.lock:
+            samples = self.data.setdefault(profile, [])
+            samples.append({"ts": int(time.time()), "first_page": round(first_page_seconds, 3), "cloudflare": cloudflare})
+            self.data[profile] = samples[-MAX_SAMPLES:]
+            try:
+                self._flush()
+            except OSError as e:
+                print(f"⚠️ 保存启动配置记录失败: {e}")
+
+    def stats(self, profile):
+        """返回 {"runs", "median", "pass_rate"}，没有经过验证的运行不计入通过率"""
+        samples = self.data.get(profile, [])
+        checked = [s["cloudflare"] for s in samples if s.get("cloudflare") is not None]
+        return {
+            "runs": len(samples),
+            "median": _median([s["first_page"] for s in samples]),
+            "pass_rate": sum(checked) / len(checked) if checked else None,
+        }
+
+    def choose(self, requested=LAUNCH_PROFILE):
+        """
+        指定了配置直接使用；auto 时先把还没有记录的配置各试一次，
+        之后在 Cloudflare 通过率合格（或还没遇到过验证）的配置里选最快的，都不合格时用 compatibility
+        """
+        if requested in PROFILES:
+            return requested
+        for name in PROFILES:
+            if not self.stats(name)["runs"]:
+                return name
+        candidates = []
+        for name in PROFILES:
+            stats = self.stats(name)
+            if stats["pass_rate"] is not None and stats["pass_rate"] < MIN_PASS_RATE:
+                continue
+            candidates.append((stats["median"], name))
+        return min(candidates)[1] if candidates else COMPATIBILITY
+
+    def format_summary(self):
+        lines = []
+        for name in PROFILES:
+            stats = self.stats(name)
+            if not stats["runs"]:
+                lines.append(f"  {name:<18} 无记录")
+                continue
+            rate = f"{stats['pass_rate']:.0%}" if stats["pass_rate"] is not None else "-"
+            lines.append(f"  {name:<18} {stats['runs']:>3} 次  首页中位数 {stats['median']:.2f}s  Cloudflare 通过率 {rate}")
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    store = LaunchProfileStore(argv[0] if argv else LAUNCH_PROFILE_FILE)
+    print("启动配置统计:")
+    print(store.format_summary())
+    print(f"auto 选择: {store.choose('auto')}")
+
+
+if __name__ == "__main__":
+    main()
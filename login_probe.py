@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录状态探测
+只看 URL、会话 Cookie 和一次定向 DOM 查询，判断当前处于
+已登录 / 快速登录 / 验证失败 / 登录表单 / 未知，
+替代 page.content() 后对整页 HTML 做关键字搜索
+"""
+
+LOGGED_IN = "logged_in"
+QUICK_LOGIN = "quick_login"
+VALIDATION_FAILURE = "validation_failure"
+LOGIN_FORM = "login_form"
+UNKNOWN = "unknown"
+
+SESSION_COOKIES = ("PHPSESSID",)
+
+# 一次 evaluate 完成全部 DOM 检查，不序列化整页
+PROBE_SCRIPT = """
+(email) => {
+    const visible = (el) => !!el && el.getClientRects().length > 0;
+    const form = visible(document.querySelector(
+        'input[type="password"], input[name="password"], input[type="email"], input[name="email"], input[name="identifier"]'
+    ));
+    const heading = document.querySelector('h1, h2');
+    const headingText = heading ? heading.textContent.trim().toLowerCase() : '';
+    // 控制台特有的元素：服务器管理链接或退出登录链接，标题本身不算（验证页、错误页也有标题）
+    const dashboard = !form && !!document.querySelector(
+        'a[href*="server?id="], a[href*="logout"], a[href*="sign-out"], form[action*="logout"]'
+    );
+    const title = (document.title || '').toLowerCase();
+    const quick = ['quick login', '快速登录'].some((m) => title.includes(m) || headingText.includes(m));
+    const needle = (email || '').toLowerCase();
+    const account = quick && !!needle && Array.from(
+        document.querySelectorAll('button, [role="button"], a')
+    ).some((el) => el.textContent.toLowerCase().includes(needle));
+    return { form, quick, account, dashboard, heading: !!headingText };
+}
+"""
+
+
+def on_site(url, base_url):
+    return url == base_url or url.startswith(base_url.rstrip("/") + "/")
+
+
+def classify(url, dom, has_session, dash_url):
+    """根据 URL、DOM 探测结果和是否有会话 Cookie 得出登录状态"""
+    if "secure-failure=validation" in url:
+        return VALIDATION_FAILURE
+    if on_site(url, dash_url):
+        # 需要会话 Cookie 或控制台特有元素；Cloudflare 验证页、错误页、维护页只有标题，记为未知
+        if dom.get("form"):
+            return LOGIN_FORM
+        return LOGGED_IN if has_session or dom.get("dashboard") else UNKNOWN
+    if dom.get("quick"):
+        return QUICK_LOGIN
+    if dom.get("form"):
+        return LOGIN_FORM
+    return UNKNOWN
+
+
+def _has_session(cookies):
+    return any(c.get("name") in SESSION_COOKIES for c in cookies)
+
+
+def probe_login_state(page, dash_url, email=""):
+    """返回 {"state", "form", "quick", "account", "dashboard", "heading", "session"}"""
+    url = page.url
+    dom = page.evaluate(PROBE_SCRIPT, email)
+    has_session = on_site(url, dash_url) and _has_session(page.context.cookies(url))
+    return {"state": classify(url, dom, has_session, dash_url), "session": has_session, **dom}
+
+
+async def probe_login_state_async(page, dash_url, email=""):
+    url = page.url
+    dom = await page.evaluate(PROBE_SCRIPT, email)
+    has_session = on_site(url, dash_url) and _has_session(await page.context.cookies(url))
+    return {"state": classify(url, dom, has_session, dash_url), "session": has_session, **dom}
@@ -3,67 +3,213 @@
 """
 Zampto 登录脚本 - 直接URL续期版本
 通过添加renew=true参数直接续期，并输出原始结果
+
+多账号: ZAMPTO_MULTI_ACCOUNTS 每行一个账号 "邮箱|密码|服务器URL1,服务器URL2"，
+所有账号共用一个浏览器，每个账号在独立的 browser context 中登录续期
 """
 
 import os
 import sys
 import time
-import json
 import random
 from datetime import datetime
 from playwright.sync_api import sync_playwright, TimeoutError
 
+from session_vault import SessionVault
+from browser_service import service_endpoint
+from cloudflare import ClearanceCache, wait_for_clearance
+from screenshots import ScreenshotWriter, capture_playwright, should_capture, image_path
+from launch_profiles import LaunchProfileStore, LaunchTimer, launch_kwargs, context_kwargs
+from input_profiles import InputProfileStore, slower, BURST_DELAY_MS, HUMAN_DELAY_RANGE, FAST, FULL
+from login_probe import probe_login_state, on_site, LOGGED_IN, QUICK_LOGIN, VALIDATION_FAILURE
+from tracing import Tracer, renew_outcome, mask_email
+from waits import Waiter
+from selector_cache import SelectorCache
+from resource_policy import ResourcePolicy
+from renewal_state import RenewalStateStore, SCHEDULE_MODE, RENEW_WINDOW_HOURS
+from http_renew import build_renew_url, interpret_renew_response, parse_server_id, renew_all, renew_response_matcher
+from run_history import RunHistory, result_status
+from run_planner import RunPlanner, renew_settled, LOGIN_ATTEMPTS, RENEW_ATTEMPTS, BUDGET, CIRCUIT_OPEN
+from sharding import select_shard, is_sharded, write_partial, load_partials, SHARD_INDEX, SHARD_COUNT, SHARD_DIR, MERGE_FLAG
+
+# 多账号配置
+MULTI_ACCOUNTS_RAW = os.getenv('ZAMPTO_MULTI_ACCOUNTS', '')
+
+
+def parse_accounts(raw=MULTI_ACCOUNTS_RAW):
+    """解析多账号配置，每行 "邮箱|密码|服务器URL1,服务器URL2"，忽略空行和 # 注释"""
+    accounts = []
+    for line in raw.strip().splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = [x.strip() for x in line.split('|')]
+        if len(parts) != 3:
+            raise ValueError(f"❌ 多账号配置格式错误: {mask_email(parts[0])}")
+        email, password, server_urls = parts
+        accounts.append({"email": email, "password": password, "server_urls": server_urls})
+    return accounts
+
 
 class ZamptoLogin:
-    def __init__(self):
-        """初始化，从环境变量读取配置"""
+    # 登录表单选择器，按优先级排列
+    EMAIL_SELECTORS = ['input[name="email"]', 'input[type="email"]']
+    PASSWORD_SELECTORS = ['input[name="password"]', 'input[type="password"]']
+    SUBMIT_SELECTORS = ['button[type="submit"]']
+    LOGIN_BUTTON_SELECTORS = [
+        'button:has-text("Login or Sign Up with Zampto")',
+        'a:has-text("Login or Sign Up with Zampto")',
+        '//button[contains(text(), "Login")]',
+        '//a[contains(text(), "Login")]'
+    ]
+    # 快速登录界面的账户选择按钮，{email} 在解析时代入，选择器缓存里只保存模板
+    ACCOUNT_SELECTORS = [
+        'button:has-text("{email}")',
+        'div:has-text("{email}")',
+        '//*[contains(text(), "{email}")]/ancestor::button',
+        '//*[contains(text(), "{email}")]/ancestor::div[contains(@class, "button")]',
+        'button:has-text("Continue")',
+        'button:has-text("Log in")',
+        'button:has-text("使用此账户")'
+    ]
+    
+    def __init__(self, email=None, password=None, server_urls=None, shard=True):
+        """初始化，从环境变量读取配置；多账号时由调用方传入账号和服务器列表"""
         self.url = os.getenv('ZAMPTO_URL', 'https://hosting.zampto.net')
-        self.server_urls = os.getenv('ZAMPTO_SERVER_URLS', '')
+        self.server_urls = os.getenv('ZAMPTO_SERVER_URLS', '') if server_urls is None else server_urls
         self.auth_url = os.getenv('ZAMPTO_AUTH_URL', 'https://auth.zampto.net/sign-in?app_id=bmhk6c8qdqxphlyscztgl')
         self.accounts_url = os.getenv('ZAMPTO_ACCOUNTS_URL', 'https://auth.zampto.net/sign-in/password?app_id=bmhk6c8qdqxphlyscztgl')
         
         # 获取认证信息
-        self.email = os.getenv('ZAMPTO_EMAIL', '')
-        self.password = os.getenv('ZAMPTO_PASSWORD', '')
+        self.email = os.getenv('ZAMPTO_EMAIL', '') if email is None else email
+        self.password = os.getenv('ZAMPTO_PASSWORD', '') if password is None else password
+        self.log_prefix = ""
         
         # 浏览器配置
         self.headless = os.getenv('HEADLESS', 'true').lower() == 'true'
         self.user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         
+        # 续期模式: browser 逐个在浏览器中续期, http 登录后用HTTP并发续期
+        self.renew_mode = os.getenv('ZAMPTO_RENEW_MODE', 'browser').lower()
+        self.http_workers = int(os.getenv('ZAMPTO_HTTP_WORKERS', '8'))
+        
+        # 等待层，记录每次等待的实际耗时
+        self.waiter = Waiter()
+        
+        # 选择器缓存，记住每个表单角色上次命中的选择器
+        self.selectors = SelectorCache()
+        
+        # 资源拦截策略，不加载图片、字体、样式表和统计脚本
+        self.resource_policy = ResourcePolicy()
+        
+        # 续期状态，调度模式下跳过未到期的服务器
+        self.renewal_state = RenewalStateStore()
+        self.schedule_mode = SCHEDULE_MODE
+        self.renew_window_hours = RENEW_WINDOW_HOURS
+        
+        # 会话保险箱，保存登录态供下次运行复用
+        self.vault = SessionVault()
+        
+        # Cloudflare 验证 Cookie 缓存，和 user_agent 绑定
+        self.clearance = ClearanceCache()
+        
+        # 浏览器启动配置，记录启动到首个页面的耗时
+        self.launch_profiles = LaunchProfileStore()
+        self.launch_profile = self.launch_profiles.choose()
+        self.launch_timer = LaunchTimer()
+        
+        # 调试截图按策略截取，后台线程写文件
+        self.screenshots = ScreenshotWriter()
+        
+        # 阶段耗时追踪，写入 JSONL 追踪文件
+        self.tracer = Tracer("main")
+        
+        # 运行历史，每台服务器每次运行一行，README 从这里生成
+        self.history = RunHistory()
+        self.server_durations = {}
+        
+        # 运行计划：总时限、重试退避和账号熔断
+        self.planner = RunPlanner()
+        
+        # 登录输入方式，按账号使用网站接受过的最快方式
+        self.input_profiles = InputProfileStore()
+        self.input_profile = self.input_profiles.choose(self.email)
+        self.login_attempts = []
+        
         # 解析服务器URL列表
         self.server_list = []
         if self.server_urls:
             self.server_list = [url.strip() for url in self.server_urls.split(',') if url.strip()]
+        
+        # 分片：按服务器ID哈希分配，每台机器只续期属于自己的那一片
+        self.shard_total = len(self.server_list)
+        if shard and is_sharded():
+            self.server_list = select_shard(self.server_list, key=parse_server_id)
+            self.log(f"🧩 分片 {SHARD_INDEX + 1}/{SHARD_COUNT}: {len(self.server_list)}/{self.shard_total} 个服务器")
     
     def log(self, message, level="INFO"):
         """日志输出"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"[{timestamp}] {level}: {message}")
+        print(f"[{timestamp}] {level}: {self.log_prefix}{message}")
+    
+    def share_state(self, other):
+        """多账号时共用同一份状态存储，避免各自读写同一个文件互相覆盖"""
+        for name in ("waiter", "selectors", "resource_policy", "renewal_state", "vault",
+                     "clearance", "tracer", "input_profiles", "history", "planner",
+                     "launch_profiles", "launch_profile", "launch_timer", "screenshots"):
+            setattr(self, name, getattr(other, name))
+        self.input_profile = self.input_profiles.choose(self.email)
+        self.log_prefix = f"[{mask_email(self.email)}] "
     
     def has_email_auth(self):
         """检查是否有邮箱密码认证信息"""
         return bool(self.email and self.password)
     
+    def wait_for_page(self, page, timeout=10000):
+        """goto之后等待页面加载完成，替代固定等待"""
+        return self.waiter.load_state(page, "load", timeout=timeout, name="page_load")
+    
+    def wait_after_submit(self, page, timeout=15000):
+        """提交表单后等待离开登录页（或出现验证失败重定向）"""
+        left = self.waiter.url(
+            page,
+            lambda url: "/sign-in" not in url or "secure-failure" in url,
+            timeout=timeout,
+            name="submit_redirect"
+        )
+        if left:
+            self.wait_for_page(page)
+        return left
+    
+    def find_login_form(self, page):
+        """一次DOM查询找到邮箱、密码输入框和提交按钮"""
+        found = self.selectors.resolve_many(page, {
+            "email": self.EMAIL_SELECTORS,
+            "password": self.PASSWORD_SELECTORS,
+            "submit": self.SUBMIT_SELECTORS,
+        })
+        return found["email"][0], found["password"][0], found["submit"][0]
+    
     def check_login_status(self, page):
-        """检查是否已登录到hosting页面"""
+        """检查是否已登录到hosting页面（只看URL、Cookie和一次DOM查询）"""
         try:
             current_url = page.url
             self.log(f"检查登录状态，当前URL: {current_url}")
+            probe = probe_login_state(page, self.url, self.email)
+            state = probe["state"]
             
             # 情况1: 已经在hosting首页
-            if current_url == self.url or current_url.startswith(self.url + '/'):
-                content = page.content().lower()
-                if any(keyword in content for keyword in ["welcome back", "dashboard", "server"]):
-                    self.log("✅ 已登录到hosting首页")
-                    return True
-                else:
-                    self.log("⚠️ 在hosting页面但未检测到登录迹象")
-                    return False
+            if state == LOGGED_IN:
+                self.log("✅ 已登录到hosting首页")
+                return True
+            
+            elif on_site(current_url, self.url):
+                self.log("⚠️ 在hosting页面但未检测到登录迹象")
+                return False
             
             # 情况2: 在accounts页面但显示快速登录（已登录状态）
             elif "accounts.zampto.net" in current_url:
-                content = page.content()
-                if "quick login" in content.lower() or "快速登录" in content:
+                if state == QUICK_LOGIN:
                     self.log("✅ 检测到已登录到accounts页面（快速登录界面）")
                     return True
                 else:
@@ -71,32 +217,31 @@ class ZamptoLogin:
                     return False
             
             # 情况3: 验证失败重定向
-            elif "secure-failure=validation" in current_url:
+            elif state == VALIDATION_FAILURE:
                 self.log("⚠️ 检测到验证失败重定向，尝试处理...")
-                return self.handle_validation_failure(page)
+                self.reject_input_profile()
+                return self.handle_validation_failure(page, probe)
             
             else:
-                self.log(f"❌ 未知页面状态: {current_url}")
+                self.log(f"❌ 未知页面状态: {current_url} ({state})")
                 return False
                 
         except Exception as e:
             self.log(f"检查登录状态时出错: {e}", "ERROR")
             return False
     
-    def handle_validation_failure(self, page):
+    def handle_validation_failure(self, page, probe=None):
         """处理验证失败的重定向"""
         try:
             self.log("处理验证失败重定向...")
-            
-            # 保存当前页面状态用于分析
-            content = page.content()
+            probe = probe or probe_login_state(page, self.url, self.email)
             
             # 检查是否是快速登录界面
-            if "quick login" in content.lower() and self.email.lower() in content.lower():
+            if probe["quick"] and probe["account"]:
                 self.log("✅ 检测到快速登录界面，尝试选择当前账户")
                 return self.select_current_account_in_quick_login(page)
-            # 检查页面内容，确定具体的失败原因
-            elif "email" in content.lower() or "password" in content.lower():
+            # 仍有登录表单，重新填写
+            elif probe["form"]:
                 self.log("⚠️ 验证失败但仍有登录表单，尝试重新登录")
                 return self.retry_login(page)
             else:
@@ -112,46 +257,32 @@ class ZamptoLogin:
         try:
             self.log("在快速登录界面选择当前账户...")
             
-            # 查找包含邮箱的账户选择按钮
-            account_selectors = [
-                f'button:has-text("{self.email}")',
-                f'div:has-text("{self.email}")',
-                f'//*[contains(text(), "{self.email}")]/ancestor::button',
-                f'//*[contains(text(), "{self.email}")]/ancestor::div[contains(@class, "button")]',
-                'button:has-text("Continue")',
-                'button:has-text("Log in")',
-                'button:has-text("使用此账户")'
-            ]
-            
-            for selector in account_selectors:
+            element, selector = self.selectors.resolve(
+                page, "account_picker", self.ACCOUNT_SELECTORS, visible=True, values={"email": self.email}
+            )
+            if element:
                 try:
-                    if selector.startswith('//'):
-                        elements = page.locator(f'xpath={selector}')
-                    else:
-                        elements = page.locator(selector)
+                    self.log(f"找到账户选择元素: {selector}")
+                    previous_url = page.url
+                    element.click()
+                    self.waiter.url(page, lambda url: url != previous_url, timeout=10000, name="account_select")
+                    self.wait_for_page(page)
                     
-                    if elements.count() > 0:
-                        element = elements.first
-                        if element.is_visible():
-                            self.log(f"找到账户选择元素: {selector}")
-                            element.click()
-                            time.sleep(3)
-                            
-                            # 检查是否成功跳转
-                            if self.check_login_status(page):
-                                return True
-                            break
+                    # 检查是否成功跳转
+                    if self.check_login_status(page):
+                        return True
                 except Exception as e:
                     self.log(f"尝试选择器 {selector} 时出错: {e}", "DEBUG")
-                    continue
             
-            self.log("❌ 未找到合适的账户选择按钮，尝试截图分析")
-            # 保存截图用于调试
-            try:
-                page.screenshot(path="quick_login_debug.png")
-                self.log("已保存截图: quick_login_debug.png")
-            except:
-                pass
+            self.log("❌ 未找到合适的账户选择按钮")
+            # 按截图策略保存调试截图，只截视口，写文件在后台进行
+            if should_capture(False):
+                try:
+                    with self.tracer.span("screenshot", account=self.email):
+                        data = capture_playwright(page)
+                    self.screenshots.submit(data, image_path("quick_login_debug"), lambda path: self.log(f"已保存截图: {path}"))
+                except Exception:
+                    pass
             
             return False
             
@@ -164,67 +295,34 @@ class ZamptoLogin:
         try:
             self.log("重新尝试登录...")
             
-            # 重新查找登录表单元素
-            email_selectors = ['input[name="email"]', 'input[type="email"]']
-            password_selectors = ['input[name="password"]', 'input[type="password"]']
-            submit_selectors = ['button[type="submit"]']
-            
-            # 查找并填写表单
-            email_field = None
-            for selector in email_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        email_field = page.locator(selector).first
-                        break
-                except:
-                    continue
+            # 重新查找并填写表单
+            email_field, password_field, submit_button = self.find_login_form(page)
             
             if not email_field:
                 self.log("❌ 重新登录: 未找到邮箱输入框")
                 return False
             
-            password_field = None
-            for selector in password_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        password_field = page.locator(selector).first
-                        break
-                except:
-                    continue
-            
             if not password_field:
                 self.log("❌ 重新登录: 未找到密码输入框")
                 return False
             
-            submit_button = None
-            for selector in submit_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        submit_button = page.locator(selector).first
-                        break
-                except:
-                    continue
-            
             if not submit_button:
                 self.log("❌ 重新登录: 未找到提交按钮")
                 return False
             
             # 清除字段并重新填写
             self.log("重新填写登录信息...")
+            self.start_login_attempt()
             email_field.click()
-            email_field.fill('')
-            self.human_like_typing(email_field, self.email)
+            self.type_text(email_field, self.email)
             
             password_field.click()
-            password_field.fill('')
-            self.human_like_typing(password_field, self.password)
-            
-            time.sleep(1)
+            self.type_text(password_field, self.password)
             
             # 重新提交
             self.log("重新提交登录表单...")
             submit_button.click()
-            time.sleep(5)
+            self.wait_after_submit(page)
             
             # 检查结果
             return self.check_login_status(page)
@@ -240,7 +338,7 @@ class ZamptoLogin:
             
             # 方法1: 直接访问hosting首页
             page.goto(self.url, wait_until="domcontentloaded")
-            time.sleep(3)
+            self.wait_for_page(page)
             
             if self.check_login_status(page):
                 self.log("✅ 直接访问首页成功")
@@ -249,7 +347,7 @@ class ZamptoLogin:
             # 方法2: 访问hosting auth页面
             self.log("尝试访问hosting auth页面...")
             page.goto(self.auth_url, wait_until="domcontentloaded")
-            time.sleep(3)
+            self.wait_for_page(page)
             
             if self.check_login_status(page):
                 self.log("✅ 通过auth页面跳转成功")
@@ -257,7 +355,7 @@ class ZamptoLogin:
             
             # 方法3: 检查是否有重定向或自动跳转
             self.log("检查是否有自动跳转...")
-            time.sleep(5)
+            self.waiter.url(page, lambda url: url.startswith(self.url), timeout=5000, name="auto_redirect")
             
             if self.check_login_status(page):
                 self.log("✅ 自动跳转成功")
@@ -277,7 +375,7 @@ class ZamptoLogin:
             
             # 尝试直接访问hosting首页
             page.goto(self.url, wait_until="domcontentloaded")
-            time.sleep(3)
+            self.wait_for_page(page)
             
             if self.check_login_status(page):
                 self.log("✅ 直接跳转到hosting成功")
@@ -286,7 +384,7 @@ class ZamptoLogin:
             # 如果还在accounts页面，尝试访问auth页面
             if "accounts.zampto.net" in page.url:
                 page.goto(self.auth_url, wait_until="domcontentloaded")
-                time.sleep(3)
+                self.wait_for_page(page)
                 
                 if self.check_login_status(page):
                     self.log("✅ 通过auth页面跳转成功")
@@ -300,112 +398,126 @@ class ZamptoLogin:
             return False
     
     def handle_cloudflare(self, page):
-        """处理Cloudflare验证"""
-        try:
-            self.log("检查Cloudflare验证...")
-            
-            # 简单的等待策略
-            time.sleep(5)
-            
-            # 检查页面内容
-            content = page.content().lower()
-            if "cloudflare" in content or "verifying" in content or "checking" in content:
-                self.log("⚠️ 检测到Cloudflare验证，等待完成...")
-                # 等待最多20秒
-                for i in range(20):
-                    time.sleep(1)
-                    content = page.content().lower()
-                    if "email" in content or "username" in content or "password" in content:
-                        self.log("✅ Cloudflare验证完成")
-                        return True
+        """处理Cloudflare验证：页面内监听，表单出现或验证消失立即返回"""
+        with self.tracer.span("handle_cloudflare", account=self.email) as span:
+            try:
+                self.log("检查Cloudflare验证...")
+                state, challenge_seconds = wait_for_clearance(
+                    page, self.waiter, self.EMAIL_SELECTORS + self.PASSWORD_SELECTORS
+                )
+                passed = self.report_cloudflare(span, state, challenge_seconds)
+                if passed:
+                    self.clearance.save(page.context.cookies(), self.user_agent)
+                return passed
                 
-                self.log("❌ Cloudflare验证超时")
+            except Exception as e:
+                self.log(f"处理Cloudflare时出错: {e}", "ERROR")
+                span["outcome"] = "error"
                 return False
-            
-            return True
-            
-        except Exception as e:
-            self.log(f"处理Cloudflare时出错: {e}", "ERROR")
+    
+    def restore_clearance(self, context):
+        """把缓存的 Cloudflare 验证 Cookie 加入 context"""
+        cookies = self.clearance.cookies(self.user_agent)
+        if cookies:
+            self.log(f"♻️ 复用缓存的 Cloudflare 验证 Cookie ({len(cookies)} 个)")
+            context.add_cookies(cookies)
+        return cookies
+    
+    def report_cloudflare(self, span, state, challenge_seconds):
+        """记录验证结果和验证页停留时间，区分验证慢还是脚本自身慢"""
+        span["outcome"] = "failed" if state == "timeout" else "ok"
+        span["state"] = state
+        span["challenge_seconds"] = round(challenge_seconds, 3) if challenge_seconds is not None else None
+        self.launch_timer.cloudflare_result(state != "timeout")
+        if challenge_seconds is not None:
+            # 又出现了验证页，缓存的 clearance 已经不能用
+            self.clearance.forget(self.user_agent)
+        if state == "timeout":
+            self.log("❌ Cloudflare验证超时")
             return False
+        if challenge_seconds is not None:
+            self.log(f"✅ Cloudflare验证完成，耗时 {challenge_seconds:.1f}s")
+        return True
     
-    def human_like_typing(self, element, text, delay_range=(50, 150)):
+    def human_like_typing(self, element, text, delay_range=HUMAN_DELAY_RANGE):
         """模拟人类输入"""
         for char in text:
             element.press(char)
             time.sleep(random.uniform(delay_range[0]/1000, delay_range[1]/1000))
     
+    def type_text(self, element, text):
+        """按当前输入方式填写输入框"""
+        if self.input_profile == "instant":
+            element.fill(text)
+            return
+        element.fill('')
+        if self.input_profile == "burst":
+            element.press_sequentially(text, delay=BURST_DELAY_MS)
+        else:
+            self.human_like_typing(element, text)
+    
+    def start_login_attempt(self):
+        """记录一次登录尝试使用的输入方式"""
+        self.login_attempts.append({"profile": self.input_profile, "outcome": "pending"})
+        self.log(f"输入方式: {self.input_profile}")
+    
+    def reject_input_profile(self):
+        """验证失败：本次尝试记为被拒绝，之后的重试改用更慢的输入方式"""
+        if not self.login_attempts or self.login_attempts[-1]["outcome"] != "pending":
+            return
+        self.login_attempts[-1]["outcome"] = "rejected"
+        previous, self.input_profile = self.input_profile, slower(self.input_profile)
+        if self.input_profile != previous:
+            self.log(f"⚠️ 输入方式 {previous} 未被接受，改用 {self.input_profile}")
+    
+    def finish_login_attempts(self, success):
+        """保存本次运行的登录尝试，成功时记住最后使用的输入方式"""
+        accepted = None
+        if success and self.login_attempts and self.login_attempts[-1]["outcome"] == "pending":
+            self.login_attempts[-1]["outcome"] = "accepted"
+            accepted = self.login_attempts[-1]["profile"]
+        for attempt in self.login_attempts:
+            if attempt["outcome"] == "pending":
+                attempt["outcome"] = "failed"
+        self.input_profiles.record(self.email, self.login_attempts, accepted)
+    
     def perform_login(self, page):
         """执行登录操作"""
         try:
             self.log("执行登录操作...")
             
-            # 查找登录表单元素
-            email_selectors = ['input[name="email"]', 'input[type="email"]']
-            password_selectors = ['input[name="password"]', 'input[type="password"]']
-            submit_selectors = ['button[type="submit"]']
-            
             # 等待表单加载
-            time.sleep(2)
+            self.waiter.selector(page, self.EMAIL_SELECTORS, timeout=10000, name="login_form")
             
-            # 查找邮箱输入框
-            email_field = None
-            for selector in email_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        email_field = page.locator(selector).first
-                        break
-                except:
-                    continue
+            # 查找登录表单元素
+            email_field, password_field, submit_button = self.find_login_form(page)
             
             if not email_field:
                 self.log("❌ 未找到邮箱输入框")
                 return False
             
-            # 查找密码输入框
-            password_field = None
-            for selector in password_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        password_field = page.locator(selector).first
-                        break
-                except:
-                    continue
-            
             if not password_field:
                 self.log("❌ 未找到密码输入框")
                 return False
             
-            # 查找提交按钮
-            submit_button = None
-            for selector in submit_selectors:
-                try:
-                    if page.locator(selector).count() > 0:
-                        submit_button = page.locator(selector).first
-                        break
-                except:
-                    continue
-            
             if not submit_button:
                 self.log("❌ 未找到提交按钮")
                 return False
             
             # 填写登录信息
+            self.start_login_attempt()
             self.log("填写邮箱...")
             email_field.click()
-            email_field.fill('')
-            self.human_like_typing(email_field, self.email)
+            self.type_text(email_field, self.email)
             
             self.log("填写密码...")
             password_field.click()
-            password_field.fill('')
-            self.human_like_typing(password_field, self.password)
-            
-            time.sleep(1)
+            self.type_text(password_field, self.password)
             
             # 点击登录按钮
             self.log("点击登录按钮...")
             submit_button.click()
-            time.sleep(5)
+            self.wait_after_submit(page)
             
             # 检查登录结果
             return self.check_login_status(page)
@@ -415,6 +527,39 @@ class ZamptoLogin:
             return False
     
     def login_with_email(self, page):
+        """登录：先走密码登录页快速路径，失败自动回退到完整流程，记录成功的路径"""
+        if self.input_profiles.use_fast_path(self.email):
+            success = self.tracer.call("fast_login", self.fast_login, page, account=self.email)
+            self.input_profiles.record_path(self.email, FAST, success)
+            if success:
+                self.log("✅ 快速登录成功")
+                return True
+            self.log("⚠️ 快速登录未成功，回退到完整登录流程")
+        
+        success = self.tracer.call("full_login", self.full_login, page, account=self.email)
+        self.input_profiles.record_path(self.email, FULL, success)
+        return success
+    
+    def fast_login(self, page):
+        """快速路径：直接打开密码登录页，跳过 auth 页面和登录按钮"""
+        try:
+            self.log(f"⚡ 直接访问密码登录页: {self.accounts_url}")
+            page.goto(self.accounts_url, wait_until="domcontentloaded")
+            
+            if not self.handle_cloudflare(page):
+                return False
+            
+            # 没有登录表单说明已经登录（或跳到了快速登录），交给状态检查
+            if not probe_login_state(page, self.url, self.email)["form"]:
+                return self.check_login_status(page)
+            
+            return self.tracer.call("perform_login", self.perform_login, page, account=self.email)
+            
+        except Exception as e:
+            self.log(f"快速登录出错: {e}", "ERROR")
+            return False
+    
+    def full_login(self, page):
         """完整的邮箱密码登录流程"""
         try:
             self.log("开始完整的登录流程...")
@@ -422,7 +567,7 @@ class ZamptoLogin:
             # 第一步: 访问hosting auth页面
             self.log(f"1. 访问hosting auth页面: {self.auth_url}")
             page.goto(self.auth_url, wait_until="domcontentloaded")
-            time.sleep(3)
+            self.wait_for_page(page)
             
             # 检查是否已经登录
             if self.check_login_status(page):
@@ -430,26 +575,7 @@ class ZamptoLogin:
             
             # 第二步: 点击Login or Sign Up with Zampto按钮
             self.log("2. 点击Login or Sign Up with Zampto按钮")
-            login_button_selectors = [
-                'button:has-text("Login or Sign Up with Zampto")',
-                'a:has-text("Login or Sign Up with Zampto")',
-                '//button[contains(text(), "Login")]',
-                '//a[contains(text(), "Login")]'
-            ]
-            
-            login_button = None
-            for selector in login_button_selectors:
-                try:
-                    if selector.startswith('//'):
-                        button = page.locator(f'xpath={selector}')
-                    else:
-                        button = page.locator(selector)
-                    
-                    if button.count() > 0 and button.first.is_visible():
-                        login_button = button.first
-                        break
-                except:
-                    continue
+            login_button, _ = self.selectors.resolve(page, "login_button", self.LOGIN_BUTTON_SELECTORS, visible=True)
             
             if not login_button:
                 self.log("❌ 未找到登录按钮")
@@ -458,7 +584,7 @@ class ZamptoLogin:
             try:
                 with page.expect_navigation(wait_until="domcontentloaded", timeout=30000):
                     login_button.click()
-                time.sleep(3)
+                self.wait_for_page(page)
             except:
                 self.log("❌ 点击登录按钮失败或导航超时")
                 return False
@@ -469,7 +595,7 @@ class ZamptoLogin:
             
             # 第四步: 执行登录操作
             self.log("3. 执行登录操作")
-            login_success = self.perform_login(page)
+            login_success = self.tracer.call("perform_login", self.perform_login, page, account=self.email)
             
             if login_success:
                 self.log("✅ 登录成功")
@@ -487,143 +613,417 @@ class ZamptoLogin:
             return False
 
     def renew_server(self, page, server_url):
-        """续期服务器 - 直接通过URL参数续期并输出结果"""
+        """续期服务器 - 直接通过URL参数续期，在网络层读取接口响应"""
+        server_id = parse_server_id(server_url)
         try:
-            server_id = server_url.split('id=')[-1] if 'id=' in server_url else "unknown"
             self.log(f"开始处理服务器 {server_id}")
             
             # 构建续期URL
-            if '?' in server_url:
-                renew_url = f"{server_url}&renew=true"
-            else:
-                renew_url = f"{server_url}?renew=true"
+            renew_url = build_renew_url(server_url)
             
             self.log(f"访问续期URL: {renew_url}")
             
-            # 访问续期URL
-            page.goto(renew_url, wait_until="networkidle")
-            time.sleep(3)
-            
-            # 获取页面内容
-            content = page.content()
-            
-            # 尝试解析JSON响应
-            try:
-                # 查找JSON部分
-                json_start = content.find('{')
-                json_end = content.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = content[json_start:json_end]
-                    json_data = json.loads(json_str)
-                    
-                    if json_data.get("success", False):
-                        renewal_time = json_data.get("renewal", "")
-                        next_renewal = json_data.get("nextRenewal", "")
-                        self.log(f"✅ 续期成功 - 当前续期: {renewal_time}, 下次续期: {next_renewal}")
-                        return f"{server_id}: success - renewal: {renewal_time}, next: {next_renewal}"
-                    else:
-                        self.log("❌ 续期失败，API返回失败状态")
-                        return f"{server_id}: api_failed - {json_str}"
-            except json.JSONDecodeError:
-                self.log("❌ 无法解析JSON响应")
-            
-            # 如果无法解析JSON，返回原始内容的前500字符
-            content_preview = content[:500].replace('\n', ' ').replace('\r', ' ')
-            self.log(f"页面内容预览: {content_preview}...")
-            
-            return f"{server_id}: {content_preview}..."
+            # 拿到续期接口的响应就返回，不等页面加载，也不复制整页HTML
+            # 只匹配本服务器的续期 URL；被重定向时拿到的是 3xx，按登录态丢失处理
+            matcher = renew_response_matcher(server_id)
+            with page.expect_response(lambda r: r.request.is_navigation_request() and matcher(r.url), timeout=30000) as response_info:
+                page.goto(renew_url, wait_until="commit")
+            response = response_info.value
+            text = response.text() if response.status == 200 else None
+            return self.handle_renew_response(server_id, response.status, text)
                 
         except Exception as e:
             self.log(f"续期过程中出错: {e}", "ERROR")
             return f"{server_id}: error - {str(e)}"
 
-    def run(self):
-        """主运行函数"""
-        self.log("开始 Zampto 自动续期任务")
+    def handle_renew_response(self, server_id, status, text):
+        """根据续期接口的状态码和JSON生成结果，成功时记录下次续期时间"""
+        done, result, json_data = interpret_renew_response(server_id, status, text)
+        if not done:
+            self.log(f"❌ 续期接口异常: {result}")
+        elif json_data.get("success", False):
+            renewal_time = json_data.get("renewal", "")
+            next_renewal = json_data.get("nextRenewal", "")
+            self.log(f"✅ 续期成功 - 当前续期: {renewal_time}, 下次续期: {next_renewal}")
+            self.renewal_state.record(server_id, json_data)
+        else:
+            self.log("❌ 续期失败，API返回失败状态")
+        return result
+
+    def traced_renew_server(self, page, server_url):
+        started = time.monotonic()
+        try:
+            return self.tracer.call(
+                "renew_server", self.renew_server, page, server_url,
+                account=self.email, server=parse_server_id(server_url), outcome=renew_outcome
+            )
+        finally:
+            self.server_durations[server_url] = time.monotonic() - started
+
+    def merge_results(self, renewed, skipped):
+        """按 server_list 原顺序合并续期结果和跳过结果"""
+        merged = dict(skipped)
+        merged.update(renewed)
+        return [merged[url] for url in self.server_list]
+    
+    def renew_servers_http(self, context, page, server_list):
+        """混合模式：复制浏览器Cookie后用HTTP并发续期，失败的服务器再用浏览器兜底"""
+        self.log(f"HTTP并发续期 {len(server_list)} 个服务器 (并发数: {self.http_workers})")
+        http_results = renew_all(context.cookies(), server_list, self.user_agent, workers=self.http_workers)
+        
+        results = []
+        for server_url in server_list:
+            done, result, json_data = http_results[server_url]
+            if done:
+                self.log(f"HTTP续期结果: {result}")
+                self.renewal_state.record(parse_server_id(server_url), json_data)
+                results.append(result)
+            else:
+                self.log(f"⚠️ HTTP续期失败 ({result})，改用浏览器续期")
+                results.append(self.renew_with_retry(page, server_url))
+        return results
+    
+    def renew_with_retry(self, page, server_url):
+        """超出总时限时跳过，否则按重试次数续期，只重试临时错误"""
+        server_id = parse_server_id(server_url)
+        if self.planner.expired():
+            self.log(f"⏳ 已超出运行时限，跳过服务器 {server_id}")
+            return self.planner.skip(self.email, [server_id], BUDGET)[0]
+        return self.planner.retry(
+            f"续期 {server_id}", self.traced_renew_server, page, server_url,
+            attempts=RENEW_ATTEMPTS, is_success=renew_settled
+        )
+    
+    def forget_lost_session(self, results):
+        """续期时被重定向回登录页说明保存的会话已失效，删掉它，下次直接走登录"""
+        if any(renew_outcome(result) == "session_lost" for result in results):
+            self.log("⚠️ 续期时登录态丢失，删除已保存的会话")
+            self.vault.forget(self.email)
+    
+    def skip_servers(self, server_list, reason):
+        """整批跳过待续期的服务器，和未到期的结果合并"""
+        skipped = self.planner.skip(self.email, [parse_server_id(url) for url in server_list], reason)
+        return self.merge_results(dict(zip(server_list, skipped)), self.skipped)
+
+    def plan_servers(self):
+        """
+        调度模式下只保留临近到期的服务器
+        返回 (待续期URL列表, {跳过的URL: 结果字符串})
+        """
+        if self.schedule_mode != 'due':
+            return list(self.server_list), {}
         
+        ids = {parse_server_id(url): url for url in self.server_list}
+        due_ids, skipped_ids = self.renewal_state.plan(list(ids), self.renew_window_hours)
+        skipped = {
+            ids[sid]: f"{sid}: skipped - next: {self.renewal_state.describe(sid)}"
+            for sid in skipped_ids
+        }
+        self.log(f"调度模式: {len(due_ids)} 个服务器需要续期, {len(skipped)} 个未到期跳过 (窗口 {self.renew_window_hours}h)")
+        return [ids[sid] for sid in due_ids], skipped
+    
+    def launch_browser(self, p):
+        """配置了常驻浏览器时通过 CDP 连接（每次运行一个新 context），否则本地启动"""
+        endpoint = service_endpoint()
+        if endpoint:
+            self.log(f"🔌 连接常驻浏览器: {endpoint}")
+            return p.chromium.connect_over_cdp(endpoint)
+        self.log(f"🚀 启动配置: {self.launch_profile}")
+        self.launch_timer.start(self.launch_profile)
+        browser = p.chromium.launch(**launch_kwargs(self.launch_profile, self.headless))
+        self.launch_timer.launched()
+        return browser
+    
+    def precheck(self):
+        """
+        启动浏览器前的检查和调度
+        不需要浏览器时直接返回结果列表，否则返回 None，待续期和跳过的服务器保存在实例上
+        """
         if not self.has_email_auth():
             return ["error: no_auth"]
         
         if not self.server_list:
             return ["error: no_servers"]
         
-        results = []
+        self.due_servers, self.skipped = self.plan_servers()
+        if not self.due_servers:
+            self.log("✅ 所有服务器都未到续期窗口，无需启动浏览器")
+            return self.merge_results({}, self.skipped)
+        
+        if not self.planner.breaker.allow(self.email):
+            self.log("🔌 账号连续登录失败已熔断，冷却期内跳过")
+            return self.skip_servers(self.due_servers, CIRCUIT_OPEN)
+        return None
+    
+    def run_in_browser(self, browser):
+        """在 browser 中新建独立的 context 完成登录和续期，结束时关闭 context"""
+        due_servers, skipped = self.due_servers, self.skipped
+        if self.planner.expired():
+            self.log("⏳ 已超出运行时限，跳过该账号")
+            return self.skip_servers(due_servers, BUDGET)
+        
+        context = None
+        try:
+            # 优先复用上次保存的会话，失效时再走完整登录
+            storage_state = None
+            if self.vault.is_valid(self.email, user_agent=self.user_agent):
+                storage_state = self.vault.storage_state(self.email)
+                self.log("✅ 已保存的会话仍然有效，跳过登录流程")
+            
+            context = browser.new_context(
+                user_agent=self.user_agent, storage_state=storage_state, **context_kwargs(self.launch_profile)
+            )
+            
+            # 隐藏自动化特征
+            context.add_init_script("""
+                delete navigator.__proto__.webdriver;
+                Object.defineProperty(navigator, 'webdriver', { get: () => false });
+            """)
+            self.resource_policy.apply(context)
+            self.restore_clearance(context)
+            
+            page = context.new_page()
+            page.set_default_timeout(60000)
+            # 启动耗时只算第一次导航本身：发出请求到主文档提交
+            page.once("request", lambda _: self.launch_timer.navigating())
+            page.once("framenavigated", lambda _: self.launch_timer.first_page())
+            
+            # 执行登录（失败按次数退避重试，结果计入熔断）
+            login_success = bool(storage_state)
+            if not login_success:
+                login_success = self.planner.retry(
+                    "登录", self.tracer.call, "login_with_email", self.login_with_email, page,
+                    account=self.email, attempts=LOGIN_ATTEMPTS
+                )
+                self.planner.breaker.record(self.email, login_success)
+            self.finish_login_attempts(login_success)
+            
+            if login_success:
+                self.vault.save_storage_state(self.email, context.storage_state())
+                if self.renew_mode == 'http':
+                    renewed = self.renew_servers_http(context, page, due_servers)
+                else:
+                    renewed = [self.renew_with_retry(page, server_url) for server_url in due_servers]
+                self.forget_lost_session(renewed)
+                return self.merge_results(dict(zip(due_servers, renewed)), skipped)
+            return self.merge_results({url: "login_failed" for url in due_servers}, skipped)
+            
+        except Exception as e:
+            self.log(f"运行时出错: {e}", "ERROR")
+            return ["error: runtime"] * len(self.server_list)
+        finally:
+            if context:
+                try:
+                    context.close()
+                except Exception:
+                    pass
+    
+    def run(self):
+        """主运行函数"""
+        self.log("开始 Zampto 自动续期任务")
+        
+        results = self.precheck()
+        if results is not None:
+            return results
         
         try:
             with sync_playwright() as p:
-                browser = p.chromium.launch(headless=self.headless)
-                context = browser.new_context(user_agent=self.user_agent)
-                
-                # 隐藏自动化特征
-                context.add_init_script("""
-                    delete navigator.__proto__.webdriver;
-                    Object.defineProperty(navigator, 'webdriver', { get: () => false });
-                """)
-                
-                page = context.new_page()
-                page.set_default_timeout(60000)
+                with self.tracer.span("browser_launch"):
+                    browser = self.launch_browser(p)
                 
-                # 执行登录
-                login_success = self.login_with_email(page)
-                
-                if login_success:
-                    for server_url in self.server_list:
-                        result = self.renew_server(page, server_url)
-                        results.append(result)
-                        time.sleep(2)
-                else:
-                    results = ["login_failed"] * len(self.server_list)
+                results = self.run_in_browser(browser)
                 
                 browser.close()
+                self.screenshots.close()
+                self.launch_timer.save(self.launch_profiles)
+                self.log("等待耗时统计:\n" + self.waiter.format_summary())
+                self.log(f"资源拦截统计: {self.resource_policy.format_summary()}")
                 return results
                 
         except Exception as e:
             self.log(f"运行时出错: {e}", "ERROR")
             return ["error: runtime"] * len(self.server_list)
     
+    def history_rows(self, results):
+        """把按 server_list 顺序的结果转换为运行历史的行"""
+        if len(results) != len(self.server_list):
+            return []
+        rows = []
+        for server_url, result in zip(self.server_list, results):
+            server_id = parse_server_id(server_url)
+            status = result_status(result)
+            entry = (self.renewal_state.get(server_id) or {}) if status == "success" else {}
+            rows.append({
+                "server_id": server_id,
+                "account": self.email,
+                "status": status,
+                "result": result,
+                "duration": self.server_durations.get(server_url),
+                "renewal": entry.get("renewal"),
+                "next_renewal": entry.get("nextRenewal"),
+            })
+        return rows
+    
     def write_readme_file(self, results):
-        """写入README文件"""
+        """把本次结果追加到运行历史，再从历史库生成README文件"""
         try:
-            from datetime import datetime, timezone, timedelta
-            beijing_time = datetime.now(timezone(timedelta(hours=8)))
-            timestamp = beijing_time.strftime('%Y-%m-%d %H:%M:%S')
+            self.history.record_run(self.tracer.script, self.history_rows(results), run_id=self.tracer.run_id)
+            self.history.write_readme('README.md')
             
-            readme_content = f"""# Zampto 自动续期脚本
-
-**最后运行时间**: `{timestamp}` (北京时间)
+        except Exception as e:
+            self.log(f"写入README失败: {e}", "ERROR")
+    
+    def write_partial_file(self, results):
+        """分片模式只写本分片的结果文件，README 由合并步骤统一生成（不保存完整邮箱）"""
+        try:
+            rows = [dict(row, account=mask_email(row["account"])) for row in self.history_rows(results)]
+            write_partial("main", {"rows": rows})
+        except Exception as e:
+            self.log(f"写入分片结果失败: {e}", "ERROR")
 
-## 运行结果
 
-"""
-            
-            for result in results:
-                readme_content += f"- {result}\n"
-            
-            with open('README.md', 'w', encoding='utf-8') as f:
-                f.write(readme_content)
-            
+class MultiAccountLogin:
+    """
+    多账号：所有账号共用一个浏览器进程，每个账号在独立的 browser context 中登录续期，
+    状态存储共用一份，结果合并写入同一个 README
+    同步 Playwright 不能跨线程使用，这里逐个串行处理账号；
+    需要并发（ZAMPTO_ACCOUNT_WORKERS）时运行 main_async.py
+    """
+    
+    def __init__(self, accounts, login_cls=ZamptoLogin):
+        """初始化，按账号创建 login_cls 实例，分片时按账号分配"""
+        self.shard_total = len(accounts)
+        if is_sharded():
+            accounts = select_shard(accounts, key=lambda a: a["email"])
+        self.logins = [login_cls(a["email"], a["password"], a["server_urls"], shard=False) for a in accounts]
+        for login in self.logins:
+            login.share_state(self.logins[0])
+        self.server_list = [url for login in self.logins for url in login.server_list]
+        self.account_results = []
+        self.planner = self.logins[0].planner if self.logins else RunPlanner()
+    
+    def log(self, message, level="INFO"):
+        """日志输出"""
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{timestamp}] {level}: {message}")
+    
+    def has_email_auth(self):
+        """检查每个账号都有邮箱密码（分片没分到账号时视为通过）"""
+        return bool(self.shard_total) and all(login.has_email_auth() for login in self.logins)
+    
+    def collect(self, results):
+        """按账号顺序保存每个账号的结果，返回合并后的列表"""
+        self.account_results = results
+        return [result for account in results for result in account]
+    
+    def run(self):
+        """主运行函数：只启动一次浏览器，账号逐个在新 context 中处理"""
+        self.log(f"开始 Zampto 多账号续期任务: {len(self.logins)} 个账号, {len(self.server_list)} 个服务器")
+        
+        results = [login.precheck() for login in self.logins]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return self.collect(results)
+        
+        first = self.logins[pending[0]]
+        try:
+            with sync_playwright() as p:
+                with first.tracer.span("browser_launch"):
+                    browser = first.launch_browser(p)
+                
+                for i in pending:
+                    results[i] = self.logins[i].run_in_browser(browser)
+                
+                browser.close()
+                first.screenshots.close()
+                first.launch_timer.save(first.launch_profiles)
+                self.log("等待耗时统计:\n" + first.waiter.format_summary())
+                self.log(f"资源拦截统计: {first.resource_policy.format_summary()}")
+                
+        except Exception as e:
+            self.log(f"运行时出错: {e}", "ERROR")
+        
+        for i in pending:
+            if results[i] is None:
+                results[i] = ["error: runtime"] * len(self.logins[i].server_list)
+        return self.collect(results)
+    
+    def history_rows(self):
+        return [row for login, results in zip(self.logins, self.account_results) for row in login.history_rows(results)]
+    
+    def write_readme_file(self, results):
+        """所有账号的结果记为一次运行，生成一份README"""
+        if not self.logins:
+            return
+        first = self.logins[0]
+        try:
+            first.history.record_run(first.tracer.script, self.history_rows(), run_id=first.tracer.run_id)
+            first.history.write_readme('README.md')
         except Exception as e:
             self.log(f"写入README失败: {e}", "ERROR")
+    
+    def write_partial_file(self, results):
+        """分片模式只写本分片的结果文件"""
+        try:
+            rows = [dict(row, account=mask_email(row["account"])) for row in self.history_rows()]
+            write_partial("main", {"rows": rows})
+        except Exception as e:
+            self.log(f"写入分片结果失败: {e}", "ERROR")
 
 
-def main():
+def merge():
+    """合并各分片的结果文件，记录运行历史并生成唯一一份README"""
+    partials, missing = load_partials("main")
+    if not partials:
+        print(f"❌ 错误：{SHARD_DIR} 中没有分片结果！")
+        sys.exit(1)
+    
+    rows = [row for partial in partials for row in partial["rows"]]
+    history = RunHistory()
+    history.record_run("main", rows)
+    history.write_readme('README.md')
+    
+    print(f"运行结果汇总 ({len(partials)} 个分片):")
+    for row in rows:
+        print(f"  - {row['result']}")
+    
+    if missing or any(row["status"] in ("login_failed", "error") for row in rows):
+        sys.exit(1)
+    else:
+        sys.exit(0)
+
+
+def main(login_cls=ZamptoLogin, multi_cls=MultiAccountLogin):
     """主函数"""
-    login = ZamptoLogin()
+    if MERGE_FLAG in sys.argv:
+        merge()
+    
+    # 配置了 ZAMPTO_MULTI_ACCOUNTS 时走多账号，否则沿用 ZAMPTO_EMAIL / ZAMPTO_SERVER_URLS
+    accounts = parse_accounts()
+    login = multi_cls(accounts, login_cls) if accounts else login_cls()
     
     if not login.has_email_auth():
         print("❌ 错误：未设置认证信息！")
         sys.exit(1)
     
     if not login.server_list:
+        if is_sharded() and login.shard_total:
+            # 本分片没有分到服务器，写空结果让合并步骤知道它已完成
+            login.write_partial_file([])
+            sys.exit(0)
         print("❌ 错误：未设置服务器URL列表！")
         sys.exit(1)
     
     results = login.run()
-    login.write_readme_file(results)
+    if is_sharded():
+        login.write_partial_file(results)
+    else:
+        login.write_readme_file(results)
     
     print("运行结果汇总:")
     for result in results:
         print(f"  - {result}")
+    print(f"时限/熔断跳过: {login.planner.format_summary()}")
     
     if any("login_failed" in result or "error:" in result for result in results):
         sys.exit(1)
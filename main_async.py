@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zampto 登录脚本 - asyncio 版本
+登录一次后在同一个 context 中打开多个页面并行续期，
+结果格式与 ZamptoLogin.run 一致，可直接交给 write_readme_file 和 main()
+多账号时按 ZAMPTO_ACCOUNT_WORKERS 限制同时登录续期的账号数
+"""
+
+import os
+import time
+import random
+import asyncio
+
+from playwright.async_api import async_playwright
+
+from main import ZamptoLogin, MultiAccountLogin, main
+from browser_service import service_endpoint
+from launch_profiles import launch_kwargs, context_kwargs
+from input_profiles import BURST_DELAY_MS, HUMAN_DELAY_RANGE, FAST, FULL
+from screenshots import capture_playwright_async, should_capture, image_path
+from http_renew import build_renew_url, parse_server_id, renew_response_matcher
+from tracing import renew_outcome
+from run_planner import renew_settled, LOGIN_ATTEMPTS, RENEW_ATTEMPTS, BUDGET
+from cloudflare import wait_for_clearance_async
+from login_probe import probe_login_state_async, on_site, LOGGED_IN, QUICK_LOGIN, VALIDATION_FAILURE
+
+# 多账号时同时登录续期的账号数
+ACCOUNT_WORKERS = max(1, int(os.getenv("ZAMPTO_ACCOUNT_WORKERS", "3")))
+
+
+class AsyncZamptoLogin(ZamptoLogin):
+    def __init__(self, *args, **kwargs):
+        """初始化，额外读取并行页面数"""
+        super().__init__(*args, **kwargs)
+        self.tracer.script = "main_async"
+        self.page_concurrency = max(1, int(os.getenv('ZAMPTO_PAGE_CONCURRENCY', '4')))
+
+    async def wait_for_page(self, page, timeout=10000):
+        """goto之后等待页面加载完成，替代固定等待"""
+        return await self.waiter.load_state_async(page, "load", timeout=timeout, name="page_load")
+
+    async def find_login_form(self, page):
+        """一次DOM查询找到邮箱、密码输入框和提交按钮"""
+        found = await self.selectors.resolve_many_async(page, {
+            "email": self.EMAIL_SELECTORS,
+            "password": self.PASSWORD_SELECTORS,
+            "submit": self.SUBMIT_SELECTORS,
+        })
+        return found["email"][0], found["password"][0], found["submit"][0]
+
+    async def check_login_status(self, page):
+        """检查是否已登录到hosting页面（只看URL、Cookie和一次DOM查询）"""
+        try:
+            current_url = page.url
+            self.log(f"检查登录状态，当前URL: {current_url}")
+            probe = await probe_login_state_async(page, self.url, self.email)
+            state = probe["state"]
+
+            if state == LOGGED_IN:
+                self.log("✅ 已登录到hosting首页")
+                return True
+
+            elif on_site(current_url, self.url):
+                self.log("⚠️ 在hosting页面但未检测到登录迹象")
+                return False
+
+            elif "accounts.zampto.net" in current_url:
+                if state == QUICK_LOGIN:
+                    self.log("✅ 检测到已登录到accounts页面（快速登录界面）")
+                    return True
+                self.log("❌ 在accounts页面但未登录")
+                return False
+
+            elif state == VALIDATION_FAILURE:
+                self.log("⚠️ 检测到验证失败重定向，尝试处理...")
+                self.reject_input_profile()
+                return await self.handle_validation_failure(page, probe)
+
+            self.log(f"❌ 未知页面状态: {current_url} ({state})")
+            return False
+
+        except Exception as e:
+            self.log(f"检查登录状态时出错: {e}", "ERROR")
+            return False
+
+    async def handle_validation_failure(self, page, probe=None):
+        """处理验证失败的重定向：快速登录界面选择当前账户，有表单就重新填写，否则直接访问首页"""
+        try:
+            probe = probe or await probe_login_state_async(page, self.url, self.email)
+            if probe["quick"] and probe["account"]:
+                self.log("✅ 检测到快速登录界面，尝试选择当前账户")
+                return await self.select_current_account_in_quick_login(page)
+            if probe["form"]:
+                self.log("⚠️ 验证失败但仍有登录表单，尝试重新登录")
+                return await self.fill_and_submit(page)
+
+            self.log("⚠️ 验证失败，尝试直接访问首页")
+            for url in (self.url, self.auth_url):
+                await page.goto(url, wait_until="domcontentloaded")
+                await self.wait_for_page(page)
+                if await self.check_login_status(page):
+                    return True
+            return False
+
+        except Exception as e:
+            self.log(f"处理验证失败时出错: {e}", "ERROR")
+            return False
+
+    async def select_current_account_in_quick_login(self, page):
+        """在快速登录界面选择当前账户"""
+        try:
+            self.log("在快速登录界面选择当前账户...")
+            element, selector = await self.selectors.resolve_async(
+                page, "account_picker", self.ACCOUNT_SELECTORS, visible=True, values={"email": self.email}
+            )
+            if element:
+                try:
+                    self.log(f"找到账户选择元素: {selector}")
+                    previous_url = page.url
+                    await element.click()
+                    await self.waiter.url_async(page, lambda url: url != previous_url, timeout=10000, name="account_select")
+                    await self.wait_for_page(page)
+                    if await self.check_login_status(page):
+                        return True
+                except Exception as e:
+                    self.log(f"尝试选择器 {selector} 时出错: {e}", "DEBUG")
+
+            self.log("❌ 未找到合适的账户选择按钮")
+            if should_capture(False):
+                try:
+                    with self.tracer.span("screenshot", account=self.email):
+                        data = await capture_playwright_async(page)
+                    self.screenshots.submit(data, image_path("quick_login_debug"), lambda path: self.log(f"已保存截图: {path}"))
+                except Exception:
+                    pass
+
+            return False
+
+        except Exception as e:
+            self.log(f"选择账户时出错: {e}", "ERROR")
+            return False
+
+    async def handle_cloudflare(self, page):
+        """处理Cloudflare验证：页面内监听，表单出现或验证消失立即返回"""
+        with self.tracer.span("handle_cloudflare", account=self.email) as span:
+            try:
+                self.log("检查Cloudflare验证...")
+                state, challenge_seconds = await wait_for_clearance_async(
+                    page, self.waiter, self.EMAIL_SELECTORS + self.PASSWORD_SELECTORS
+                )
+                passed = self.report_cloudflare(span, state, challenge_seconds)
+                if passed:
+                    self.clearance.save(await page.context.cookies(), self.user_agent)
+                return passed
+
+            except Exception as e:
+                self.log(f"处理Cloudflare时出错: {e}", "ERROR")
+                span["outcome"] = "error"
+                return False
+
+    async def restore_clearance(self, context):
+        """把缓存的 Cloudflare 验证 Cookie 加入 context"""
+        cookies = self.clearance.cookies(self.user_agent)
+        if cookies:
+            self.log(f"♻️ 复用缓存的 Cloudflare 验证 Cookie ({len(cookies)} 个)")
+            await context.add_cookies(cookies)
+        return cookies
+
+    async def human_like_typing(self, element, text, delay_range=HUMAN_DELAY_RANGE):
+        """模拟人类输入"""
+        for char in text:
+            await element.press(char)
+            await asyncio.sleep(random.uniform(delay_range[0]/1000, delay_range[1]/1000))
+
+    async def type_text(self, element, text):
+        """按当前输入方式填写输入框"""
+        if self.input_profile == "instant":
+            await element.fill(text)
+            return
+        await element.fill('')
+        if self.input_profile == "burst":
+            await element.press_sequentially(text, delay=BURST_DELAY_MS)
+        else:
+            await self.human_like_typing(element, text)
+
+    async def fill_and_submit(self, page):
+        """查找表单、填写并提交，然后检查登录结果"""
+        email_field, password_field, submit_button = await self.find_login_form(page)
+        if not email_field:
+            self.log("❌ 未找到邮箱输入框")
+            return False
+
+        if not password_field:
+            self.log("❌ 未找到密码输入框")
+            return False
+
+        if not submit_button:
+            self.log("❌ 未找到提交按钮")
+            return False
+
+        self.start_login_attempt()
+        self.log("填写邮箱...")
+        await email_field.click()
+        await self.type_text(email_field, self.email)
+
+        self.log("填写密码...")
+        await password_field.click()
+        await self.type_text(password_field, self.password)
+
+        self.log("点击登录按钮...")
+        await submit_button.click()
+        if await self.waiter.url_async(
+            page,
+            lambda url: "/sign-in" not in url or "secure-failure" in url,
+            timeout=15000,
+            name="submit_redirect"
+        ):
+            await self.wait_for_page(page)
+
+        return await self.check_login_status(page)
+
+    async def perform_login(self, page):
+        """执行登录操作"""
+        try:
+            self.log("执行登录操作...")
+            await self.waiter.selector_async(page, self.EMAIL_SELECTORS, timeout=10000, name="login_form")
+            return await self.fill_and_submit(page)
+        except Exception as e:
+            self.log(f"登录过程中出错: {e}", "ERROR")
+            return False
+
+    async def login_with_email(self, page):
+        """登录：先走密码登录页快速路径，失败自动回退到完整流程，记录成功的路径"""
+        if self.input_profiles.use_fast_path(self.email):
+            success = await self.tracer.call_async("fast_login", self.fast_login, page, account=self.email)
+            self.input_profiles.record_path(self.email, FAST, success)
+            if success:
+                self.log("✅ 快速登录成功")
+                return True
+            self.log("⚠️ 快速登录未成功，回退到完整登录流程")
+
+        success = await self.tracer.call_async("full_login", self.full_login, page, account=self.email)
+        self.input_profiles.record_path(self.email, FULL, success)
+        return success
+
+    async def fast_login(self, page):
+        """快速路径：直接打开密码登录页，跳过 auth 页面和登录按钮"""
+        try:
+            self.log(f"⚡ 直接访问密码登录页: {self.accounts_url}")
+            await page.goto(self.accounts_url, wait_until="domcontentloaded")
+
+            if not await self.handle_cloudflare(page):
+                return False
+
+            if not (await probe_login_state_async(page, self.url, self.email))["form"]:
+                return await self.check_login_status(page)
+
+            return await self.tracer.call_async("perform_login", self.perform_login, page, account=self.email)
+
+        except Exception as e:
+            self.log(f"快速登录出错: {e}", "ERROR")
+            return False
+
+    async def full_login(self, page):
+        """完整的邮箱密码登录流程"""
+        try:
+            self.log("开始完整的登录流程...")
+
+            self.log(f"1. 访问hosting auth页面: {self.auth_url}")
+            await page.goto(self.auth_url, wait_until="domcontentloaded")
+            await self.wait_for_page(page)
+
+            if await self.check_login_status(page):
+                return True
+
+            self.log("2. 点击Login or Sign Up with Zampto按钮")
+            login_button, _ = await self.selectors.resolve_async(page, "login_button", self.LOGIN_BUTTON_SELECTORS, visible=True)
+            if not login_button:
+                self.log("❌ 未找到登录按钮")
+                return False
+
+            try:
+                async with page.expect_navigation(wait_until="domcontentloaded", timeout=30000):
+                    await login_button.click()
+                await self.wait_for_page(page)
+            except Exception:
+                self.log("❌ 点击登录按钮失败或导航超时")
+                return False
+
+            if not await self.handle_cloudflare(page):
+                return False
+
+            self.log("3. 执行登录操作")
+            if await self.tracer.call_async("perform_login", self.perform_login, page, account=self.email):
+                self.log("✅ 登录成功")
+                return True
+
+            if "accounts.zampto.net" in page.url:
+                self.log("4. 尝试从accounts页面跳转到hosting")
+                await page.goto(self.url, wait_until="domcontentloaded")
+                await self.wait_for_page(page)
+                return await self.check_login_status(page)
+
+            return False
+
+        except Exception as e:
+            self.log(f"完整登录流程中出错: {e}", "ERROR")
+            return False
+
+    async def renew_server(self, page, server_url):
+        """续期服务器 - 直接通过URL参数续期并输出结果"""
+        server_id = parse_server_id(server_url)
+        try:
+            renew_url = build_renew_url(server_url)
+            self.log(f"[{server_id}] 访问续期URL: {renew_url}")
+
+            matcher = renew_response_matcher(server_id)
+            async with page.expect_response(lambda r: r.request.is_navigation_request() and matcher(r.url), timeout=30000) as response_info:
+                await page.goto(renew_url, wait_until="commit")
+            response = await response_info.value
+            text = await response.text() if response.status == 200 else None
+            return self.handle_renew_response(server_id, response.status, text)
+
+        except Exception as e:
+            self.log(f"续期过程中出错: {e}", "ERROR")
+            return f"{server_id}: error - {str(e)}"
+
+    async def renew_servers_parallel(self, context, first_page, server_list):
+        """在同一个 context 中打开多个页面并行续期，结果保持原顺序"""
+        workers = min(self.page_concurrency, len(server_list))
+        self.log(f"并行续期 {len(server_list)} 个服务器 (页面数: {workers})")
+
+        pages = asyncio.Queue()
+        await pages.put(first_page)
+        for _ in range(workers - 1):
+            page = await context.new_page()
+            page.set_default_timeout(60000)
+            await pages.put(page)
+
+        async def renew(server_url):
+            server_id = parse_server_id(server_url)
+            page = await pages.get()
+            if self.planner.expired():
+                pages.put_nowait(page)
+                self.log(f"⏳ 已超出运行时限，跳过服务器 {server_id}")
+                return self.planner.skip(self.email, [server_id], BUDGET)[0]
+            started = time.monotonic()
+            try:
+                return await self.planner.retry_async(
+                    f"续期 {server_id}", self.tracer.call_async, "renew_server", self.renew_server, page, server_url,
+                    account=self.email, server=server_id, outcome=renew_outcome,
+                    attempts=RENEW_ATTEMPTS, is_success=renew_settled
+                )
+            finally:
+                self.server_durations[server_url] = time.monotonic() - started
+                pages.put_nowait(page)
+
+        return list(await asyncio.gather(*(renew(url) for url in server_list)))
+
+    async def launch_browser(self, p):
+        """配置了常驻浏览器时通过 CDP 连接（每次运行一个新 context），否则本地启动"""
+        endpoint = service_endpoint()
+        if endpoint:
+            self.log(f"🔌 连接常驻浏览器: {endpoint}")
+            return await p.chromium.connect_over_cdp(endpoint)
+        self.log(f"🚀 启动配置: {self.launch_profile}")
+        self.launch_timer.start(self.launch_profile)
+        browser = await p.chromium.launch(**launch_kwargs(self.launch_profile, self.headless))
+        self.launch_timer.launched()
+        return browser
+
+    async def run_in_browser(self, browser):
+        """在 browser 中新建独立的 context 完成登录和续期，结束时关闭 context"""
+        due_servers, skipped = self.due_servers, self.skipped
+        if self.planner.expired():
+            self.log("⏳ 已超出运行时限，跳过该账号")
+            return self.skip_servers(due_servers, BUDGET)
+
+        context = None
+        try:
+            storage_state = None
+            # 会话探测是阻塞的 HTTP 请求，放到线程里，不阻塞其他账号
+            if await asyncio.to_thread(self.vault.is_valid, self.email, user_agent=self.user_agent):
+                storage_state = self.vault.storage_state(self.email)
+                self.log("✅ 已保存的会话仍然有效，跳过登录流程")
+
+            context = await browser.new_context(
+                user_agent=self.user_agent, storage_state=storage_state, **context_kwargs(self.launch_profile)
+            )
+            await context.add_init_script("""
+                delete navigator.__proto__.webdriver;
+                Object.defineProperty(navigator, 'webdriver', { get: () => false });
+            """)
+            await self.resource_policy.apply_async(context)
+            await self.restore_clearance(context)
+
+            page = await context.new_page()
+            page.set_default_timeout(60000)
+            # 启动耗时只算第一次导航本身：发出请求到主文档提交
+            page.once("request", lambda _: self.launch_timer.navigating())
+            page.once("framenavigated", lambda _: self.launch_timer.first_page())
+
+            login_success = bool(storage_state)
+            if not login_success:
+                login_success = await self.planner.retry_async(
+                    "登录", self.tracer.call_async, "login_with_email", self.login_with_email, page,
+                    account=self.email, attempts=LOGIN_ATTEMPTS
+                )
+                self.planner.breaker.record(self.email, login_success)
+            self.finish_login_attempts(login_success)
+
+            if login_success:
+                self.vault.save_storage_state(self.email, await context.storage_state())
+                renewed = await self.renew_servers_parallel(context, page, due_servers)
+                self.forget_lost_session(renewed)
+                return self.merge_results(dict(zip(due_servers, renewed)), skipped)
+            return self.merge_results({url: "login_failed" for url in due_servers}, skipped)
+
+        except Exception as e:
+            self.log(f"运行时出错: {e}", "ERROR")
+            return ["error: runtime"] * len(self.server_list)
+        finally:
+            if context:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+
+    async def run_async(self):
+        """主运行函数（异步）"""
+        self.log("开始 Zampto 自动续期任务 (async)")
+
+        results = self.precheck()
+        if results is not None:
+            return results
+
+        try:
+            async with async_playwright() as p:
+                with self.tracer.span("browser_launch"):
+                    browser = await self.launch_browser(p)
+
+                results = await self.run_in_browser(browser)
+
+                await browser.close()
+                self.screenshots.close()
+                self.launch_timer.save(self.launch_profiles)
+                self.log("等待耗时统计:\n" + self.waiter.format_summary())
+                self.log(f"资源拦截统计: {self.resource_policy.format_summary()}")
+                return results
+
+        except Exception as e:
+            self.log(f"运行时出错: {e}", "ERROR")
+            return ["error: runtime"] * len(self.server_list)
+
+    def run(self):
+        """同步入口，供 main() 调用"""
+        return asyncio.run(self.run_async())
+
+
+class AsyncMultiAccountLogin(MultiAccountLogin):
+    """多账号（异步）：一个浏览器，最多 workers 个账号同时在各自的 context 中登录续期"""
+
+    def __init__(self, accounts, login_cls=AsyncZamptoLogin, workers=ACCOUNT_WORKERS):
+        super().__init__(accounts, login_cls)
+        self.workers = workers
+
+    async def run_async(self):
+        self.log(f"开始 Zampto 多账号续期任务 (async): {len(self.logins)} 个账号, "
+                 f"{len(self.server_list)} 个服务器, 并发账号数 {self.workers}")
+
+        results = [login.precheck() for login in self.logins]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return self.collect(results)
+
+        first = self.logins[pending[0]]
+        try:
+            async with async_playwright() as p:
+                with first.tracer.span("browser_launch"):
+                    browser = await first.launch_browser(p)
+
+                semaphore = asyncio.Semaphore(self.workers)
+
+                async def run_account(i):
+                    async with semaphore:
+                        results[i] = await self.logins[i].run_in_browser(browser)
+
+                await asyncio.gather(*(run_account(i) for i in pending))
+
+                await browser.close()
+                first.screenshots.close()
+                first.launch_timer.save(first.launch_profiles)
+                self.log("等待耗时统计:\n" + first.waiter.format_summary())
+                self.log(f"资源拦截统计: {first.resource_policy.format_summary()}")
+
+        except Exception as e:
+            self.log(f"运行时出错: {e}", "ERROR")
+
+        for i in pending:
+            if results[i] is None:
+                results[i] = ["error: runtime"] * len(self.logins[i].server_list)
+        return self.collect(results)
+
+    def run(self):
+        return asyncio.run(self.run_async())
+
+
+if __name__ == "__main__":
+    main(AsyncZamptoLogin, AsyncMultiAccountLogin)
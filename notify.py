@@ -1,22 +1,174 @@
 import os
+import json
+import time
+import queue
+import random
 import smtplib
+import threading
 from email.mime.text import MIMEText
 import requests
+from requests.adapters import HTTPAdapter
 
 # ===== Telegram =====
+TG_API = "https://api.telegram.org/bot{token}/{method}"
+MAX_ALBUM_SIZE = 10
+MAX_ATTEMPTS = 5
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+
+def telegram_request(token: str, method: str, data: dict, files: dict = None, timeout: int = 20):
+    """
+    调用 Telegram Bot API，复用连接池
+    429 时按 retry_after 等待，网络错误和 5xx 指数退避重试
+    """
+    url = TG_API.format(token=token, method=method)
+    delay = 1
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            if files:
+                # 重试时需要把文件指针拨回开头
+                for f in files.values():
+                    f.seek(0)
+            resp = _session.post(url, data=data, files=files, timeout=timeout)
+        except requests.RequestException as e:
+            if attempt == MAX_ATTEMPTS:
+                print(f"⚠️ Telegram {method} 失败: {e}")
+                return None
+            time.sleep(delay)
+            delay *= 2
+            continue
+
+        if resp.status_code == 429:
+            try:
+                retry_after = resp.json().get("parameters", {}).get("retry_after", delay)
+            except ValueError:
+                retry_after = delay
+            time.sleep(retry_after + random.uniform(0, 0.5))
+            continue
+
+        if resp.status_code >= 500 and attempt < MAX_ATTEMPTS:
+            time.sleep(delay)
+            delay *= 2
+            continue
+
+        if resp.status_code != 200:
+            print(f"⚠️ Telegram {method} 返回 {resp.status_code}: {resp.text[:200]}")
+        return resp
+
+    print(f"⚠️ Telegram {method} 重试次数用尽")
+    return None
+
+
 def telegram_notify(message: str):
     token = os.getenv("TG_BOT_TOKEN")
     chat_id = os.getenv("TG_CHAT_ID")
     if not token or not chat_id:
         return
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    requests.post(url, json={
+    telegram_request(token, "sendMessage", {
         "chat_id": chat_id,
         "text": message,
         "parse_mode": "HTML"
     }, timeout=10)
 
+
+class TelegramNotifier:
+    """
+    后台发送 Telegram 通知
+    截图攒成最多 10 张的相册用 sendMediaGroup 发送，文字消息发送前先把已攒的截图发出去，
+    调用方只负责入队，不会被网络请求阻塞
+    """
+
+    def __init__(self, token=None, chat_id=None):
+        self.token = token or os.getenv("TG_BOT_TOKEN")
+        self.chat_id = chat_id or os.getenv("TG_CHAT_ID")
+        self.enabled = bool(self.token and self.chat_id)
+        self.queue = queue.Queue()
+        self.photos = []
+        self.worker = None
+        if self.enabled:
+            self.worker = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+            self.worker.start()
+
+    def send_message(self, text: str):
+        if self.enabled:
+            self.queue.put(("message", text))
+
+    def send_photo(self, photo_path: str, caption: str = ""):
+        if self.enabled:
+            self.queue.put(("photo", (photo_path, caption)))
+
+    def close(self, timeout=120):
+        """发送剩余的截图和消息，等待后台线程结束"""
+        if not self.worker:
+            return
+        self.queue.put(("close", None))
+        self.worker.join(timeout)
+
+    def _run(self):
+        while True:
+            kind, payload = self.queue.get()
+            try:
+                if kind == "photo":
+                    self.photos.append(payload)
+                    if len(self.photos) >= MAX_ALBUM_SIZE:
+                        self._flush_photos()
+                elif kind == "message":
+                    self._flush_photos()
+                    self._send_message(payload)
+                elif kind == "close":
+                    self._flush_photos()
+                    return
+            except Exception as e:
+                print(f"⚠️ Telegram 通知失败: {e}")
+
+    def _send_message(self, text):
+        telegram_request(self.token, "sendMessage", {
+            "chat_id": self.chat_id,
+            "text": text,
+            "parse_mode": "HTML"
+        }, timeout=10)
+
+    def _flush_photos(self):
+        photos, self.photos = self.photos, []
+        if not photos:
+            return
+
+        handles = {}
+        try:
+            media = []
+            for i, (path, caption) in enumerate(photos):
+                try:
+                    handles[f"photo{i}"] = open(path, "rb")
+                except OSError as e:
+                    print(f"⚠️ 无法读取截图 {path}: {e}")
+                    continue
+                media.append({
+                    "type": "photo",
+                    "media": f"attach://photo{i}",
+                    "caption": caption,
+                    "parse_mode": "HTML"
+                })
+
+            if len(media) == 1:
+                # sendMediaGroup 至少需要 2 张
+                item = media[0]
+                telegram_request(self.token, "sendPhoto", {
+                    "chat_id": self.chat_id,
+                    "caption": item["caption"],
+                    "parse_mode": "HTML"
+                }, files={"photo": handles[item["media"][len("attach://"):]]})
+            elif media:
+                telegram_request(self.token, "sendMediaGroup", {
+                    "chat_id": self.chat_id,
+                    "media": json.dumps(media, ensure_ascii=False)
+                }, files=handles, timeout=60)
+        finally:
+            for f in handles.values():
+                f.close()
+
 # ===== Email =====
 def email_notify(subject: str, body: str):
     smtp_server = os.getenv("SMTP_SERVER")
@@ -1,5 +1,6 @@
 import os
 import time
+from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -7,23 +8,38 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 
-import requests
+from notify import telegram_request
+from session_vault import SessionVault, dump_selenium_cookies, restore_selenium_cookies
+from waits import Waiter
+from resource_policy import ResourcePolicy
+from renewal_state import RenewalStateStore, SCHEDULE_MODE
+from http_renew import interpret_renew_response, renew_response_matcher, drain_selenium_log, REDIRECT_STATUSES
+from tracing import Tracer
+from cloudflare import ClearanceCache, selenium_challenge_seen
+from browser_service import service_endpoint, selenium_attach_options, open_isolated_window, close_isolated_window
+from run_history import RunHistory
+from launch_profiles import LaunchProfileStore, LaunchTimer, selenium_launch_options
+from input_profiles import InputProfileStore, FAST, FULL
 
 TG_BOT_TOKEN = os.getenv("TG_BOT_TOKEN")
 TG_CHAT_ID = os.getenv("TG_CHAT_ID")
 
+tracer = Tracer("renew")
+# 记录启动到首个页面的耗时和 Cloudflare 是否通过
+launch_timer = LaunchTimer()
+
 def send_telegram(msg: str):
     if not TG_BOT_TOKEN or not TG_CHAT_ID:
         print("⚠️ 未配置 Telegram 环境变量，跳过通知")
         return
 
-    url = f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendMessage"
     data = {
         "chat_id": TG_CHAT_ID,
         "text": msg,
         "parse_mode": "HTML"
     }
-    requests.post(url, data=data, timeout=10)
+    with tracer.span("notification"):
+        telegram_request(TG_BOT_TOKEN, "sendMessage", data, timeout=10)
 
 
 
@@ -34,91 +50,224 @@ PASSWORD = os.getenv("ZAMPTO_PASSWORD")
 if not USERNAME or not PASSWORD:
     raise RuntimeError("❌ 未检测到 ZAMPTO_EMAIL / ZAMPTO_PASSWORD 环境变量")
 
-SERVER_ID = "2190"
+SERVER_ID = os.getenv("ZAMPTO_SERVER_ID", "2190")
 
-LOGIN_URL = "https://auth.zampto.net/sign-in?app_id=bmhk6c8qdqxphlyscztgl"
-DASH_URL = f"https://dash.zampto.net/server?id={SERVER_ID}"
-RENEW_URL = f"https://dash.zampto.net/server?id={SERVER_ID}&renew=true"
+LOGIN_URL = os.getenv("ZAMPTO_LOGIN_URL", "https://auth.zampto.net/sign-in?app_id=bmhk6c8qdqxphlyscztgl")
+PASSWORD_URL = os.getenv("ZAMPTO_PASSWORD_URL", "https://auth.zampto.net/sign-in/password?app_id=bmhk6c8qdqxphlyscztgl")
+DASH_BASE = os.getenv("ZAMPTO_DASH_URL", "https://dash.zampto.net").rstrip("/")
+DASH_HOST = urlparse(DASH_BASE).netloc
+AUTH_HOST = urlparse(LOGIN_URL).netloc
+DASH_URL = f"{DASH_BASE}/server?id={SERVER_ID}"
+RENEW_URL = f"{DASH_BASE}/server?id={SERVER_ID}&renew=true"
 # =========================================
 
+def login(driver, wait):
+    """先直接打开密码登录页，失败自动回退到完整的两步登录流程，记录成功的路径"""
+    # 带上缓存的 Cloudflare 验证 Cookie，验证页再次出现说明已失效
+    clearance = ClearanceCache()
+    user_agent = driver.execute_script("return navigator.userAgent")
+    if restore_selenium_cookies(driver, clearance.cookies(user_agent)):
+        print("♻️  复用缓存的 Cloudflare 验证 Cookie")
+
+    input_profiles = InputProfileStore()
+    if input_profiles.use_fast_path(USERNAME):
+        try:
+            fast_login(driver, clearance, user_agent)
+            input_profiles.record_path(USERNAME, FAST, True)
+            return
+        except Exception as e:
+            input_profiles.record_path(USERNAME, FAST, False)
+            print(f"⚠️  快速登录未成功，回退到完整登录流程: {e}")
+
+    try:
+        full_login(driver, wait, clearance, user_agent)
+    except Exception:
+        input_profiles.record_path(USERNAME, FULL, False)
+        raise
+    input_profiles.record_path(USERNAME, FULL, True)
+
+def fast_login(driver, clearance, user_agent):
+    """直接打开密码登录页，一次提交账号和密码"""
+    print(f"⚡ 快速登录: {PASSWORD_URL}")
+    launch_timer.navigating()
+    driver.get(PASSWORD_URL)
+    launch_timer.first_page()
+    if selenium_challenge_seen(driver):
+        clearance.forget(user_agent)
+
+    quick = WebDriverWait(driver, 8)
+    password_input = quick.until(EC.visibility_of_element_located((By.NAME, "password")))
+    # 密码页上也有账号输入框时一起填写
+    for email_input in driver.find_elements(By.NAME, "identifier"):
+        if email_input.is_displayed():
+            email_input.clear()
+            email_input.send_keys(USERNAME)
+    password_input.clear()
+    password_input.send_keys(PASSWORD)
+    driver.execute_script("arguments[0].click();", driver.find_element(By.NAME, "submit"))
+
+    quick.until(EC.url_contains(DASH_HOST))
+    print("   ✅ 快速登录成功，跳转至控制台...")
+    launch_timer.cloudflare_result(True)
+    clearance.save(dump_selenium_cookies(driver), user_agent)
+
+def full_login(driver, wait, clearance, user_agent):
+    """完整的两步登录流程"""
+    # === 步骤 1: 输入账号 ===
+    print(f"Testing Login URL: {LOGIN_URL}")
+    launch_timer.navigating()
+    driver.get(LOGIN_URL)
+    launch_timer.first_page()
+    if selenium_challenge_seen(driver):
+        print("⚠️  出现 Cloudflare 验证，缓存的验证 Cookie 已失效")
+        clearance.forget(user_agent)
+    
+    print("1️⃣  精准锁定【用户名】输入框 (name='identifier')...")
+    # 依据: name="identifier"
+    email_input = wait.until(EC.visibility_of_element_located((By.NAME, "identifier")))
+    email_input.clear()
+    email_input.send_keys(USERNAME)
+
+    print("   点击【登录】按钮 (name='submit')...")
+    # 依据: name="submit"
+    driver.find_element(By.NAME, "submit").click()
+
+    # === 步骤 2: 输入密码 ===
+    print("2️⃣  精准锁定【密码】输入框 (name='password')...")
+    # 依据: <input name="password" ...>
+    password_input = wait.until(EC.visibility_of_element_located((By.NAME, "password")))
+    password_input.clear()
+    password_input.send_keys(PASSWORD)
+
+    print("   点击【继续】按钮 (name='submit')...")
+    # 依据: <button name="submit" ...>
+    submit_btn = driver.find_element(By.NAME, "submit")
+    driver.execute_script("arguments[0].click();", submit_btn)
+
+    # === 步骤 3: 提取 Cookie ===
+    print("3️⃣  等待登录跳转...")
+    wait.until(EC.url_contains(DASH_HOST))
+    print("   ✅ 登录成功，跳转至控制台...")
+    launch_timer.cloudflare_result(True)
+    clearance.save(dump_selenium_cookies(driver), user_agent)
+
 def run_task():
     print("🚀 启动 Zampto 自动续期流程 (v7 源码精准版)...")
 
+    renewal_state = RenewalStateStore()
+    history = RunHistory()
+    if SCHEDULE_MODE == "due" and not renewal_state.is_due(SERVER_ID):
+        print(f"📅 服务器 {SERVER_ID} 未到续期窗口 (下次续期: {renewal_state.describe(SERVER_ID)})，跳过")
+        history.record_run("renew", [{
+            "server_id": SERVER_ID, "account": USERNAME, "status": "skipped",
+            "next_renewal": renewal_state.describe(SERVER_ID),
+        }], run_id=tracer.run_id)
+        return
+
     # --- 浏览器配置 ---
     chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-
-    driver = webdriver.Chrome(options=chrome_options)
+    endpoint = service_endpoint()
+    if endpoint:
+        # 常驻浏览器：启动参数由服务端决定，这里只负责连接
+        print(f"🔌 连接常驻浏览器: {endpoint}")
+        selenium_attach_options(chrome_options, endpoint)
+    else:
+        launch_profiles = LaunchProfileStore()
+        profile = launch_profiles.choose()
+        print(f"🚀 启动配置: {profile}")
+        selenium_launch_options(chrome_options, profile)
+        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        launch_timer.start(profile)
+    # performance 日志用来在网络层读取续期接口响应
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    policy = ResourcePolicy()
+    policy.selenium_options(chrome_options)
+
+    with tracer.span("browser_launch"):
+        driver = webdriver.Chrome(options=chrome_options)
+    launch_timer.launched()
+    # 常驻浏览器里用独立的 browser context，结束时只销毁它
+    context_id = open_isolated_window(driver) if endpoint else None
+    policy.apply_selenium(driver)
     wait = WebDriverWait(driver, 20)
+    vault = SessionVault()
+    waiter = Waiter()
+    recorded = False
 
     try:
-        # === 步骤 1: 输入账号 ===
-        print(f"Testing Login URL: {LOGIN_URL}")
-        driver.get(LOGIN_URL)
-        
-        print("1️⃣  精准锁定【用户名】输入框 (name='identifier')...")
-        # 依据: name="identifier"
-        email_input = wait.until(EC.visibility_of_element_located((By.NAME, "identifier")))
-        email_input.clear()
-        email_input.send_keys(USERNAME)
-
-        print("   点击【登录】按钮 (name='submit')...")
-        # 依据: name="submit"
-        driver.find_element(By.NAME, "submit").click()
-
-        # === 步骤 2: 输入密码 ===
-        print("2️⃣  精准锁定【密码】输入框 (name='password')...")
-        # 依据: <input name="password" ...>
-        password_input = wait.until(EC.visibility_of_element_located((By.NAME, "password")))
-        password_input.clear()
-        password_input.send_keys(PASSWORD)
-
-        print("   点击【继续】按钮 (name='submit')...")
-        # 依据: <button name="submit" ...>
-        submit_btn = driver.find_element(By.NAME, "submit")
-        driver.execute_script("arguments[0].click();", submit_btn)
-
-        # === 步骤 3: 提取 Cookie ===
-        print("3️⃣  等待登录跳转...")
-        wait.until(EC.url_contains("dash.zampto.net"))
-        print("   ✅ 登录成功，跳转至控制台...")
+        # === 步骤 0: 复用已保存的会话 ===
+        if vault.is_valid(USERNAME):
+            print("♻️  已保存的会话仍然有效，跳过登录流程")
+            restore_selenium_cookies(driver, vault.cookies(USERNAME))
+        else:
+            with tracer.span("login", account=USERNAME):
+                login(driver, wait)
 
+        launch_timer.navigating()
         driver.get(DASH_URL)
-        time.sleep(2)
+        launch_timer.first_page()
+        waiter.until(driver, EC.url_contains(DASH_HOST), timeout=10000, name="dash")
 
         # 提取 Session
         cookies = driver.get_cookies()
         phpsessid_value = next((c['value'] for c in cookies if c['name'] == 'PHPSESSID'), None)
         if phpsessid_value:
             print(f"   🔑 PHPSESSID: {phpsessid_value}")
+        vault.save(USERNAME, dump_selenium_cookies(driver))
         
         # === 步骤 4: 续期 ===
         print(f"4️⃣  执行续期请求: {RENEW_URL}")
-        driver.get(RENEW_URL)
-        time.sleep(5)
+        started = time.monotonic()
+        with tracer.span("renew_server", account=USERNAME, server=SERVER_ID) as span:
+            drain_selenium_log(driver, policy.count_selenium_entries)
+            driver.get(RENEW_URL)
+            # 在网络层读取续期接口的状态码和 JSON，不再从页面文本里抠
+            status, body = waiter.response_selenium(
+                driver,
+                renew_response_matcher(SERVER_ID),
+                on_entries=policy.count_selenium_entries,
+                name="renew_response"
+            )
+            done, result, renew_json = interpret_renew_response(SERVER_ID, status, body)
+            renewal_state.record(SERVER_ID, renew_json)
+            span["outcome"] = "success" if done and renew_json.get("success") else "failed"
+        entry = (renewal_state.get(SERVER_ID) or {}) if span["outcome"] == "success" else {}
+        history.record_run("renew", [{
+            "server_id": SERVER_ID, "account": USERNAME, "result": result,
+            "duration": time.monotonic() - started,
+            "renewal": entry.get("renewal"), "next_renewal": entry.get("nextRenewal"),
+        }], run_id=tracer.run_id)
+        recorded = True
         
         # 结果判断
-        if "login" in driver.current_url:
+        if status in REDIRECT_STATUSES or AUTH_HOST in driver.current_url:
             print("❌ 失败: 掉线了，被重定向回登录页")
+            vault.forget(USERNAME)
+            exit(1)
+        elif not done or not renew_json.get("success", False):
+            print(f"❌ 失败: {result}")
+            send_telegram(
+                "❌ <b>Zampto VPS 续期失败</b>\n"
+                f"<pre>{result}</pre>"
+            )
             exit(1)
         else:
              print("🎉 续期脚本执行完毕。")
-             print(f"   最终 URL: {driver.current_url}")
+             print(f"   结果: {result}")
 
              send_telegram(
                  "🎉 <b>Zampto VPS 续期成功</b>\n"
-                 f"最终 URL：{driver.current_url}"
+                 f"{result}"
             )
 
 
     except Exception as e:
         print("\n❌❌❌ 发生错误 ❌❌❌")
         print(f"错误信息: {e}")
+        if not recorded:
+            history.record_run("renew", [{
+                "server_id": SERVER_ID, "account": USERNAME, "status": "error", "result": f"{SERVER_ID}: error - {e}",
+            }], run_id=tracer.run_id)
         
         send_telegram(
             "❌ <b>Zampto VPS 续期失败</b>\n"
@@ -127,7 +276,14 @@ def run_task():
         exit(1)
 
     finally:
+        policy.collect_selenium(driver)
+        if context_id:
+            close_isolated_window(driver, context_id)
         driver.quit()
+        if not endpoint:
+            launch_timer.save(launch_profiles)
+        print("⏱️  等待耗时统计:\n" + waiter.format_summary())
+        print(f"🧹 资源拦截统计: {policy.format_summary()}")
 
 if __name__ == "__main__":
     run_task()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+续期状态存储
+按服务器 ID 保存最近一次的 renewal / nextRenewal，
+调度模式下只续期临近到期的服务器，按紧急程度排序
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone, timedelta
+
+RENEWAL_STATE_FILE = os.getenv("ZAMPTO_RENEWAL_STATE_FILE", ".zampto_renewals.json")
+
+# all: 每次全部续期（默认）; due: 只续期窗口内的服务器
+SCHEDULE_MODE = os.getenv("ZAMPTO_SCHEDULE", "all").lower()
+RENEW_WINDOW_HOURS = float(os.getenv("ZAMPTO_RENEW_WINDOW_HOURS", "24"))
+
+# API 返回不带时区的时间时按这个 UTC 偏移（小时）解释，默认北京时间，和 README、日志一致
+SITE_UTC_OFFSET = float(os.getenv("ZAMPTO_SITE_UTC_OFFSET", "8"))
+SITE_TZ = timezone(timedelta(hours=SITE_UTC_OFFSET))
+
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y")
+
+
+def parse_time(value, tz=SITE_TZ):
+    """
+    把 API 返回的时间（秒/毫秒时间戳或日期字符串）转换为时间戳，无法识别返回 None
+    带时区的字符串按自身时区，不带时区的按 tz（站点时区，见 ZAMPTO_SITE_UTC_OFFSET）
+    """
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.strip().isdigit()):
+        ts = float(value)
+        return ts / 1000 if ts > 1e12 else ts
+
+    text = str(value).strip()
+    try:
+        dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=tz)
+        return dt.timestamp()
+    except ValueError:
+        pass
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).replace(tzinfo=tz).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+class RenewalStateStore:
+    def __init__(self, path=RENEWAL_STATE_FILE):
+        """初始化，读取本地状态文件"""
+        self.path = path
+        self.data = self._load()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _flush(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, server_id):
+        return self.data.get(str(server_id))
+
+    def record(self, server_id, json_data):
+        """保存一次成功续期返回的 renewal / nextRenewal"""
+        if not isinstance(json_data, dict) or not json_data.get("success", False):
+            return
+        with self.lock:
+            self.data[str(server_id)] = {
+                "renewal": json_data.get("renewal", ""),
+                "nextRenewal": json_data.get("nextRenewal", ""),
+                "updated_at": int(time.time()),
+            }
+            try:
+                self._flush()
+            except OSError as e:
+                print(f"⚠️ 保存续期状态失败: {e}")
+
+    def next_renewal_ts(self, server_id):
+        entry = self.get(server_id) or {}
+        return parse_time(entry.get("nextRenewal"))
+
+    def is_due(self, server_id, window_hours=RENEW_WINDOW_HOURS, now=None):
+        """没有记录、时间无法解析或已进入到期窗口时返回 True"""
+        next_ts = self.next_renewal_ts(server_id)
+        if next_ts is None:
+            return True
+        return next_ts - (now or time.time()) <= window_hours * 3600
+
+    def plan(self, server_ids, window_hours=RENEW_WINDOW_HOURS, now=None):
+        """
+        返回 (due, skipped)
+        due 按紧急程度排序（没有记录的排最前），skipped 为未到期的服务器
+        """
+        now = now or time.time()
+        due, skipped = [], []
+        for server_id in server_ids:
+            (due if self.is_due(server_id, window_hours, now) else skipped).append(server_id)
+        due.sort(key=lambda sid: self.next_renewal_ts(sid) or 0)
+        return due, skipped
+
+    def describe(self, server_id):
+        entry = self.get(server_id) or {}
+        return entry.get("nextRenewal", "")
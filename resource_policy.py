@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源拦截策略
+默认拦截图片、字体、样式表、媒体和统计脚本，保留 Cloudflare 验证与登录需要的请求，
+并统计每次运行省下的请求数和（估算的）字节数
+"""
+
+import os
+import json
+import threading
+
+BLOCK_RESOURCES = os.getenv("ZAMPTO_BLOCK_RESOURCES", "true").lower() == "true"
+BLOCKED_TYPES = set(
+    t.strip() for t in os.getenv("ZAMPTO_BLOCKED_TYPES", "image,font,stylesheet,media").split(",") if t.strip()
+)
+
+# 统计/广告域名
+TRACKER_PATTERNS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.io",
+    "sentry.io",
+]
+
+# Cloudflare 验证和登录必需的请求，永远放行
+ALLOWLIST_PATTERNS = [
+    "challenges.cloudflare.com",
+    "/cdn-cgi/",
+    "turnstile",
+]
+
+# 被拦截请求无法得知真实大小，按类型估算（字节）
+ESTIMATED_SIZES = {
+    "image": 40000,
+    "font": 30000,
+    "stylesheet": 20000,
+    "media": 200000,
+    "script": 30000,
+    "other": 5000,
+}
+
+# Selenium 通过 CDP Network.setBlockedURLs 拦截，只能按 URL 通配，无法设置白名单；
+# 图片、字体、媒体只在站点自己的域名下拦截，challenges.cloudflare.com 等验证资源不受影响，
+# 站点上的 /cdn-cgi/ 验证资源是脚本，不在拦截范围；不拦截 *.css，避免影响验证页
+SELENIUM_BLOCK_HOSTS = [
+    h.strip() for h in os.getenv("ZAMPTO_BLOCK_HOSTS", "zampto.net").split(",") if h.strip()
+]
+SELENIUM_BLOCKED_EXTENSIONS = [
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico",
+    ".woff", ".woff2", ".ttf", ".otf",
+    ".mp4", ".webm",
+]
+
+
+def selenium_blocked_urls(hosts=SELENIUM_BLOCK_HOSTS):
+    """站点域名（含子域名）下的静态资源 + 统计脚本"""
+    urls = []
+    for host in hosts:
+        for ext in SELENIUM_BLOCKED_EXTENSIONS:
+            urls += [f"*://{host}/*{ext}", f"*://*.{host}/*{ext}"]
+    return urls + [f"*{p}*" for p in TRACKER_PATTERNS]
+
+
+SELENIUM_BLOCKED_URLS = selenium_blocked_urls()
+
+EXTENSION_TYPES = {
+    "image": (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico"),
+    "font": (".woff", ".woff2", ".ttf", ".otf"),
+    "media": (".mp4", ".webm"),
+    "stylesheet": (".css",),
+}
+
+
+def guess_type(url):
+    path = url.split("?", 1)[0].lower()
+    for resource_type, extensions in EXTENSION_TYPES.items():
+        if path.endswith(extensions):
+            return resource_type
+    return "other"
+
+
+class ResourcePolicy:
+    def __init__(self, enabled=BLOCK_RESOURCES, blocked_types=BLOCKED_TYPES):
+        self.enabled = enabled
+        self.blocked_types = set(blocked_types)
+        self.blocked_requests = 0
+        self.allowed_requests = 0
+        self.saved_bytes = 0
+        self.by_type = {}
+        self.lock = threading.Lock()
+
+    def should_block(self, url, resource_type):
+        if not self.enabled:
+            return False
+        if any(p in url for p in ALLOWLIST_PATTERNS):
+            return False
+        if any(p in url for p in TRACKER_PATTERNS):
+            return True
+        return resource_type in self.blocked_types
+
+    def _count(self, blocked, resource_type):
+        with self.lock:
+            if not blocked:
+                self.allowed_requests += 1
+                return
+            self.blocked_requests += 1
+            self.saved_bytes += ESTIMATED_SIZES.get(resource_type, ESTIMATED_SIZES["other"])
+            self.by_type[resource_type] = self.by_type.get(resource_type, 0) + 1
+
+    # ================= Playwright =================
+    def _handle(self, route):
+        request = route.request
+        blocked = self.should_block(request.url, request.resource_type)
+        self._count(blocked, request.resource_type)
+        if blocked:
+            route.abort()
+        else:
+            route.continue_()
+
+    async def _handle_async(self, route):
+        request = route.request
+        blocked = self.should_block(request.url, request.resource_type)
+        self._count(blocked, request.resource_type)
+        if blocked:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def apply(self, context):
+        """为 Playwright context 安装拦截规则"""
+        if self.enabled:
+            context.route("**/*", self._handle)
+
+    async def apply_async(self, context):
+        if self.enabled:
+            await context.route("**/*", self._handle_async)
+
+    # ================= Selenium =================
+    def selenium_options(self, chrome_options):
+        """开启 performance 日志，用来统计被拦截的请求"""
+        if self.enabled:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        return chrome_options
+
+    def apply_selenium(self, driver):
+        """通过 CDP 为 Selenium 安装拦截规则"""
+        if not self.enabled:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": SELENIUM_BLOCKED_URLS})
+        except Exception as e:
+            print(f"⚠️ 设置资源拦截失败: {e}")
+
+    def collect_selenium(self, driver):
+        """读取 performance 日志，统计被拦截和放行的请求"""
+        if not self.enabled:
+            return
+
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return
+        self.count_selenium_entries(entries)
+
+    def count_selenium_entries(self, entries):
+        """统计已读出的 performance 日志（get_log 会清空日志，其他地方读到的也要交给这里）"""
+        if not self.enabled:
+            return
+
+        urls = {}
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                urls[params.get("requestId")] = params.get("request", {}).get("url", "")
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                url = urls.pop(params.get("requestId"), "")
+                self._count(True, guess_type(url))
+            elif method == "Network.loadingFinished":
+                urls.pop(params.get("requestId"), None)
+                self._count(False, "other")
+
+    # ================= 统计 =================
+    def format_summary(self):
+        if not self.enabled:
+            return "资源拦截未开启"
+        detail = ", ".join(f"{t}: {n}" for t, n in sorted(self.by_type.items()))
+        return (
+            f"拦截 {self.blocked_requests} 个请求 (放行 {self.allowed_requests})，"
+            f"估算节省 {self.saved_bytes / 1024:.0f} KB（按资源类型估算，非实测）" + (f" [{detail}]" if detail else "")
+        )
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行历史
+每次运行、每台服务器追加一行（耗时、状态、nextRenewal）到 SQLite，
+按服务器和时间建索引，提供成功率、耗时趋势、最近一次成功续期的查询，
+README 和心跳文件都从这里生成，不再各自覆盖写
+
+查看: python run_history.py [历史库文件]
+"""
+
+import os
+import sys
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timezone, timedelta
+
+from tracing import mask_email, renew_outcome
+
+HISTORY_FILE = os.getenv("ZAMPTO_HISTORY_FILE", ".zampto_history.db")
+
+# README 里成功率和耗时的统计天数
+HISTORY_DAYS = int(os.getenv("ZAMPTO_HISTORY_DAYS", "30"))
+# 超过保留天数的记录在写入时清理，0 表示永久保留
+RETENTION_DAYS = int(os.getenv("ZAMPTO_HISTORY_RETENTION_DAYS", "365"))
+
+SUCCESS = "success"
+SKIPPED = "skipped"
+
+BEIJING = timezone(timedelta(hours=8))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renewals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    script TEXT NOT NULL,
+    ts REAL NOT NULL,
+    account TEXT,
+    server_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL,
+    renewal TEXT,
+    next_renewal TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_renewals_server_ts ON renewals (server_id, ts);
+CREATE INDEX IF NOT EXISTS idx_renewals_run ON renewals (run_id);
+CREATE INDEX IF NOT EXISTS idx_renewals_ts ON renewals (ts);
+"""
+
+COLUMNS = ("run_id", "script", "ts", "account", "server_id", "status", "duration", "renewal", "next_renewal", "result")
+
+
+def result_status(result):
+    """把结果字符串转换为状态：success / skipped / api_failed / login_failed / error ..."""
+    text = str(result or "")
+    if text.startswith("error:"):
+        return "error"
+    return renew_outcome(text)
+
+
+def format_time(ts, tz=BEIJING):
+    return datetime.fromtimestamp(ts, tz).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class RunHistory:
+    def __init__(self, path=HISTORY_FILE, retention_days=RETENTION_DAYS):
+        """初始化，没有历史库时自动建表"""
+        self.path = path
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        with self.lock, closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _query(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    # ================= 写入 =================
+    def record_run(self, script, rows, run_id=None, ts=None):
+        """
+        追加一次运行的结果，rows 为 [{"server_id", "status"/"result", "duration",
+        "account", "renewal", "next_renewal"}]，返回 run_id
+        """
+        run_id = run_id or f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        ts = ts or time.time()
+        records = []
+        for row in rows:
+            account = row.get("account")
+            records.append((
+                run_id,
+                script,
+                ts,
+                mask_email(account) if account else None,
+                str(row["server_id"]),
+                row.get("status") or result_status(row.get("result")),
+                round(row["duration"], 3) if row.get("duration") is not None else None,
+                row.get("renewal") or None,
+                row.get("next_renewal") or None,
+                row.get("result"),
+            ))
+        if not records:
+            return run_id
+        try:
+            with self.lock, closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    f"INSERT INTO renewals ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    records,
+                )
+                if self.retention_days > 0:
+                    conn.execute("DELETE FROM renewals WHERE ts < ?", (ts - self.retention_days * 86400,))
+        except sqlite3.Error as e:
+            print(f"⚠️ 写入运行历史失败: {e}")
+        return run_id
+
+    # ================= 查询 =================
+    @staticmethod
+    def _filters(server_id=None, script=None, since=None):
+        clauses, params = [], []
+        if server_id is not None:
+            clauses.append("server_id = ?")
+            params.append(str(server_id))
+        if script:
+            clauses.append("script = ?")
+            params.append(script)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        return (" AND ".join(clauses) or "1"), params
+
+    def latest_run(self, script=None):
+        """最近一次运行的所有行，按写入顺序；没有记录时返回 []"""
+        where, params = self._filters(script=script)
+        latest = self._query(f"SELECT run_id FROM renewals WHERE {where} ORDER BY ts DESC, id DESC LIMIT 1", params)
+        if not latest:
+            return []
+        return self.run_rows(latest[0]["run_id"])
+
+    def servers(self, script=None):
+        where, params = self._filters(script=script)
+        return [r["server_id"] for r in self._query(
+            f"SELECT server_id, MIN(id) AS first FROM renewals WHERE {where} GROUP BY server_id ORDER BY first", params
+        )]
+
+    def success_rate(self, server_id=None, days=HISTORY_DAYS, script=None, now=None):
+        """
+        返回 (成功次数, 尝试次数, 成功率)，跳过的不计入尝试
+        没有尝试时成功率为 None
+        """
+        since = (now or time.time()) - days * 86400
+        where, params = self._filters(server_id, script, since)
+        row = self._query(
+            f"SELECT SUM(status = ?) AS ok, COUNT(*) AS total FROM renewals WHERE {where} AND status != ?",
+            [SUCCESS] + params + [SKIPPED],
+        )[0]
+        ok, total = row["ok"] or 0, row["total"] or 0
+        return ok, total, (ok / total if total else None)
+
+    def latency_trend(self, server_id=None, days=HISTORY_DAYS, script=None, now=None):
+        """按天（北京时间）统计续期耗时，返回 [{"day", "count", "avg", "max"}]，按日期升序"""
+        since = (now or time.time()) - days * 86400
+        where, params = self._filters(server_id, script, since)
+        return self._query(
+            f"""SELECT date(ts + 8 * 3600, 'unixepoch') AS day, COUNT(*) AS count,
+                       AVG(duration) AS avg, MAX(duration) AS max
+                FROM renewals WHERE {where} AND duration IS NOT NULL AND status != ?
+                GROUP BY day ORDER BY day""",
+            params + [SKIPPED],
+        )
+
+    def last_good(self, server_id, script=None):
+        """该服务器最近一次成功续期的行，没有时返回 None"""
+        where, params = self._filters(server_id, script)
+        rows = self._query(
+            f"SELECT * FROM renewals WHERE {where} AND status = ? ORDER BY ts DESC, id DESC LIMIT 1",
+            params + [SUCCESS],
+        )
+        return rows[0] if rows else None
+
+    def last_seen(self, server_id, script=None):
+        where, params = self._filters(server_id, script)
+        rows = self._query(f"SELECT * FROM renewals WHERE {where} ORDER BY ts DESC, id DESC LIMIT 1", params)
+        return rows[0] if rows else None
+
+    # ================= 输出 =================
+    def render_readme(self, script=None, days=HISTORY_DAYS):
+        """从历史库生成 README：最近一次运行结果 + 每台服务器的历史统计"""
+        latest = self.latest_run(script)
+        content = "# Zampto 自动续期脚本\n\n"
+        if not latest:
+            return content + "暂无运行记录\n"
+
+        content += f"**最后运行时间**: `{format_time(latest[0]['ts'])}` (北京时间)\n\n## 运行结果\n\n"
+        for row in latest:
+            content += f"- {row['result'] or row['server_id'] + ': ' + row['status']}\n"
+
+        content += (
+            f"\n## 服务器历史（近 {days} 天）\n\n"
+            "| 服务器 | 最近状态 | 最近成功续期 | 下次续期 | 成功率 | 平均耗时 |\n"
+            "| --- | --- | --- | --- | --- | --- |\n"
+        )
+        for server_id in self.servers(script):
+            seen = self.last_seen(server_id, script)
+            good = self.last_good(server_id, script)
+            ok, total, rate = self.success_rate(server_id, days, script)
+            trend = self.latency_trend(server_id, days, script)
+            count = sum(t["count"] for t in trend)
+            avg = sum(t["avg"] * t["count"] for t in trend) / count if count else None
+            content += "| {} | {} | {} | {} | {} | {} |\n".format(
+                server_id,
+                seen["status"],
+                format_time(good["ts"]) if good else "-",
+                (good or {}).get("next_renewal") or "-",
+                f"{rate:.0%} ({ok}/{total})" if rate is not None else "-",
+                f"{avg:.1f}s" if avg is not None else "-",
+            )
+        return content
+
+    def write_readme(self, path="README.md", script=None, days=HISTORY_DAYS):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.render_readme(script, days))
+
+    def run_rows(self, run_id):
+        return self._query("SELECT * FROM renewals WHERE run_id = ? ORDER BY id", (run_id,))
+
+    def render_heartbeat(self, script=None, run_id=None):
+        """
+        心跳文件内容：最近一次运行时间和成功数
+        指定 run_id 时只看这次运行，这次没有写入任何行时用当前时间，保证心跳文件每次都会变化
+        """
+        latest = self.run_rows(run_id) if run_id else self.latest_run(script)
+        if not latest:
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+            return f"Last run: {now}\n"
+        ts = datetime.fromtimestamp(latest[0]["ts"], timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        attempted = [r for r in latest if r["status"] != SKIPPED]
+        ok = sum(r["status"] == SUCCESS for r in attempted)
+        return f"Last run: {ts}\nRenewed: {ok}/{len(attempted)}, skipped: {len(latest) - len(attempted)}\n"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    history = RunHistory(argv[0] if argv else HISTORY_FILE)
+    print(history.render_readme())
+
+
+if __name__ == "__main__":
+    main()
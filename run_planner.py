@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行计划
+整次运行有一个总时限，登录和续期各有重试次数，重试之间指数退避加随机抖动；
+账号连续登录失败达到阈值后熔断，冷却期内直接跳过，不再拖慢整次运行；
+因时限或熔断被跳过的服务器记录下来，放进结果汇总
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+
+from tracing import renew_outcome
+
+# 整次运行的总时限（秒），超过后剩下的账号和服务器直接跳过
+RUN_DEADLINE = float(os.getenv("ZAMPTO_RUN_DEADLINE", "900"))
+
+# 每个账号登录、每台服务器续期的最多尝试次数
+LOGIN_ATTEMPTS = max(1, int(os.getenv("ZAMPTO_LOGIN_ATTEMPTS", "2")))
+RENEW_ATTEMPTS = max(1, int(os.getenv("ZAMPTO_RENEW_ATTEMPTS", "2")))
+
+# 退避: 第 n 次重试前等待 uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2^n)) 秒
+BACKOFF_BASE = float(os.getenv("ZAMPTO_BACKOFF_BASE", "2"))
+BACKOFF_MAX = float(os.getenv("ZAMPTO_BACKOFF_MAX", "30"))
+
+# 熔断: 连续登录失败次数阈值和冷却时间
+BREAKER_FILE = os.getenv("ZAMPTO_BREAKER_FILE", ".zampto_breaker.json")
+BREAKER_THRESHOLD = int(os.getenv("ZAMPTO_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN_HOURS = float(os.getenv("ZAMPTO_BREAKER_COOLDOWN_HOURS", "24"))
+
+# 跳过原因
+BUDGET = "budget"
+CIRCUIT_OPEN = "circuit_open"
+
+# 这些续期结果是临时错误，值得重试；api_failed 等是接口明确的回答，重试也一样
+RETRYABLE_RENEW = ("error", "no_response", "http_status", "http_not_json")
+
+
+def renew_settled(result):
+    """续期结果不是临时错误时不再重试"""
+    return renew_outcome(result) not in RETRYABLE_RENEW
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """full jitter: 第 attempt 次重试（从 1 开始）前的等待秒数"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """按账号记录连续登录失败次数，跨运行保存"""
+
+    def __init__(self, path=BREAKER_FILE, threshold=BREAKER_THRESHOLD, cooldown_hours=BREAKER_COOLDOWN_HOURS):
+        self.path = path
+        self.threshold = threshold
+        self.cooldown = cooldown_hours * 3600
+        self.data = self._load()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _flush(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(email):
+        return (email or "").strip().lower()
+
+    def allow(self, email, now=None):
+        """
+        熔断未打开，或冷却期已过（半开，放行一次尝试）时返回 True
+        threshold <= 0 表示不启用熔断
+        """
+        if self.threshold <= 0:
+            return True
+        entry = self.data.get(self._key(email)) or {}
+        if entry.get("failures", 0) < self.threshold:
+            return True
+        return (now or time.time()) - entry.get("opened_at", 0) >= self.cooldown
+
+    def record(self, email, ok):
+        """登录成功清零；失败累加，达到阈值时（重新）打开熔断"""
+        key = self._key(email)
+        with self.lock:
+            if ok:
+                if self.data.pop(key, None) is None:
+                    return
+            else:
+                entry = self.data.setdefault(key, {"failures": 0})
+                entry["failures"] += 1
+                if entry["failures"] >= self.threshold > 0:
+                    entry["opened_at"] = int(time.time())
+                    print(f"🔌 账号连续 {entry['failures']} 次登录失败，熔断 {self.cooldown / 3600:g} 小时")
+            try:
+                self._flush()
+            except OSError as e:
+                print(f"⚠️ 保存熔断状态失败: {e}")
+
+
+class RunPlanner:
+    def __init__(self, deadline=RUN_DEADLINE, breaker=None):
+        """deadline 为从现在起的总时限（秒），<= 0 表示不限"""
+        self.deadline = time.monotonic() + deadline if deadline > 0 else None
+        self.breaker = breaker or CircuitBreaker()
+        self.skipped = []
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        if self.deadline is None:
+            return float("inf")
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def skip(self, account, server_ids, reason):
+        """记录被跳过的服务器，返回 "id: skipped - reason" 形式的结果"""
+        results = []
+        with self.lock:
+            for server_id in server_ids:
+                self.skipped.append({"account": account, "server_id": server_id, "reason": reason})
+                results.append(f"{server_id}: skipped - {reason}")
+        return results
+
+    def _next_delay(self, attempt, attempts, name):
+        """还能重试且时限内等得起时返回等待秒数，否则返回 None"""
+        if attempt >= attempts:
+            return None
+        delay = backoff_delay(attempt)
+        if delay >= self.remaining():
+            print(f"⏳ {name}: 剩余时间不足，不再重试")
+            return None
+        print(f"🔁 {name}: 第 {attempt} 次失败，{delay:.1f}s 后重试")
+        return delay
+
+    def retry(self, name, func, *args, attempts=1, is_success=bool, **kwargs):
+        """
+        最多调用 attempts 次，直到 is_success(结果) 为真，失败之间退避等待
+        返回最后一次的结果；最后一次抛出异常时继续抛出
+        """
+        for attempt in range(1, attempts + 1):
+            error = None
+            try:
+                result = func(*args, **kwargs)
+                if is_success(result):
+                    return result
+            except Exception as e:
+                error = e
+            delay = self._next_delay(attempt, attempts, name)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+            time.sleep(delay)
+
+    async def retry_async(self, name, func, *args, attempts=1, is_success=bool, **kwargs):
+        for attempt in range(1, attempts + 1):
+            error = None
+            try:
+                result = await func(*args, **kwargs)
+                if is_success(result):
+                    return result
+            except Exception as e:
+                error = e
+            delay = self._next_delay(attempt, attempts, name)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+            await asyncio.sleep(delay)
+
+    def format_summary(self):
+        if not self.skipped:
+            return "无"
+        counts = {}
+        for entry in self.skipped:
+            counts[entry["reason"]] = counts.get(entry["reason"], 0) + 1
+        return ", ".join(f"{reason}: {count} 台" for reason, count in counts.items())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截图策略
+never 不截图 / failure 只在失败时截图 / always 每次都截图，
+只截当前视口或指定元素，由浏览器直接编码为 JPEG / WebP，
+解码、写文件和后续上传交给后台线程，不阻塞下一个账号
+"""
+
+import os
+import queue
+import base64
+import threading
+
+# never / failure / always
+SCREENSHOT_POLICY = os.getenv("ZAMPTO_SCREENSHOTS", "always").lower()
+# jpeg / webp
+SCREENSHOT_FORMAT = os.getenv("ZAMPTO_SCREENSHOT_FORMAT", "jpeg").lower()
+SCREENSHOT_QUALITY = max(1, min(100, int(os.getenv("ZAMPTO_SCREENSHOT_QUALITY", "60"))))
+
+EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp"}
+
+# 取元素在视口中的位置，用于裁剪
+RECT_SCRIPT = """
+const el = document.querySelector(arguments[0]);
+if (!el) return null;
+const r = el.getBoundingClientRect();
+return {x: r.left + window.scrollX, y: r.top + window.scrollY, width: r.width, height: r.height};
+"""
+
+
+def should_capture(success, policy=SCREENSHOT_POLICY):
+    if policy == "never":
+        return False
+    if policy == "failure":
+        return not success
+    return True
+
+
+def image_format(fmt=SCREENSHOT_FORMAT):
+    return fmt if fmt in EXTENSIONS else "jpeg"
+
+
+def image_path(base, fmt=SCREENSHOT_FORMAT):
+    """按格式补上扩展名"""
+    return base + EXTENSIONS[image_format(fmt)]
+
+
+# ================= 截图 =================
+def capture_selenium(driver, selector=None, fmt=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY):
+    """
+    通过 CDP Page.captureScreenshot 截取视口（或 selector 对应的元素），
+    返回 base64 字符串，由后台线程解码
+    """
+    params = {"format": image_format(fmt), "quality": quality, "captureBeyondViewport": False}
+    if selector:
+        try:
+            rect = driver.execute_script(RECT_SCRIPT, selector)
+        except Exception:
+            rect = None
+        if rect and rect["width"] > 0 and rect["height"] > 0:
+            params["clip"] = dict(rect, scale=1)
+    return driver.execute_cdp_cmd("Page.captureScreenshot", params)["data"]
+
+
+def capture_playwright(page, selector=None, fmt=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY):
+    """
+    截取视口（或 selector 对应的元素），返回图片字节
+    Playwright 只支持 PNG/JPEG，WebP 通过 CDP 会话截取
+    """
+    if image_format(fmt) == "webp":
+        cdp = page.context.new_cdp_session(page)
+        try:
+            return cdp.send("Page.captureScreenshot", {"format": "webp", "quality": quality})["data"]
+        finally:
+            cdp.detach()
+    element = page.query_selector(selector) if selector else None
+    if element:
+        return element.screenshot(type="jpeg", quality=quality)
+    return page.screenshot(type="jpeg", quality=quality)
+
+
+async def capture_playwright_async(page, selector=None, fmt=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY):
+    """capture_playwright 的 async 版本"""
+    if image_format(fmt) == "webp":
+        cdp = await page.context.new_cdp_session(page)
+        try:
+            return (await cdp.send("Page.captureScreenshot", {"format": "webp", "quality": quality}))["data"]
+        finally:
+            await cdp.detach()
+    element = await page.query_selector(selector) if selector else None
+    if element:
+        return await element.screenshot(type="jpeg", quality=quality)
+    return await page.screenshot(type="jpeg", quality=quality)
+
+
+# ================= 后台写入 =================
+class ScreenshotWriter:
+    """
+    后台线程解码并写入截图，写完后调用回调（例如交给 Telegram 发送）
+    第一次提交时才启动线程，close() 等待全部写完，之后可以继续使用
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def submit(self, data, path, on_saved=None):
+        """data 为图片字节或 base64 字符串"""
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+                self.worker.start()
+        self.queue.put((data, path, on_saved))
+
+    def close(self, timeout=60):
+        with self.lock:
+            worker, self.worker = self.worker, None
+        if worker:
+            self.queue.put(None)
+            worker.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            data, path, on_saved = item
+            try:
+                if isinstance(data, str):
+                    data = base64.b64decode(data)
+                with open(path, "wb") as f:
+                    f.write(data)
+                if on_saved:
+                    on_saved(path)
+            except Exception as e:
+                print(f"⚠️ 保存截图失败 {path}: {e}")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+选择器缓存
+记录每个表单角色（邮箱、密码、提交、登录按钮、账户选择）上次命中的选择器，
+下次优先尝试；所有候选在一次 page.evaluate 中批量判断，避免逐个 count() 往返
+候选可以是带 {email} 等占位符的模板，缓存里只保存模板，运行时再代入，不把邮箱写进缓存文件
+"""
+
+import os
+import json
+import threading
+
+SELECTOR_CACHE_FILE = os.getenv("ZAMPTO_SELECTOR_CACHE", ".zampto_selectors.json")
+
+# 在页面内按顺序判断每组候选选择器，返回每组第一个命中的下标
+# 支持普通 CSS、XPath（// 开头）以及 Playwright 的 tag:has-text("...") 写法
+RESOLVE_SCRIPT = """
+([groups, visibleOnly]) => {
+    const norm = (s) => (s || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const isVisible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const query = (sel) => {
+        if (sel.startsWith('//')) {
+            const r = document.evaluate(sel, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const out = [];
+            for (let i = 0; i < r.snapshotLength; i++) out.push(r.snapshotItem(i));
+            return out;
+        }
+        const m = sel.match(/^(.*):has-text\\("(.*)"\\)$/);
+        if (m) {
+            const text = norm(m[2]);
+            return Array.from(document.querySelectorAll(m[1] || '*')).filter((el) => norm(el.textContent).includes(text));
+        }
+        return Array.from(document.querySelectorAll(sel));
+    };
+    const first = (selectors) => {
+        for (let i = 0; i < selectors.length; i++) {
+            try {
+                const els = query(selectors[i]);
+                if (els.length && (!visibleOnly || isVisible(els[0]))) return i;
+            } catch (e) {}
+        }
+        return -1;
+    };
+    return groups.map(first);
+}
+"""
+
+
+def to_locator(page, selector):
+    return page.locator(f'xpath={selector}' if selector.startswith('//') else selector).first
+
+
+def fill(template, values=None):
+    """把 {key} 占位符替换为 values 中的值（不用 str.format，选择器里可能有花括号）"""
+    for key, value in (values or {}).items():
+        template = template.replace("{" + key + "}", value)
+    return template
+
+
+class SelectorCache:
+    def __init__(self, path=SELECTOR_CACHE_FILE):
+        """初始化，读取本地缓存文件"""
+        self.path = path
+        self.data = self._load()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def ordered(self, role, candidates):
+        """上次命中的选择器排在最前"""
+        cached = self.data.get(role)
+        if cached in candidates:
+            return [cached] + [c for c in candidates if c != cached]
+        return list(candidates)
+
+    def _flush(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def remember(self, role, selector):
+        """selector 为模板（未代入占位符）"""
+        if self.data.get(role) == selector:
+            return
+        with self.lock:
+            self.data[role] = selector
+            try:
+                self._flush()
+            except OSError:
+                pass
+
+    def _prepare(self, role_candidates, values):
+        roles = list(role_candidates)
+        ordered = [self.ordered(role, role_candidates[role]) for role in roles]
+        filled = [[fill(s, values) for s in selectors] for selectors in ordered]
+        return roles, ordered, filled
+
+    def _collect(self, roles, ordered, filled, indexes, page):
+        found = {}
+        for role, templates, selectors, index in zip(roles, ordered, filled, indexes):
+            if index < 0:
+                found[role] = (None, None)
+                continue
+            self.remember(role, templates[index])
+            found[role] = (to_locator(page, selectors[index]), selectors[index])
+        return found
+
+    def resolve_many(self, page, role_candidates, visible=False, values=None):
+        """
+        一次 DOM 查询解析多个角色
+        role_candidates: {role: [selector, ...]}，values 为模板占位符的值，例如 {"email": ...}
+        返回 {role: (locator, selector)}，未命中为 (None, None)
+        """
+        roles, ordered, filled = self._prepare(role_candidates, values)
+        try:
+            indexes = page.evaluate(RESOLVE_SCRIPT, [filled, visible])
+        except Exception:
+            indexes = [-1] * len(roles)
+        return self._collect(roles, ordered, filled, indexes, page)
+
+    def resolve(self, page, role, candidates, visible=False, values=None):
+        """解析单个角色，返回 (locator, selector)"""
+        return self.resolve_many(page, {role: candidates}, visible, values)[role]
+
+    async def resolve_many_async(self, page, role_candidates, visible=False, values=None):
+        """resolve_many 的异步版本"""
+        roles, ordered, filled = self._prepare(role_candidates, values)
+        try:
+            indexes = await page.evaluate(RESOLVE_SCRIPT, [filled, visible])
+        except Exception:
+            indexes = [-1] * len(roles)
+        return self._collect(roles, ordered, filled, indexes, page)
+
+    async def resolve_async(self, page, role, candidates, visible=False, values=None):
+        """resolve 的异步版本"""
+        return (await self.resolve_many_async(page, {role: candidates}, visible, values))[role]
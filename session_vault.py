@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zampto 会话保险箱
+按账号保存 Playwright storage_state 与 Selenium Cookie（含 PHPSESSID），
+下次运行先用一次轻量请求校验，仍然有效就跳过完整登录流程
+"""
+
+import os
+import json
+import time
+import threading
+
+import requests
+
+VAULT_FILE = os.getenv("ZAMPTO_SESSION_FILE", ".zampto_sessions.json")
+PROBE_URL = os.getenv("ZAMPTO_SESSION_PROBE_URL", "https://dash.zampto.net/")
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Playwright storage_state 与 CDP Network.getAllCookies 共用的字段
+COOKIE_KEYS = ("name", "value", "domain", "path", "expires", "httpOnly", "secure", "sameSite")
+
+
+def _account_key(email):
+    return (email or "").strip().lower()
+
+
+def _is_expired(cookie, now=None):
+    expires = cookie.get("expires", -1)
+    # -1 / 0 表示会话 Cookie，不按过期处理
+    return expires not in (None, -1, 0) and expires < (now or time.time())
+
+
+def normalize_cookies(cookies):
+    """统一成 Playwright/CDP 格式，兼容 Selenium get_cookies() 的 expiry 字段"""
+    normalized = []
+    for cookie in cookies or []:
+        item = {k: cookie[k] for k in COOKIE_KEYS if k in cookie}
+        if "expires" not in item and "expiry" in cookie:
+            item["expires"] = cookie["expiry"]
+        if item.get("name") and "value" in item:
+            normalized.append(item)
+    return normalized
+
+
+class SessionVault:
+    def __init__(self, path=VAULT_FILE):
+        """初始化，读取本地会话文件"""
+        self.path = path
+        self.data = self._load()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _flush(self):
+        """先写临时文件再替换，避免中途失败留下半个文件（调用方需持有 self.lock）"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def get(self, email):
+        return self.data.get(_account_key(email))
+
+    def cookies(self, email):
+        """返回未过期的 Cookie 列表（Playwright/CDP 格式）"""
+        entry = self.get(email) or {}
+        now = time.time()
+        return [c for c in entry.get("cookies", []) if not _is_expired(c, now)]
+
+    def storage_state(self, email):
+        """返回可直接传给 browser.new_context(storage_state=...) 的字典"""
+        entry = self.get(email) or {}
+        state = entry.get("storage_state")
+        if state:
+            return {"cookies": self.cookies(email), "origins": state.get("origins", [])}
+        cookies = self.cookies(email)
+        return {"cookies": cookies, "origins": []} if cookies else None
+
+    def phpsessid(self, email):
+        return next((c["value"] for c in self.cookies(email) if c["name"] == "PHPSESSID"), None)
+
+    def save(self, email, cookies, storage_state=None):
+        """保存登录后的会话"""
+        try:
+            entry = {
+                "cookies": normalize_cookies(cookies),
+                "saved_at": int(time.time()),
+            }
+            if storage_state:
+                entry["storage_state"] = {"origins": storage_state.get("origins", [])}
+            entry["phpsessid"] = next(
+                (c["value"] for c in entry["cookies"] if c["name"] == "PHPSESSID"), None
+            )
+            with self.lock:
+                self.data[_account_key(email)] = entry
+                self._flush()
+        except Exception as e:
+            print(f"⚠️ 保存会话失败: {e}")
+
+    def save_storage_state(self, email, storage_state):
+        """保存 Playwright context.storage_state()"""
+        self.save(email, storage_state.get("cookies", []), storage_state)
+
+    def forget(self, email):
+        with self.lock:
+            if self.data.pop(_account_key(email), None) is not None:
+                try:
+                    self._flush()
+                except OSError:
+                    pass
+
+    def is_valid(self, email, probe_url=PROBE_URL, user_agent=DEFAULT_USER_AGENT):
+        """用一次不跟随跳转的 GET 请求判断会话是否还在登录状态"""
+        cookies = self.cookies(email)
+        if not cookies:
+            return False
+
+        session = requests.Session()
+        session.headers["User-Agent"] = user_agent
+        for c in cookies:
+            session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+
+        try:
+            resp = session.get(probe_url, allow_redirects=False, timeout=10)
+        except requests.RequestException as e:
+            print(f"⚠️ 会话校验请求失败: {e}")
+            return False
+
+        location = resp.headers.get("Location", "")
+        valid = resp.status_code == 200 or (
+            resp.is_redirect and not any(k in location for k in ("auth.zampto.net", "sign-in", "login"))
+        )
+        if not valid:
+            self.forget(email)
+        return valid
+
+
+# ================= Selenium 辅助 =================
+def dump_selenium_cookies(driver):
+    """通过 CDP 拿到所有域名的 Cookie，get_cookies() 只能拿到当前域名"""
+    try:
+        return driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+    except Exception:
+        return driver.get_cookies()
+
+
+def restore_selenium_cookies(driver, cookies):
+    """通过 CDP 写回 Cookie，不需要先打开对应域名的页面"""
+    params = []
+    for cookie in normalize_cookies(cookies):
+        item = dict(cookie)
+        if item.get("expires") in (None, -1, 0):
+            item.pop("expires", None)
+        if item.get("sameSite") not in ("Strict", "Lax", "None"):
+            item.pop("sameSite", None)
+        params.append(item)
+    if params:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+    return len(params)
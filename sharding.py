@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片运行
+按账号（main.py 按服务器 ID）的哈希稳定地分配到 ZAMPTO_SHARD_COUNT 个分片，
+每台机器只处理 ZAMPTO_SHARD_INDEX 对应的那一片，结果写入分片结果文件，
+全部分片结束后由合并步骤生成唯一的一份 Telegram 汇总和 README
+
+分片:  ZAMPTO_SHARD_INDEX=0 ZAMPTO_SHARD_COUNT=3 python zaprenew.py
+合并:  把各分片的 ZAMPTO_SHARD_DIR 收集到一起后  python zaprenew.py --merge
+"""
+
+import os
+import json
+import time
+import glob
+import hashlib
+
+SHARD_INDEX = int(os.getenv("ZAMPTO_SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("ZAMPTO_SHARD_COUNT", "1"))
+SHARD_DIR = os.getenv("ZAMPTO_SHARD_DIR", "shards")
+
+MERGE_FLAG = "--merge"
+
+
+def is_sharded(count=SHARD_COUNT):
+    return count > 1
+
+
+def shard_of(key, count=SHARD_COUNT):
+    """同一个 key 在任何机器、任何次运行都落在同一个分片（不用 hash()，它每个进程都会变）"""
+    digest = hashlib.sha1(str(key).strip().lower().encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % count
+
+
+def select_shard(items, key, index=SHARD_INDEX, count=SHARD_COUNT):
+    """只保留属于当前分片的元素，保持原顺序；key 为从元素取分片键的函数"""
+    if not is_sharded(count):
+        return list(items)
+    if not 0 <= index < count:
+        raise ValueError(f"❌ ZAMPTO_SHARD_INDEX={index} 超出范围 (0..{count - 1})")
+    return [item for item in items if shard_of(key(item), count) == index]
+
+
+def partial_path(script, index=SHARD_INDEX, count=SHARD_COUNT, directory=SHARD_DIR):
+    return os.path.join(directory, f"{script}-{index}-of-{count}.json")
+
+
+def write_partial(script, payload, index=SHARD_INDEX, count=SHARD_COUNT, directory=SHARD_DIR):
+    """写入本分片的结果文件，返回路径"""
+    os.makedirs(directory, exist_ok=True)
+    path = partial_path(script, index, count, directory)
+    data = dict(payload, script=script, shard=index, count=count, finished_at=int(time.time()))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    print(f"🧩 分片 {index + 1}/{count} 结果已写入 {path}")
+    return path
+
+
+def load_partials(script, directory=SHARD_DIR):
+    """
+    读取所有分片结果（按分片序号排序），返回 (partials, missing)
+    missing 为没有结果文件的分片序号，说明对应的机器没有跑完
+    """
+    partials = {}
+    count = 0
+    for path in glob.glob(os.path.join(directory, "**", f"{script}-*-of-*.json"), recursive=True):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 读取分片结果失败 {path}: {e}")
+            continue
+        count = max(count, data.get("count", 0))
+        partials[data.get("shard")] = data
+    missing = [index for index in range(count) if index not in partials]
+    if missing:
+        print(f"⚠️ 缺少分片结果: {', '.join(str(i) for i in missing)}")
+    return [partials[index] for index in sorted(partials)], missing
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+
+from http_renew import interpret_renew_response, renew_response_matcher
+
+
+def test_interpret_success_and_api_failure():
+    body = json.dumps({"success": True, "renewal": "2026-01-01", "nextRenewal": "2026-01-04"})
+    done, result, data = interpret_renew_response("7", 200, body)
+    assert done and data["success"]
+    assert result == "7: success - renewal: 2026-01-01, next: 2026-01-04"
+
+    done, result, _ = interpret_renew_response("7", 200, '{"success": false}')
+    assert done and result.startswith("7: api_failed")
+
+
+@pytest.mark.parametrize("status, text, expected", [
+    (None, None, "7: no_response"),
+    (500, "oops", "7: http_status - 500"),
+    (302, None, "7: session_lost - 302"),
+    (200, "<html>", "7: http_not_json"),
+    (200, "[1, 2]", "7: http_not_json"),
+])
+def test_interpret_transport_failures(status, text, expected):
+    assert interpret_renew_response("7", status, text) == (False, expected, None)
+
+
+def test_matcher_compares_server_id_exactly():
+    matcher = renew_response_matcher("21")
+    assert matcher("https://dash.zampto.net/server?id=21&renew=true")
+    assert matcher("https://dash.zampto.net/server?renew=true&id=21")
+    assert not matcher("https://dash.zampto.net/server?id=2190&renew=true")
+    assert not matcher("https://dash.zampto.net/server?id=21")
@@ -0,0 +1,40 @@
+from login_probe import classify, LOGGED_IN, QUICK_LOGIN, VALIDATION_FAILURE, LOGIN_FORM, UNKNOWN
+
+DASH = "https://hosting.zampto.net"
+NO_DOM = {"form": False, "quick": False, "account": False, "dashboard": False, "heading": False}
+
+
+def dom(**flags):
+    return dict(NO_DOM, **flags)
+
+
+def test_dashboard_with_session_is_logged_in():
+    assert classify(DASH + "/", dom(heading=True), True, DASH) == LOGGED_IN
+
+
+def test_dashboard_marker_without_cookie_is_logged_in():
+    assert classify(DASH + "/", dom(heading=True, dashboard=True), False, DASH) == LOGGED_IN
+
+
+def test_cloudflare_interstitial_on_dashboard_domain_is_unknown():
+    # "Just a moment..." 验证页、错误页、维护页只有标题，没有会话 Cookie 时不能算已登录
+    assert classify(DASH + "/", dom(heading=True), False, DASH) == UNKNOWN
+
+
+def test_login_form_on_dashboard_domain():
+    assert classify(DASH + "/", dom(form=True, heading=True), True, DASH) == LOGIN_FORM
+
+
+def test_validation_failure_takes_precedence():
+    url = "https://auth.zampto.net/sign-in/password?app_id=x&secure-failure=validation"
+    assert classify(url, dom(quick=True, account=True), False, DASH) == VALIDATION_FAILURE
+
+
+def test_auth_pages():
+    assert classify("https://accounts.zampto.net/", dom(quick=True), False, DASH) == QUICK_LOGIN
+    assert classify("https://auth.zampto.net/sign-in", dom(form=True), False, DASH) == LOGIN_FORM
+    assert classify("https://auth.zampto.net/sign-in", NO_DOM, False, DASH) == UNKNOWN
+
+
+def test_similar_domain_is_not_dashboard():
+    assert classify("https://hosting.zampto.net.evil.com/", dom(heading=True), True, DASH) == UNKNOWN
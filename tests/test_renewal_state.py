@@ -0,0 +1,39 @@
+from datetime import datetime, timezone, timedelta
+
+from renewal_state import RenewalStateStore, parse_time
+
+HOUR = 3600
+
+
+def test_parse_time_formats():
+    utc = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    assert parse_time(int(utc)) == utc
+    assert parse_time(str(int(utc * 1000))) == utc
+    assert parse_time("2026-01-01T00:00:00Z") == utc
+    assert parse_time("2026-01-01T08:00:00+08:00") == utc
+    assert parse_time("not a date") is None
+    assert parse_time("") is None
+
+
+def test_parse_time_naive_uses_site_timezone():
+    # 不带时区的时间按站点时区（默认北京时间）解释
+    utc = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    assert parse_time("2026-01-01 08:00:00") == utc
+    assert parse_time("2026-01-01 00:00:00", tz=timezone.utc) == utc
+    assert parse_time("01/01/2026 08:00:00", tz=timezone(timedelta(hours=8))) == utc
+
+
+def test_plan_orders_due_servers_and_skips_the_rest(tmp_path):
+    store = RenewalStateStore(str(tmp_path / "renewals.json"))
+    now = 1_800_000_000
+    store.record("far", {"success": True, "nextRenewal": now + 72 * HOUR})
+    store.record("soon", {"success": True, "nextRenewal": now + 10 * HOUR})
+    store.record("sooner", {"success": True, "nextRenewal": now + 2 * HOUR})
+    store.record("failed", {"success": False, "nextRenewal": now + 72 * HOUR})
+
+    due, skipped = store.plan(["far", "soon", "new", "sooner", "failed"], window_hours=24, now=now)
+    assert due == ["new", "failed", "sooner", "soon"]
+    assert skipped == ["far"]
+
+    reloaded = RenewalStateStore(str(tmp_path / "renewals.json"))
+    assert reloaded.plan(["far"], window_hours=24, now=now) == ([], ["far"])
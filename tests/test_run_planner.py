@@ -0,0 +1,76 @@
+import run_planner
+from run_planner import CircuitBreaker, RunPlanner, renew_settled
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(run_planner.time, "sleep", lambda _: None)
+
+
+def make_planner(tmp_path, deadline=60):
+    return RunPlanner(deadline=deadline, breaker=CircuitBreaker(path=str(tmp_path / "breaker.json")))
+
+
+def test_retry_stops_at_first_success(tmp_path):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        return len(calls) >= 2
+
+    assert make_planner(tmp_path).retry("x", flaky, attempts=3) is True
+    assert len(calls) == 2
+
+
+def test_retry_returns_last_result_and_reraises_last_error(tmp_path):
+    planner = make_planner(tmp_path)
+    assert planner.retry("x", lambda: False, attempts=2) is False
+
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        planner.retry("x", boom, attempts=2)
+
+
+def test_retry_only_transient_renew_results(tmp_path):
+    results = iter(["1: error - timeout", "1: api_failed - {}", "1: success - ok"])
+    calls = []
+
+    def renew():
+        calls.append(1)
+        return next(results)
+
+    result = make_planner(tmp_path).retry("x", renew, attempts=3, is_success=renew_settled)
+    assert result == "1: api_failed - {}"
+    assert len(calls) == 2
+
+
+def test_session_lost_is_not_retried():
+    assert renew_settled("1: session_lost - 302")
+    assert not renew_settled("1: http_status - 500")
+
+
+def test_circuit_breaker_opens_and_half_opens(tmp_path):
+    breaker = CircuitBreaker(path=str(tmp_path / "breaker.json"), threshold=2, cooldown_hours=1)
+    breaker.record("a@example.com", False)
+    assert breaker.allow("a@example.com")
+    breaker.record("A@example.com", False)
+    assert not breaker.allow("a@example.com")
+    opened_at = breaker.data["a@example.com"]["opened_at"]
+    assert breaker.allow("a@example.com", now=opened_at + 3600)
+
+    reloaded = CircuitBreaker(path=str(tmp_path / "breaker.json"), threshold=2, cooldown_hours=1)
+    assert not reloaded.allow("a@example.com")
+    reloaded.record("a@example.com", True)
+    assert reloaded.allow("a@example.com")
+
+
+def test_skip_records_reason(tmp_path):
+    planner = make_planner(tmp_path)
+    assert planner.skip("a@example.com", ["1", "2"], run_planner.BUDGET) == [
+        "1: skipped - budget", "2: skipped - budget",
+    ]
+    assert planner.format_summary() == "budget: 2 台"
@@ -0,0 +1,25 @@
+from sharding import shard_of, select_shard
+
+import pytest
+
+
+def test_shard_of_is_stable_and_normalized():
+    assert shard_of("User@Example.com ", 4) == shard_of("user@example.com", 4)
+    assert 0 <= shard_of("user@example.com", 4) < 4
+
+
+def test_select_shard_partitions_items_in_order():
+    items = [f"user{i}@example.com" for i in range(50)]
+    shards = [select_shard(items, key=lambda x: x, index=i, count=3) for i in range(3)]
+    assert sorted(x for shard in shards for x in shard) == sorted(items)
+    for shard in shards:
+        assert shard == [x for x in items if x in shard]
+
+
+def test_select_shard_without_sharding_keeps_everything():
+    assert select_shard(["a", "b"], key=lambda x: x, index=0, count=1) == ["a", "b"]
+
+
+def test_select_shard_rejects_out_of_range_index():
+    with pytest.raises(ValueError):
+        select_shard(["a"], key=lambda x: x, index=3, count=3)
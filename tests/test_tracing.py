@@ -0,0 +1,28 @@
+from tracing import Tracer, load_spans, percentile, renew_outcome
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 90) == 9
+    assert percentile(values, 99) == 10
+    assert percentile(values, 0) == 1
+    assert percentile([3.5], 90) == 3.5
+    assert percentile([], 50) is None
+
+
+def test_renew_outcome():
+    assert renew_outcome("7: success - renewal: x") == "success"
+    assert renew_outcome("7: session_lost - 302") == "session_lost"
+    assert renew_outcome("login_failed") == "login_failed"
+
+
+def test_trace_keeps_recent_runs(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    runs = []
+    for _ in range(5):
+        tracer = Tracer("test", path=path, enabled=True, max_runs=3)
+        runs.append(tracer.run_id)
+        with tracer.span("step"):
+            pass
+    assert [s["run"] for s in load_spans(path)] == runs[-3:]
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阶段耗时追踪
+把浏览器启动、登录、Cloudflare、续期、截图、通知等阶段记录为 span，
+每个 span 追加一行 JSON 到追踪文件，并提供跨多次运行的耗时汇总
+
+汇总: python tracing.py [追踪文件]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+TRACE_FILE = os.getenv("ZAMPTO_TRACE_FILE", ".zampto_trace.jsonl")
+TRACE_ENABLED = os.getenv("ZAMPTO_TRACE", "true").lower() == "true"
+# 追踪文件只保留最近 N 次运行（含本次），0 表示不清理
+TRACE_MAX_RUNS = int(os.getenv("ZAMPTO_TRACE_MAX_RUNS", "50"))
+
+
+def mask_email(email: str) -> str:
+    """
+    只显示邮箱前三位，其余用 *** 代替
+    例：abc123@gmail.com -> abc***
+    """
+    return email[:3] + "***" if email else ""
+
+
+def bool_outcome(result):
+    return "ok" if result else "failed"
+
+
+def renew_outcome(result):
+    """从 "id: status - ..." 形式的续期结果中取出状态"""
+    status = str(result).split(": ", 1)[-1]
+    return status.split(" ", 1)[0] or "unknown"
+
+
+def trim_trace(path=TRACE_FILE, keep_runs=TRACE_MAX_RUNS):
+    """只保留最近 keep_runs 次运行的记录（按运行首次出现的顺序），原子替换文件"""
+    if keep_runs <= 0:
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except OSError:
+        return
+    runs = []
+    line_runs = []
+    for line in lines:
+        try:
+            run = json.loads(line).get("run")
+        except (ValueError, AttributeError):
+            run = None
+        if run is not None and run not in runs:
+            runs.append(run)
+        line_runs.append(run)
+    if len(runs) <= keep_runs:
+        return
+    kept = set(runs[-keep_runs:])
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(line for line, run in zip(lines, line_runs) if run in kept)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ 清理追踪记录失败: {e}")
+
+
+class Tracer:
+    def __init__(self, script, path=TRACE_FILE, enabled=TRACE_ENABLED, max_runs=TRACE_MAX_RUNS):
+        """初始化，开始记录前先清理过旧的运行，给本次留出一个位置"""
+        self.script = script
+        self.path = path
+        self.enabled = enabled
+        self.run_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.lock = threading.Lock()
+        if enabled and max_runs > 0:
+            trim_trace(path, max(1, max_runs - 1))
+
+    def _write(self, record):
+        try:
+            with self.lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ 写入追踪记录失败: {e}")
+
+    @contextmanager
+    def span(self, name, account=None, server=None, **attrs):
+        """
+        记录一个阶段，调用方可通过 span["outcome"] 设置结果
+        抛出异常时 outcome 记为 error 并继续抛出
+        """
+        record = {"outcome": "ok"}
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["outcome"] = "error"
+            record.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            if self.enabled:
+                record.update(attrs)
+                self._write({
+                    "run": self.run_id,
+                    "script": self.script,
+                    "name": name,
+                    "start": round(start, 3),
+                    "duration": round(time.perf_counter() - started, 4),
+                    "account": mask_email(account) if account else None,
+                    "server": server,
+                    **record,
+                })
+
+    def call(self, name, func, *args, account=None, server=None, outcome=bool_outcome, **kwargs):
+        """在 span 中调用 func，用 outcome(返回值) 作为结果"""
+        with self.span(name, account=account, server=server) as record:
+            result = func(*args, **kwargs)
+            record["outcome"] = outcome(result)
+            return result
+
+    async def call_async(self, name, func, *args, account=None, server=None, outcome=bool_outcome, **kwargs):
+        with self.span(name, account=account, server=server) as record:
+            result = await func(*args, **kwargs)
+            record["outcome"] = outcome(result)
+            return result
+
+
+# ================= 汇总 =================
+def load_spans(path=TRACE_FILE):
+    spans = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return spans
+
+
+def percentile(values, p):
+    """最近秩法分位数：第 ceil(p% × n) 个值，没有数据时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(spans):
+    """按阶段名汇总: 次数、总耗时、p50/p90/最大值和各结果数量"""
+    stats = {}
+    for s in spans:
+        entry = stats.setdefault(s["name"], {"durations": [], "outcomes": {}})
+        entry["durations"].append(s["duration"])
+        outcome = s.get("outcome", "ok")
+        entry["outcomes"][outcome] = entry["outcomes"].get(outcome, 0) + 1
+    return stats
+
+
+def format_summary(spans):
+    if not spans:
+        return "没有追踪记录"
+    stats = summarize(spans)
+    runs = len({s["run"] for s in spans})
+    lines = [f"共 {runs} 次运行, {len(spans)} 个阶段记录"]
+    for name, entry in sorted(stats.items(), key=lambda item: -sum(item[1]["durations"])):
+        durations = entry["durations"]
+        total = sum(durations)
+        outcomes = ", ".join(f"{k}: {v}" for k, v in sorted(entry["outcomes"].items()))
+        lines.append(
+            f"  {name:<20} n={len(durations):<5} 总计 {total:8.1f}s "
+            f"p50 {percentile(durations, 50):6.2f}s p90 {percentile(durations, 90):6.2f}s "
+            f"max {max(durations):6.2f}s [{outcomes}]"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(format_summary(load_spans(sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE)))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+等待层：条件满足立即返回（URL 匹配、元素出现、响应到达），
+每次等待都有超时，并记录实际耗时，用来替代固定的 time.sleep
+"""
+
+import time
+
+# 默认超时（毫秒）
+DEFAULT_TIMEOUT = 15000
+
+
+class Waiter:
+    def __init__(self):
+        self.records = []
+
+    def _record(self, name, started, ok):
+        elapsed = time.monotonic() - started
+        self.records.append({"name": name, "elapsed": round(elapsed, 3), "ok": ok})
+        return ok
+
+    @staticmethod
+    def _locator(page, selectors):
+        """把多个选择器合并成一个 locator，任意一个出现即可"""
+        locator = None
+        for selector in selectors:
+            current = page.locator(f'xpath={selector}' if selector.startswith('//') else selector)
+            locator = current if locator is None else locator.or_(current)
+        return locator.first
+
+    # ================= Playwright (sync) =================
+    def url(self, page, matcher, timeout=DEFAULT_TIMEOUT, name="url"):
+        """等待 URL 匹配（字符串/正则/函数）"""
+        started = time.monotonic()
+        try:
+            page.wait_for_url(matcher, wait_until="commit", timeout=timeout)
+            return self._record(name, started, True)
+        except Exception:
+            return self._record(name, started, False)
+
+    def selector(self, page, selectors, timeout=DEFAULT_TIMEOUT, state="visible", name="selector"):
+        """等待任意一个选择器出现"""
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        started = time.monotonic()
+        try:
+            self._locator(page, selectors).wait_for(state=state, timeout=timeout)
+            return self._record(name, started, True)
+        except Exception:
+            return self._record(name, started, False)
+
+    def load_state(self, page, state="load", timeout=DEFAULT_TIMEOUT, name="load"):
+        """等待页面加载状态"""
+        started = time.monotonic()
+        try:
+            page.wait_for_load_state(state, timeout=timeout)
+            return self._record(name, started, True)
+        except Exception:
+            return self._record(name, started, False)
+
+    def response(self, page, predicate, timeout=DEFAULT_TIMEOUT, name="response"):
+        """等待满足条件的响应到达，返回 Response 或 None"""
+        started = time.monotonic()
+        try:
+            resp = page.wait_for_event("response", predicate=predicate, timeout=timeout)
+            self._record(name, started, True)
+            return resp
+        except Exception:
+            self._record(name, started, False)
+            return None
+
+    def evaluate(self, page, script, arg=None, name="evaluate"):
+        """执行会自行等待的页面脚本（返回 Promise），出错（如页面跳转）返回 None"""
+        started = time.monotonic()
+        try:
+            result = page.evaluate(script, arg)
+            self._record(name, started, True)
+            return result
+        except Exception:
+            self._record(name, started, False)
+            return None
+
+    # ================= Playwright (async) =================
+    async def url_async(self, page, matcher, timeout=DEFAULT_TIMEOUT, name="url"):
+        started = time.monotonic()
+        try:
+            await page.wait_for_url(matcher, wait_until="commit", timeout=timeout)
+            return self._record(name, started, True)
+        except Exception:
+            return self._record(name, started, False)
+
+    async def selector_async(self, page, selectors, timeout=DEFAULT_TIMEOUT, state="visible", name="selector"):
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        started = time.monotonic()
+        try:
+            await self._locator(page, selectors).wait_for(state=state, timeout=timeout)
+            return self._record(name, started, True)
+        except Exception:
+            return self._record(name, started, False)
+
+    async def load_state_async(self, page, state="load", timeout=DEFAULT_TIMEOUT, name="load"):
+        started = time.monotonic()
+        try:
+            await page.wait_for_load_state(state, timeout=timeout)
+            return self._record(name, started, True)
+        except Exception:
+            return self._record(name, started, False)
+
+    async def evaluate_async(self, page, script, arg=None, name="evaluate"):
+        started = time.monotonic()
+        try:
+            result = await page.evaluate(script, arg)
+            self._record(name, started, True)
+            return result
+        except Exception:
+            self._record(name, started, False)
+            return None
+
+    # ================= Selenium =================
+    def until(self, driver, condition, timeout=DEFAULT_TIMEOUT, name="condition"):
+        """等待 Selenium 条件成立，返回条件结果或 None"""
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(driver, timeout / 1000).until(condition)
+            self._record(name, started, True)
+            return result
+        except Exception:
+            self._record(name, started, False)
+            return None
+
+    def response_selenium(self, driver, matcher, timeout=DEFAULT_TIMEOUT, on_entries=None, name="response"):
+        """从 performance 日志等待 URL 匹配的响应，返回 (status, body)，超时为 (None, None)"""
+        from http_renew import capture_selenium_response
+
+        started = time.monotonic()
+        status, body = capture_selenium_response(driver, matcher, timeout=timeout, on_entries=on_entries)
+        self._record(name, started, status is not None)
+        return status, body
+
+    # ================= 统计 =================
+    def summary(self):
+        """按名称汇总等待次数、总耗时和超时次数"""
+        stats = {}
+        for r in self.records:
+            item = stats.setdefault(r["name"], {"count": 0, "total": 0.0, "timeouts": 0})
+            item["count"] += 1
+            item["total"] += r["elapsed"]
+            item["timeouts"] += 0 if r["ok"] else 1
+        return stats
+
+    def format_summary(self):
+        lines = []
+        for name, item in sorted(self.summary().items(), key=lambda kv: -kv[1]["total"]):
+            lines.append(f"{name}: {item['count']} 次, 共 {item['total']:.2f}s, 超时 {item['timeouts']} 次")
+        return "\n".join(lines)
+
@@ -1,76 +1,81 @@
 import os
+import sys
 import time
-import requests
+import queue
+import threading
+from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from datetime import datetime, timezone
-
-def write_heartbeat():
+from concurrent.futures import ThreadPoolExecutor
+
+from notify import TelegramNotifier
+from session_vault import SessionVault, dump_selenium_cookies, restore_selenium_cookies
+from waits import Waiter
+from resource_policy import ResourcePolicy
+from renewal_state import RenewalStateStore, SCHEDULE_MODE
+from http_renew import interpret_renew_response, renew_response_matcher, drain_selenium_log, REDIRECT_STATUSES
+from tracing import Tracer, mask_email, renew_outcome
+from cloudflare import ClearanceCache, selenium_challenge_seen
+from browser_service import service_endpoint, selenium_attach_options, open_isolated_window, close_isolated_window
+from run_history import RunHistory
+from screenshots import ScreenshotWriter, capture_selenium, should_capture, image_path
+from launch_profiles import LaunchProfileStore, LaunchTimer, selenium_launch_options
+from input_profiles import InputProfileStore, FAST, FULL
+from run_planner import RunPlanner, renew_settled, LOGIN_ATTEMPTS, RENEW_ATTEMPTS, BUDGET, CIRCUIT_OPEN
+from sharding import select_shard, is_sharded, write_partial, load_partials, SHARD_INDEX, SHARD_COUNT, SHARD_DIR, MERGE_FLAG
+
+# 运行历史，每台服务器每次运行一行
+history = RunHistory()
+
+def write_heartbeat(run_id=None):
     """
     写入运行心跳文件，用于 GitHub Actions 保活
+    内容从运行历史生成（本次运行时间和续期成功数）
     """
-    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
     with open("time.txt", "w", encoding="utf-8") as f:
-        f.write(f"Last run: {now}\n")
+        f.write(history.render_heartbeat("zaprenew", run_id=run_id))
 
 # ================= Telegram =================
 TG_BOT_TOKEN = os.getenv("TG_BOT_TOKEN")
 TG_CHAT_ID = os.getenv("TG_CHAT_ID")
 
+# 后台发送：截图攒成相册批量上传，不阻塞下一个账号的续期
+notifier = TelegramNotifier(TG_BOT_TOKEN, TG_CHAT_ID)
+# 截图在后台线程解码写文件，写完再交给 notifier
+screenshots = ScreenshotWriter()
+
 def send_telegram(msg: str):
-    if not TG_BOT_TOKEN or not TG_CHAT_ID:
+    if not notifier.enabled:
         print("⚠️ Telegram 未配置，跳过通知")
         return
 
-    url = f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendMessage"
-    requests.post(
-        url,
-        data={
-            "chat_id": TG_CHAT_ID,
-            "text": msg,
-            "parse_mode": "HTML"
-        },
-        timeout=10
-    )
+    notifier.send_message(msg)
 #增加截图
 def send_telegram_photo(photo_path: str, caption: str = ""):
-    if not TG_BOT_TOKEN or not TG_CHAT_ID:
+    if not notifier.enabled:
         print("⚠️ Telegram 未配置，跳过图片通知")
         return
 
-    url = f"https://api.telegram.org/bot{TG_BOT_TOKEN}/sendPhoto"
-    with open(photo_path, "rb") as f:
-        requests.post(
-            url,
-            data={
-                "chat_id": TG_CHAT_ID,
-                "caption": caption,
-                "parse_mode": "HTML",
-            },
-            files={"photo": f},
-            timeout=20,
-        )
-
-def mask_email(email: str) -> str:
-    """
-    只显示邮箱前三位，其余用 *** 代替
-    例：abc123@gmail.com -> abc***
-    """
-    return email[:3] + "***"
+    notifier.send_photo(photo_path, caption)
 
 # ================= Zampto =================
-LOGIN_URL = "https://auth.zampto.net/sign-in?app_id=bmhk6c8qdqxphlyscztgl"
+LOGIN_URL = os.getenv("ZAMPTO_LOGIN_URL", "https://auth.zampto.net/sign-in?app_id=bmhk6c8qdqxphlyscztgl")
+# 密码登录页，快速登录直接打开这里
+PASSWORD_URL = os.getenv("ZAMPTO_PASSWORD_URL", "https://auth.zampto.net/sign-in/password?app_id=bmhk6c8qdqxphlyscztgl")
+DASH_BASE = os.getenv("ZAMPTO_DASH_URL", "https://dash.zampto.net").rstrip("/")
+DASH_HOST = urlparse(DASH_BASE).netloc
+AUTH_HOST = urlparse(LOGIN_URL).netloc
 
 ZAMPTO_ACCOUNTS_RAW = os.getenv("ZAMPTO_ACCOUNTS")
-if not ZAMPTO_ACCOUNTS_RAW:
+if not ZAMPTO_ACCOUNTS_RAW and MERGE_FLAG not in sys.argv:
     raise RuntimeError("❌ 未检测到 ZAMPTO_ACCOUNTS 环境变量")
 
 ACCOUNTS = []
-for line in ZAMPTO_ACCOUNTS_RAW.strip().splitlines():
+for line in (ZAMPTO_ACCOUNTS_RAW or "").strip().splitlines():
     email, password, server_id = [x.strip() for x in line.split("|")]
     ACCOUNTS.append({
         "email": email,
@@ -78,109 +83,559 @@ for line in ZAMPTO_ACCOUNTS_RAW.strip().splitlines():
         "server_id": server_id
     })
 
+# 分片：按账号哈希分配，同一账号的服务器总在同一分片，只登录一次
+if is_sharded():
+    ACCOUNTS = select_shard(ACCOUNTS, key=lambda a: a["email"])
+    print(f"🧩 分片 {SHARD_INDEX + 1}/{SHARD_COUNT}：{len(ACCOUNTS)} 台服务器")
+
 # ================= 核心逻辑 =================
-def renew_single_account(account):
-    email = account["email"]
-    password = account["password"]
-    server_id = account["server_id"]
+vault = SessionVault()
+waiter = Waiter()
+policy = ResourcePolicy()
+renewal_state = RenewalStateStore()
+tracer = Tracer("zaprenew")
+clearance = ClearanceCache()
+# 运行计划：总时限、重试退避和账号熔断
+planner = RunPlanner()
+# 浏览器启动配置，每个 driver 记录启动到首个页面的耗时
+launch_profiles = LaunchProfileStore()
+launch_profile = launch_profiles.choose()
+driver_timers = {}
+# 每个账号上次成功的登录路径（快速 / 完整）
+input_profiles = InputProfileStore()
+
+# 快速登录等待密码框出现的时间，超时直接回退到完整流程
+FAST_LOGIN_TIMEOUT = 8
+
+def login(driver, wait, email, password):
+    """先直接打开密码登录页，失败自动回退到 identifier → 密码 两步流程"""
+    # 带上缓存的 Cloudflare 验证 Cookie，验证页再次出现说明已失效
+    user_agent = driver.execute_script("return navigator.userAgent")
+    restore_selenium_cookies(driver, clearance.cookies(user_agent))
+
+    if input_profiles.use_fast_path(email):
+        try:
+            fast_login(driver, user_agent, email, password)
+            input_profiles.record_path(email, FAST, True)
+            print(f"⚡ {mask_email(email)} 快速登录成功")
+            return
+        except Exception as e:
+            input_profiles.record_path(email, FAST, False)
+            print(f"⚠️ {mask_email(email)} 快速登录未成功，回退到完整登录流程: {e}")
 
-    masked = mask_email(email)
-    print(f"\n👤 账号: {masked}")
+    try:
+        full_login(driver, wait, user_agent, email, password)
+    except Exception:
+        input_profiles.record_path(email, FULL, False)
+        raise
+    input_profiles.record_path(email, FULL, True)
+
+def open_login_page(driver, user_agent, url):
+    open_page(driver, url)
+    if selenium_challenge_seen(driver):
+        clearance.forget(user_agent)
+
+def fast_login(driver, user_agent, email, password):
+    """一次导航：密码页上同时有 identifier 时一起填写，提交后等待跳转到控制台"""
+    open_login_page(driver, user_agent, PASSWORD_URL)
+    quick = WebDriverWait(driver, FAST_LOGIN_TIMEOUT)
+    password_input = quick.until(
+        EC.visibility_of_element_located((By.NAME, "password"))
+    )
+    for email_input in driver.find_elements(By.NAME, "identifier"):
+        if email_input.is_displayed():
+            email_input.clear()
+            email_input.send_keys(email)
+    password_input.clear()
+    password_input.send_keys(password)
 
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    submit_btn = driver.find_element(By.NAME, "submit")
+    driver.execute_script("arguments[0].click();", submit_btn)
 
-    driver = webdriver.Chrome(options=chrome_options)
-    wait = WebDriverWait(driver, 20)
+    quick.until(EC.url_contains(DASH_HOST))
+    cloudflare_result(driver, True)
+    clearance.save(dump_selenium_cookies(driver), user_agent)
 
-    try:
-        # === 登录 ===
-        driver.get(LOGIN_URL)
+def full_login(driver, wait, user_agent, email, password):
+    open_login_page(driver, user_agent, LOGIN_URL)
 
-        email_input = wait.until(
-            EC.visibility_of_element_located((By.NAME, "identifier"))
-        )
-        email_input.clear()
-        email_input.send_keys(email)
-        driver.find_element(By.NAME, "submit").click()
+    email_input = wait.until(
+        EC.visibility_of_element_located((By.NAME, "identifier"))
+    )
+    email_input.clear()
+    email_input.send_keys(email)
+    driver.find_element(By.NAME, "submit").click()
 
-        password_input = wait.until(
-            EC.visibility_of_element_located((By.NAME, "password"))
-        )
-        password_input.clear()
-        password_input.send_keys(password)
+    password_input = wait.until(
+        EC.visibility_of_element_located((By.NAME, "password"))
+    )
+    password_input.clear()
+    password_input.send_keys(password)
 
-        submit_btn = driver.find_element(By.NAME, "submit")
-        driver.execute_script("arguments[0].click();", submit_btn)
+    submit_btn = driver.find_element(By.NAME, "submit")
+    driver.execute_script("arguments[0].click();", submit_btn)
 
-        wait.until(EC.url_contains("dash.zampto.net"))
+    wait.until(EC.url_contains(DASH_HOST))
+    cloudflare_result(driver, True)
+    clearance.save(dump_selenium_cookies(driver), user_agent)
 
-        masked = mask_email(email)
-        screenshot_path = f"screenshot_{masked}.png"
+# 并发账号数，同时也是复用的浏览器数量
+MAX_WORKERS = max(1, int(os.getenv("ZAMPTO_WORKERS", "3")))
 
-        # === 续期 ===
-        renew_url = f"https://dash.zampto.net/server?id={server_id}&renew=true"
-        driver.get(renew_url)
-        time.sleep(5)
+# 连接常驻浏览器时每个 driver 占用的 browser context
+driver_contexts = {}
 
-        if "login" in driver.current_url:
-            raise RuntimeError("登录态丢失，续期失败")
+def create_driver():
+    chrome_options = Options()
+    endpoint = service_endpoint()
+    if endpoint:
+        # 常驻浏览器：启动参数由服务端决定，这里只负责连接
+        selenium_attach_options(chrome_options, endpoint)
+    else:
+        selenium_launch_options(chrome_options, launch_profile)
+    # performance 日志用来在网络层读取续期接口响应
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    policy.selenium_options(chrome_options)
+
+    timer = LaunchTimer()
+    if not endpoint:
+        timer.start(launch_profile)
+    with tracer.span("browser_launch"):
+        driver = webdriver.Chrome(options=chrome_options)
+    timer.launched()
+    driver_timers[driver.session_id] = timer
+    if endpoint:
+        driver_contexts[driver.session_id] = open_isolated_window(driver)
+    policy.apply_selenium(driver)
+    return driver
+
+def quit_driver(driver):
+    """
+    常驻浏览器只销毁自己的 context 并断开，本地浏览器直接退出
+    """
+    context_id = driver_contexts.pop(driver.session_id, None)
+    if context_id:
+        close_isolated_window(driver, context_id)
+    timer = driver_timers.pop(driver.session_id, None)
+    if timer:
+        timer.save(launch_profiles)
+    driver.quit()
+
+def open_page(driver, url):
+    """打开页面，第一次导航的耗时计入启动耗时（不含之前的会话探测）"""
+    timer = driver_timers.get(driver.session_id)
+    if timer:
+        timer.navigating()
+    driver.get(url)
+    if timer:
+        timer.first_page()
+
+def cloudflare_result(driver, passed):
+    timer = driver_timers.get(driver.session_id)
+    if timer:
+        timer.cloudflare_result(passed)
+
+def reset_driver(driver):
+    """
+    清空上一个账号留下的 Cookie 和存储，让浏览器可以给下一个账号复用
+    连接常驻浏览器时直接换一个新的 browser context
+    """
+    policy.collect_selenium(driver)
+    context_id = driver_contexts.get(driver.session_id)
+    if context_id:
+        driver_contexts[driver.session_id] = open_isolated_window(driver, context_id)
+        policy.apply_selenium(driver)
+        return
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    driver.get("about:blank")
+
+class DriverPool:
+    """
+    浏览器池：最多启动 size 个 Chrome，账号之间复用而不是每次启动/退出
+    """
+    def __init__(self, size):
+        self.size = size
+        self.idle = queue.Queue()
+        self.created = 0
+        self.lock = threading.Lock()
+        self.drivers = []
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                create = True
+            else:
+                create = False
+
+        if not create:
+            return self.idle.get()
+
+        try:
+            driver = create_driver()
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+
+        with self.lock:
+            self.drivers.append(driver)
+        return driver
+
+    def release(self, driver, broken=False):
+        if not broken:
+            try:
+                reset_driver(driver)
+                self.idle.put(driver)
+                return
+            except Exception:
+                pass
+
+        # 浏览器已损坏，丢弃并允许重新创建
+        with self.lock:
+            self.created -= 1
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+        try:
+            quit_driver(driver)
+        except Exception:
+            pass
+
+    def close(self):
+        with self.lock:
+            drivers, self.drivers = self.drivers, []
+        for driver in drivers:
+            try:
+                policy.collect_selenium(driver)
+                quit_driver(driver)
+            except Exception:
+                pass
+
+def group_accounts(accounts):
+    """
+    按账号密码分组，同一账号只登录一次，续期它名下的所有服务器
+    保持首次出现的顺序
+    """
+    groups = {}
+    for account in accounts:
+        key = (account["email"].lower(), account["password"])
+        group = groups.setdefault(key, {
+            "email": account["email"],
+            "password": account["password"],
+            "server_ids": []
+        })
+        if account["server_id"] not in group["server_ids"]:
+            group["server_ids"].append(account["server_id"])
+    return list(groups.values())
+
+def send_result_photo(driver, screenshot_name, caption, success, selector=None):
+    """
+    按截图策略截取视口（或 selector 元素），写文件和上传都在后台进行
+    是否截图只看截图策略；Telegram 未配置时只保存文件，不上传
+    """
+    if not should_capture(success):
+        return
+    on_saved = (lambda path: send_telegram_photo(path, caption=caption)) if notifier.enabled else None
+    try:
+        with tracer.span("screenshot"):
+            data = capture_selenium(driver, selector)
+        screenshots.submit(data, image_path(screenshot_name), on_saved)
+    except Exception:
+        pass
 
-        driver.save_screenshot(screenshot_path)
+def close_notifications():
+    """
+    等截图写完、通知发完
+    """
+    with tracer.span("notification"):
+        screenshots.close()
+        notifier.close()
 
-        print(f"✅ 成功：{masked}")
+def renew_server(driver, email, server_id):
+    """
+    续期单台服务器，返回 "id: status - ..." 形式的结果，
+    只有临时错误（error / no_response / http_status ...）会被重试
+    """
+    masked = mask_email(email)
 
-        send_telegram_photo(
-        screenshot_path,
-        caption=f"✅ <b>续期完成</b>\n账号：{masked}"
+    try:
+        renew_url = f"{DASH_BASE}/server?id={server_id}&renew=true"
+        drain_selenium_log(driver, policy.count_selenium_entries)
+        open_page(driver, renew_url)
+        status, body = waiter.response_selenium(
+            driver,
+            renew_response_matcher(server_id),
+            on_entries=policy.count_selenium_entries,
+            name="renew_response"
         )
 
-        return True, email, server_id
+        if status in REDIRECT_STATUSES or AUTH_HOST in driver.current_url:
+            # 登录态丢失，重试也一样
+            vault.forget(email)
+            return f"{server_id}: session_lost"
+
+        done, result, json_data = interpret_renew_response(server_id, status, body)
+        if done and json_data.get("success", False):
+            renewal_state.record(server_id, json_data)
+        return result
 
     except Exception as e:
-        driver.save_screenshot(screenshot_path)
+        print(f"❌ 续期出错：{masked} #{server_id} - {e}")
+        return f"{server_id}: error - {e}"
 
-        send_telegram_photo(
-        screenshot_path,
-        caption=f"❌ <b>续期失败</b>\n账号：{masked}"
+def report_renew(driver, email, server_id, result):
+    """重试结束后输出最终结果并发送一次截图"""
+    masked = mask_email(email)
+    screenshot_name = f"screenshot_{masked}_{server_id}"
+    ok = renew_outcome(result) == "success"
+    if ok:
+        print(f"✅ 成功：{masked} #{server_id}")
+        send_result_photo(
+            driver,
+            screenshot_name,
+            caption=f"✅ <b>续期完成</b>\n账号：{masked}\n服务器：{server_id}",
+            success=True,
+            selector="pre"
         )
+    else:
+        print(f"❌ 失败：{masked} #{server_id} - {result}")
+        send_result_photo(
+            driver,
+            screenshot_name,
+            caption=f"❌ <b>续期失败</b>\n账号：{masked}\n服务器：{server_id}",
+            success=False
+        )
+    return ok
 
-        return False, email, server_id
+def traced_login(driver, wait, email, password):
+    with tracer.span("login", account=email):
+        login(driver, wait, email, password)
+    return True
 
-    finally:
-        driver.quit()
+def renew_account(group, driver):
+    """
+    登录一次，在同一个会话里续期该账号的所有服务器
+    返回每个服务器的 (ok, email, server_id, 耗时秒数)
+    """
+    email = group["email"]
+    password = group["password"]
+    server_ids = group["server_ids"]
 
-def main():
-    success = []
-    failed = []
+    masked = mask_email(email)
+    print(f"\n👤 账号: {masked}（{len(server_ids)} 台服务器）")
+
+    if not planner.breaker.allow(email):
+        print(f"🔌 账号连续登录失败已熔断，冷却期内跳过：{masked}")
+        planner.skip(email, server_ids, CIRCUIT_OPEN)
+        return []
+    if planner.expired():
+        print(f"⏳ 已超出运行时限，跳过账号：{masked}")
+        planner.skip(email, server_ids, BUDGET)
+        return []
 
-    for account in ACCOUNTS:
-        ok, email, sid = renew_single_account(account)
-        if ok:
-            success.append((email, sid))
+    wait = WebDriverWait(driver, 20)
+
+    try:
+        # === 登录（优先复用已保存的会话，失败按次数退避重试）===
+        if vault.is_valid(email):
+            print(f"♻️ 复用已保存的会话：{masked}")
+            restore_selenium_cookies(driver, vault.cookies(email))
         else:
-            failed.append((email, sid))
+            planner.retry(f"登录 {masked}", traced_login, driver, wait, email, password, attempts=LOGIN_ATTEMPTS)
+            planner.breaker.record(email, True)
+            vault.save(email, dump_selenium_cookies(driver))
+
+    except Exception as e:
+        print(f"❌ 登录失败：{masked} - {e}")
+        planner.breaker.record(email, False)
+        if selenium_challenge_seen(driver):
+            cloudflare_result(driver, False)
+        send_result_photo(
+            driver,
+            f"screenshot_{masked}_login",
+            caption=f"❌ <b>登录失败</b>\n账号：{masked}",
+            success=False
+        )
+        return [(False, email, sid, None) for sid in server_ids]
+
+    # === 续期 ===
+    results = []
+    for sid in server_ids:
+        if planner.expired():
+            print(f"⏳ 已超出运行时限，跳过：{masked} #{sid}")
+            planner.skip(email, [sid], BUDGET)
+            continue
+        started = time.monotonic()
+        result = planner.retry(
+            f"续期 {masked} #{sid}", tracer.call, "renew_server", renew_server, driver, email, sid,
+            account=email, server=sid, outcome=renew_outcome, attempts=RENEW_ATTEMPTS, is_success=renew_settled
+        )
+        ok = report_renew(driver, email, sid, result)
+        results.append((ok, email, sid, time.monotonic() - started))
+    return results
+
+def run_account(pool, group):
+    """
+    从浏览器池借一个浏览器处理账号，用完归还
+    """
+    failed = [(False, group["email"], sid, None) for sid in group["server_ids"]]
+    try:
+        driver = pool.acquire()
+    except Exception as e:
+        print(f"❌ 启动浏览器失败：{mask_email(group['email'])} - {e}")
+        return failed
+
+    broken = False
+    try:
+        return renew_account(group, driver)
+    except Exception:
+        broken = True
+        return failed
+    finally:
+        pool.release(driver, broken=broken)
+
+def plan_accounts():
+    """
+    调度模式下只处理临近到期的服务器，最紧急的排最前
+    返回 (待续期账号列表, 跳过的账号列表)
+    """
+    if SCHEDULE_MODE != "due":
+        return list(ACCOUNTS), []
+
+    due_ids, _ = renewal_state.plan([a["server_id"] for a in ACCOUNTS])
+    order = {sid: i for i, sid in enumerate(due_ids)}
+    due = sorted((a for a in ACCOUNTS if a["server_id"] in order), key=lambda a: order[a["server_id"]])
+    skipped = [a for a in ACCOUNTS if a["server_id"] not in order]
+    print(f"📅 调度模式：{len(due)} 个需要续期，{len(skipped)} 个未到期跳过")
+    return due, skipped
+
+def history_rows(results, skipped):
+    """
+    把本次运行的结果转换为运行历史的行（分片结果文件和汇总也用这份数据）
+    """
+    rows = []
+    for ok, email, sid, duration in results:
+        entry = (renewal_state.get(sid) or {}) if ok else {}
+        rows.append({
+            "server_id": sid,
+            "account": email,
+            "status": "success" if ok else "failed",
+            "duration": duration,
+            "renewal": entry.get("renewal"),
+            "next_renewal": entry.get("nextRenewal"),
+        })
+    for account in skipped:
+        rows.append({
+            "server_id": account["server_id"],
+            "account": account["email"],
+            "status": "skipped",
+            "next_renewal": renewal_state.describe(account["server_id"]),
+        })
+    for entry in planner.skipped:
+        rows.append({
+            "server_id": entry["server_id"],
+            "account": entry["account"],
+            "status": "skipped",
+            "reason": entry["reason"],
+            "result": f"{entry['server_id']}: skipped - {entry['reason']}",
+            "next_renewal": renewal_state.describe(entry["server_id"]),
+        })
+    return rows
+
+def build_summary(rows, missing=()):
+    """
+    生成 Telegram 汇总消息
+    """
+    success = [r for r in rows if r["status"] == "success"]
+    failed = [r for r in rows if r["status"] not in ("success", "skipped")]
+    skipped = [r for r in rows if r["status"] == "skipped" and not r.get("reason")]
+    budget = [r for r in rows if r["status"] == "skipped" and r.get("reason")]
 
-    # === Telegram 汇总 ===
     msg = "📦 <b>Zampto 多账号 VPS 续期结果</b>\n\n"
 
     if success:
         msg += "✅ <b>成功</b>\n"
-        for email, _ in success:
-            msg += f"• {mask_email(email)}\n"
+        for row in success:
+            msg += f"• {mask_email(row['account'])} #{row['server_id']}\n"
 
     if failed:
         msg += "\n❌ <b>失败</b>\n"
-        for email, _ in failed:
-            msg += f"• {mask_email(email)}\n"
+        for row in failed:
+            msg += f"• {mask_email(row['account'])} #{row['server_id']}\n"
+
+    if skipped:
+        msg += "\n⏭️ <b>未到期跳过</b>\n"
+        for row in skipped:
+            msg += f"• {mask_email(row['account'])} #{row['server_id']} ({row['next_renewal']})\n"
+
+    if budget:
+        msg += "\n⏳ <b>时限/熔断跳过</b>\n"
+        for row in budget:
+            msg += f"• {mask_email(row['account'])} #{row['server_id']} ({row['reason']})\n"
+
+    if missing:
+        msg += f"\n⚠️ <b>缺少分片结果</b>：{', '.join(str(i) for i in missing)}\n"
+
+    return msg
 
+def publish(rows, missing=()):
+    """
+    记录运行历史，发送唯一一份 Telegram 汇总，写心跳文件
+    """
+    run_id = history.record_run("zaprenew", rows, run_id=tracer.run_id)
+    # 截图先全部入队，汇总消息排在它们后面
+    screenshots.close()
+    send_telegram(build_summary(rows, missing))
+    # 等待后台通知全部发送完毕
+    close_notifications()
+    write_heartbeat(run_id)
+
+def merge():
+    """
+    合并各分片的结果文件，生成汇总
+    """
+    partials, missing = load_partials("zaprenew")
+    if not partials:
+        raise RuntimeError(f"❌ {SHARD_DIR} 中没有分片结果")
+    rows = [row for partial in partials for row in partial["rows"]]
+    print(f"🧩 合并 {len(partials)} 个分片，共 {len(rows)} 台服务器")
+    publish(rows, missing)
 
-    send_telegram(msg)
-    write_heartbeat()
+def main():
+    accounts, skipped = plan_accounts()
+    groups = group_accounts(accounts)
+    results = []
+
+    if groups:
+        workers = min(MAX_WORKERS, len(groups))
+        print(f"🚀 共 {len(accounts)} 台服务器，{len(groups)} 个账号，并发数 {workers}")
+
+        pool = DriverPool(workers)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for group_results in executor.map(lambda group: run_account(pool, group), groups):
+                    results.extend(group_results)
+        finally:
+            pool.close()
+
+    rows = history_rows(results, skipped)
+    if is_sharded():
+        # 分片只写结果文件，汇总和心跳由合并步骤统一生成（结果文件里不保存完整邮箱）
+        write_partial("zaprenew", {"rows": [dict(row, account=mask_email(row["account"])) for row in rows]})
+        close_notifications()
+    else:
+        publish(rows)
+    print("⏱️ 等待耗时统计:\n" + waiter.format_summary())
+    print(f"🧹 资源拦截统计: {policy.format_summary()}")
 
 if __name__ == "__main__":
-    main()
+    if MERGE_FLAG in sys.argv:
+        merge()
+    else:
+        main()